@@ -1,33 +1,64 @@
+import hmac
 from functools import wraps
-from flask import request, jsonify, current_app
-from utils.database import DatabaseManager
+from typing import Optional, Tuple
+from flask import request, jsonify, current_app, g
+from utils.config_cache import get_config_cache
+
+def _keys_match(provided: str, stored: Optional[str]) -> bool:
+    """Constant-time key comparison"""
+    if not stored:
+        return False
+    return hmac.compare_digest(provided.encode('utf-8'), stored.encode('utf-8'))
+
+def get_bearer_key() -> Optional[str]:
+    """Get the bearer token from the Authorization header"""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    return auth_header[7:]  # Remove 'Bearer ' prefix
+
+def _match_key(key: str) -> Tuple[bool, bool]:
+    """(matches the admin key, matches the API key) for a bearer key, memoized per request"""
+    cached = g.get('api_key_auth')
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2]
+
+    # Cached system_config snapshot instead of a database read per request
+    config = get_config_cache().get_all()
+    stored_api_key = config.get('api_key', current_app.config['DEFAULT_API_KEY'])
+    stored_admin_key = config.get('admin_key', current_app.config['DEFAULT_ADMIN_KEY'])
+
+    # Compare against both keys so timing does not reveal which one matched
+    is_admin = _keys_match(key, stored_admin_key)
+    is_api = _keys_match(key, stored_api_key)
+    g.api_key_auth = (key, is_admin, is_api)
+    return is_admin, is_api
+
+def api_key_role(key: str) -> Optional[str]:
+    """Resolve a bearer key to 'admin', 'api' or None"""
+    is_admin, is_api = _match_key(key)
+    return 'admin' if is_admin else 'api' if is_api else None
 
 def require_auth(f):
     """Require API key authentication"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
+        api_key = get_bearer_key()
+        if api_key is None:
             return jsonify({
-                'success': False, 
+                'success': False,
                 'error': 'Authentication required',
                 'code': 401
             }), 401
-        
-        api_key = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        # Get API key from database
-        db_manager = DatabaseManager()
-        config = db_manager.get_all_config()
-        stored_api_key = config.get('api_key', current_app.config['DEFAULT_API_KEY'])
-        
-        if api_key != stored_api_key:
+
+        # Only the API key is accepted here; the match is memoized for handlers re-checking auth
+        if not _match_key(api_key)[1]:
             return jsonify({
-                'success': False, 
+                'success': False,
                 'error': 'Invalid API key',
                 'code': 401
             }), 401
-        
+
         return f(*args, **kwargs)
     return decorated_function
 
@@ -35,27 +66,20 @@ def require_admin_auth(f):
     """Require admin password authentication"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
+        admin_key = get_bearer_key()
+        if admin_key is None:
             return jsonify({
-                'success': False, 
+                'success': False,
                 'error': 'Authentication required',
                 'code': 401
             }), 401
-        
-        admin_key = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        # Get admin key from database
-        db_manager = DatabaseManager()
-        config = db_manager.get_all_config()
-        stored_admin_key = config.get('admin_key', current_app.config['DEFAULT_ADMIN_KEY'])
-        
-        if admin_key != stored_admin_key:
+
+        if api_key_role(admin_key) != 'admin':
             return jsonify({
-                'success': False, 
+                'success': False,
                 'error': 'Invalid admin key',
                 'code': 401
             }), 401
-        
+
         return f(*args, **kwargs)
     return decorated_function
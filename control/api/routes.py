@@ -1,20 +1,35 @@
 from flask import Blueprint, request, jsonify, current_app
-from utils.database import DatabaseManager
-from utils.rate_limiting import RateLimitManager
-from api.auth import require_auth, require_admin_auth
+from utils.database import get_database_manager
+from utils.rate_limiting import get_rate_limit_manager
+from api.auth import require_auth, require_admin_auth, get_bearer_key, api_key_role
+from utils.notifications import responses_topic, INBOX_TOPIC
+from utils.streaming import get_parking_lot, long_poll, session_response_stream, DEFAULT_MAX_WAIT
+from utils.password_hashing import get_password_hasher
+from utils.maintenance import batched_delete, get_maintenance_scheduler
+from utils.retention import (RetentionBusy, RetentionError, count_expired, load_policy, retention_status,
+                             start_retention)
 import re
 from datetime import datetime
 
 bp = Blueprint('api', __name__)
 
+# Longest visibility timeout a poller may request for claimed inbox messages
+MAX_INBOX_LEASE_SECONDS = 3600
+
+# Largest number of responses accepted by one batched outbox request
+MAX_OUTBOX_BATCH = 500
+
+# Bulk message ingestion: largest batch, and messages per IP per rate-limit window
+MAX_MESSAGE_BATCH = 500
+BULK_MESSAGES_RATE_LIMIT = 10000
+
 def get_db():
-    """Get database manager instance"""
-    db_path = current_app.config.get('DATABASE_PATH', 'web_chat_bridge.db')
-    return DatabaseManager(db_path)
+    """Get the app-scoped database manager instance"""
+    return get_database_manager()
 
 def get_rate_limiter():
-    """Get rate limiter instance"""
-    return RateLimitManager(get_db())
+    """Get the app-scoped rate limiter instance"""
+    return get_rate_limit_manager()
 
 def validate_session_id(session_id: str) -> bool:
     """Validate session ID format - IDENTICAL to PHP version"""
@@ -32,6 +47,23 @@ def validate_message(message: str) -> bool:
         message.strip() != ''
     )
 
+def parse_wait() -> float:
+    """Parse the long-poll ?wait= seconds, capped at LONG_POLL_MAX_WAIT (raises ValueError)"""
+    wait = float(request.args.get('wait', 0) or 0)
+    if wait != wait:
+        raise ValueError('wait is NaN')
+    return min(max(wait, 0), current_app.config.get('LONG_POLL_MAX_WAIT', DEFAULT_MAX_WAIT))
+
+def wait_for_inbox(db, fetch, wait: float):
+    """Run fetch(), parking up to `wait` seconds until it finds messages"""
+    if not wait:
+        return fetch()
+    with get_parking_lot('inbox').slot() as parked:
+        # When INBOX_MAX_PARKED requests are already parked, answer immediately
+        if not parked:
+            return fetch()
+        return long_poll(db.events, INBOX_TOPIC, fetch, wait)
+
 # Single entry point for API - IDENTICAL to PHP structure
 @bp.route('/', methods=['GET', 'POST', 'OPTIONS'])
 def api_entry_point():
@@ -52,10 +84,14 @@ def api_entry_point():
         return handle_messages()
     elif action == 'inbox':
         return handle_inbox()
+    elif action == 'ack':
+        return handle_ack()
     elif action == 'outbox':
         return handle_outbox()
     elif action == 'responses':
         return handle_responses()
+    elif action == 'responses_stream':
+        return handle_responses_stream()
     elif action == 'sessions':
         return handle_sessions()
     elif action == 'config':
@@ -66,6 +102,10 @@ def api_entry_point():
         return handle_clear_data()
     elif action == 'cleanup_logs':
         return handle_cleanup_logs()
+    elif action == 'metrics':
+        return handle_metrics()
+    elif action == 'retention':
+        return handle_retention()
     else:
         return jsonify({'success': False, 'error': 'Invalid action'}), 400
 
@@ -81,6 +121,12 @@ def handle_inbox_direct():
     """Direct route for inbox - same as ?action=inbox"""
     return handle_inbox()
 
+@bp.route('/ack', methods=['POST'])
+@require_auth
+def handle_ack_direct():
+    """Direct route for ack - same as ?action=ack"""
+    return handle_ack()
+
 @bp.route('/outbox', methods=['POST'])
 @require_auth
 def handle_outbox_direct():
@@ -92,6 +138,11 @@ def handle_responses_direct():
     """Direct route for responses - same as ?action=responses"""
     return handle_responses()
 
+@bp.route('/responses/stream', methods=['GET'])
+def handle_responses_stream_direct():
+    """Direct route for responses_stream - same as ?action=responses_stream"""
+    return handle_responses_stream()
+
 @bp.route('/sessions', methods=['GET'])
 @require_admin_auth
 def handle_sessions_direct():
@@ -122,18 +173,37 @@ def handle_cleanup_logs_direct():
     """Direct route for cleanup_logs - same as ?action=cleanup_logs"""
     return handle_cleanup_logs()
 
+@bp.route('/metrics', methods=['GET'])
+@require_admin_auth
+def handle_metrics_direct():
+    """Direct route for metrics - same as ?action=metrics"""
+    return handle_metrics()
+
+@bp.route('/retention', methods=['GET', 'POST'])
+@require_admin_auth
+def handle_retention_direct():
+    """Direct route for retention - same as ?action=retention"""
+    return handle_retention()
+
 def handle_messages():
     """Handle POST /api/v1/?action=messages - IDENTICAL to PHP"""
     if request.method != 'POST':
         return jsonify({'success': False, 'error': 'Method not allowed'}), 405
     
+    # Get and validate input - IDENTICAL to PHP
+    data = request.get_json(silent=True)
+    
+    # Bulk mode: a JSON array, or {"messages": [...]}
+    if isinstance(data, list):
+        return handle_messages_bulk(data)
+    if isinstance(data, dict) and isinstance(data.get('messages'), list):
+        return handle_messages_bulk(data['messages'])
+    
     # Rate limiting - IDENTICAL to PHP
     rate_limiter = get_rate_limiter()
     if not rate_limiter.check_rate_limit(request.remote_addr, '/api/messages', 50):
         return jsonify({'success': False, 'error': 'Rate limit exceeded'}), 429
     
-    # Get and validate input - IDENTICAL to PHP
-    data = request.get_json()
     if not data:
         return jsonify({'success': False, 'error': 'Invalid JSON'}), 400
     
@@ -154,19 +224,13 @@ def handle_messages():
     try:
         db = get_db()
         
-        # Check if session exists and create if needed - IDENTICAL to PHP
-        session_existed = db.session_exists(session_id)
-        if not session_existed:
-            db.create_session(session_id, request.remote_addr, request.headers.get('User-Agent'))
-        
-        # Get or create UID for this session - IDENTICAL to PHP
-        uid_data = db.get_or_create_uid(session_id, request.remote_addr)
-        uid = uid_data['uid']
+        # Upsert session, resolve UID and store message in a single transaction
+        result = db.ingest_message(session_id, message, request.remote_addr,
+                                   request.headers.get('User-Agent'))
+        message_id = result['message_id']
+        uid = result['uid']
         # A user is new if the session didn't exist before this request
-        is_new_user = not session_existed
-        
-        # Store message - IDENTICAL to PHP
-        message_id = db.create_message(session_id, message)
+        is_new_user = result['is_new']
         
         # Response format - IDENTICAL to PHP
         return jsonify({
@@ -185,6 +249,66 @@ def handle_messages():
     except Exception as e:
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
+def handle_messages_bulk(items: list):
+    """Ingest a batch of messages (replays and imports); requires the API key"""
+    auth_result = require_auth_internal()
+    if auth_result:
+        return auth_result
+    
+    if not items:
+        return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+    if len(items) > MAX_MESSAGE_BATCH:
+        return jsonify({'success': False, 'error': f'At most {MAX_MESSAGE_BATCH} messages per batch'}), 400
+    
+    # One rate-limit charge, weighted by batch size
+    rate_limiter = get_rate_limiter()
+    if not rate_limiter.check_rate_limit(request.remote_addr, '/api/messages/bulk',
+                                         BULK_MESSAGES_RATE_LIMIT, len(items)):
+        return jsonify({'success': False, 'error': 'Rate limit exceeded'}), 429
+    
+    # Validate everything up front; invalid items are reported, valid ones stored
+    results = []
+    valid = []
+    for index, item in enumerate(items):
+        session_id = item.get('session_id') if isinstance(item, dict) else None
+        message = item.get('message') if isinstance(item, dict) else None
+        session_id = session_id.strip() if isinstance(session_id, str) else ''
+        message = message.strip() if isinstance(message, str) else ''
+        if not session_id or not message:
+            error = 'Missing required fields'
+        elif not validate_session_id(session_id):
+            error = 'Invalid session ID'
+        elif not validate_message(message):
+            error = 'Invalid message'
+        else:
+            results.append({'index': index, 'success': True, 'session_id': session_id})
+            valid.append((session_id, message))
+            continue
+        results.append({'index': index, 'success': False, 'error': error})
+    
+    try:
+        db = get_db()
+        ingested = iter(db.ingest_messages(valid, request.remote_addr, request.headers.get('User-Agent')))
+    except Exception as e:
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+    
+    for result in results:
+        if result['success']:
+            stored = next(ingested)
+            result.update(message_id=stored['message_id'], uid=stored['uid'], is_new_user=stored['is_new'])
+    
+    failed = len(results) - len(valid)
+    return jsonify({
+        'success': bool(valid),
+        'message': 'Success' if not failed else f'{failed} of {len(results)} messages rejected',
+        'timestamp': datetime.now().isoformat(),
+        'data': {
+            'results': results,
+            'stored': len(valid),
+            'failed': failed
+        }
+    }), 200 if valid else 400
+
 def handle_inbox():
     """Handle GET /api/v1/?action=inbox - IDENTICAL to PHP"""
     if request.method != 'GET':
@@ -200,6 +324,20 @@ def handle_inbox():
     if not rate_limiter.check_rate_limit(request.remote_addr, '/api/inbox', 120):
         return jsonify({'success': False, 'error': 'Rate limit exceeded'}), 429
     
+    # Optional long-poll: park up to `wait` seconds until messages arrive
+    try:
+        wait = parse_wait()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid wait parameter'}), 400
+    
+    # Cursor mode: atomic claim of the next batch after after_id
+    if 'after_id' in request.args or 'lease' in request.args:
+        return handle_inbox_claim(wait)
+    
+    # Offset mode reads and then marks; woken waiters would all return the same rows
+    if wait:
+        return jsonify({'success': False, 'error': 'wait requires cursor mode (after_id)'}), 400
+    
     # Get query parameters - IDENTICAL to PHP
     limit = min(int(request.args.get('limit', 50)), 100)
     offset = int(request.args.get('offset', 0))
@@ -238,6 +376,95 @@ def handle_inbox():
     except Exception as e:
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
+def handle_inbox_claim(wait: float = 0):
+    """Claim unprocessed messages after a cursor (?action=inbox&after_id=N[&lease=S][&wait=W])"""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 100)
+        after_id = max(int(request.args.get('after_id', 0) or 0), 0)
+        lease = int(request.args.get('lease', 0) or 0)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid pagination parameters'}), 400
+    
+    if lease < 0 or lease > MAX_INBOX_LEASE_SECONDS:
+        return jsonify({'success': False, 'error': f'Lease must be between 0 and {MAX_INBOX_LEASE_SECONDS} seconds'}), 400
+    
+    try:
+        db = get_db()
+        
+        def claim_batch():
+            batch = db.claim_messages(limit, after_id, lease or None)
+            return batch if batch['messages'] else None
+        
+        claim = wait_for_inbox(db, claim_batch, wait) or {'messages': [], 'claim_token': None, 'lease_expires': None}
+        messages = claim['messages']
+        
+        return jsonify({
+            'success': True,
+            'message': 'Success',
+            'timestamp': datetime.now().isoformat(),
+            'data': {
+                'messages': messages,
+                'claim_token': claim['claim_token'],
+                'lease_expires': claim['lease_expires'],
+                'pagination': {
+                    'limit': limit,
+                    'after_id': after_id,
+                    # Redelivered expired leases may sit below the cursor; never move it back
+                    'next_cursor': max([after_id] + [m['id'] for m in messages]),
+                    'has_more': len(messages) == limit
+                }
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+def handle_ack():
+    """Handle POST /api/v1/?action=ack - mark leased inbox messages processed"""
+    if request.method != 'POST':
+        return jsonify({'success': False, 'error': 'Method not allowed'}), 405
+    
+    # Authentication required
+    auth_result = require_auth_internal()
+    if auth_result:
+        return auth_result
+    
+    rate_limiter = get_rate_limiter()
+    if not rate_limiter.check_rate_limit(request.remote_addr, '/api/ack', 200):
+        return jsonify({'success': False, 'error': 'Rate limit exceeded'}), 429
+    
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'success': False, 'error': 'Invalid JSON'}), 400
+    
+    message_ids = data.get('message_ids')
+    claim_token = data.get('claim_token')
+    if (not isinstance(message_ids, list) or not message_ids
+            or not all(isinstance(mid, int) and not isinstance(mid, bool) for mid in message_ids)):
+        return jsonify({'success': False, 'error': 'message_ids must be a non-empty list of integers'}), 400
+    if len(message_ids) > 100:
+        return jsonify({'success': False, 'error': 'At most 100 message_ids per ack'}), 400
+    # Only messages claimed with this token can be acked, so undelivered ones are never dropped
+    if not isinstance(claim_token, str) or not claim_token:
+        return jsonify({'success': False, 'error': 'claim_token from a leased inbox claim (?action=inbox&lease=S) is required'}), 400
+    
+    try:
+        db = get_db()
+        acked = db.ack_messages(message_ids, claim_token)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Success',
+            'timestamp': datetime.now().isoformat(),
+            'data': {
+                'acknowledged': acked,
+                'requested': len(message_ids)
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
 def handle_outbox():
     """Handle POST /api/v1/?action=outbox - IDENTICAL to PHP"""
     if request.method != 'POST':
@@ -258,6 +485,12 @@ def handle_outbox():
     if not data:
         return jsonify({'success': False, 'error': 'Missing required fields'}), 400
     
+    # Batch mode: a JSON array, or {"responses": [...]}
+    if isinstance(data, list):
+        return handle_outbox_batch(data)
+    if isinstance(data.get('responses'), list):
+        return handle_outbox_batch(data['responses'])
+    
     session_id = data.get('session_id', '').strip()
     response = data.get('response', '').strip()
     message_id = data.get('message_id', 0)
@@ -298,6 +531,68 @@ def handle_outbox():
     except Exception as e:
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
+def validate_outbox_item(item):
+    """Validate one batched outbox entry; return (session_id, response, message_id) or an error string"""
+    if not isinstance(item, dict):
+        return 'Item must be an object'
+    session_id = item.get('session_id')
+    response = item.get('response')
+    message_id = item.get('message_id') or None
+    if not isinstance(session_id, str) or not isinstance(response, str):
+        return 'Missing required fields'
+    session_id = session_id.strip()
+    response = response.strip()
+    if not session_id or not response:
+        return 'Missing required fields'
+    if not validate_session_id(session_id):
+        return 'Invalid session ID'
+    if message_id is not None and (not isinstance(message_id, int) or isinstance(message_id, bool)):
+        return 'Invalid message_id'
+    return (session_id, response, message_id)
+
+def handle_outbox_batch(items: list):
+    """Store a batch of responses in one transaction, reporting each item's result"""
+    if not items:
+        return jsonify({'success': False, 'error': 'Missing required fields'}), 400
+    if len(items) > MAX_OUTBOX_BATCH:
+        return jsonify({'success': False, 'error': f'At most {MAX_OUTBOX_BATCH} responses per batch'}), 400
+    
+    # Validate everything up front; invalid items are reported, valid ones stored
+    results = []
+    valid = []
+    for index, item in enumerate(items):
+        checked = validate_outbox_item(item)
+        if isinstance(checked, str):
+            results.append({'index': index, 'success': False, 'error': checked})
+        else:
+            results.append({'index': index, 'success': True, 'session_id': checked[0]})
+            valid.append((index, checked))
+    
+    try:
+        db = get_db()
+        response_ids = db.create_responses([checked for _, checked in valid])
+    except Exception as e:
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+    
+    for (index, _), response_id in zip(valid, response_ids):
+        if response_id is None:
+            results[index] = {'index': index, 'success': False, 'error': 'Invalid session'}
+        else:
+            results[index]['response_id'] = response_id
+    
+    stored = sum(1 for result in results if result['success'])
+    failed = len(results) - stored
+    return jsonify({
+        'success': stored > 0,
+        'message': 'Success' if not failed else f'{failed} of {len(results)} responses rejected',
+        'timestamp': datetime.now().isoformat(),
+        'data': {
+            'results': results,
+            'stored': stored,
+            'failed': failed
+        }
+    }), 200 if stored else 400
+
 def handle_responses():
     """Handle GET /api/v1/?action=responses - IDENTICAL to PHP"""
     if request.method != 'GET':
@@ -318,6 +613,16 @@ def handle_responses():
     if not validate_session_id(session_id):
         return jsonify({'success': False, 'error': 'Invalid session ID'}), 400
     
+    # Optional long-poll: park up to `wait` seconds until a response arrives
+    try:
+        wait = parse_wait()
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid wait parameter'}), 400
+    
+    # Cursor mode: only responses with id > after_id, one bounded page at a time
+    if 'after_id' in request.args:
+        return handle_responses_page(session_id, wait)
+    
     try:
         db = get_db()
         
@@ -325,7 +630,13 @@ def handle_responses():
         if not db.session_exists(session_id):
             db.create_session(session_id, request.remote_addr, request.headers.get('User-Agent'))
         
-        responses = db.get_session_responses(session_id, since)
+        fetch = lambda: db.get_session_responses(session_id, since)
+        if wait:
+            with get_parking_lot('responses').slot() as parked:
+                # When too many requests are parked, answer immediately instead
+                responses = long_poll(db.events, responses_topic(session_id), fetch, wait) if parked else fetch()
+        else:
+            responses = fetch()
         
         # Response format - IDENTICAL to PHP
         return jsonify({
@@ -341,6 +652,75 @@ def handle_responses():
     except Exception as e:
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
+def handle_responses_page(session_id: str, wait: float = 0):
+    """Get responses after a cursor (?action=responses&session_id=S&after_id=N[&limit=L][&wait=W])"""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 100)
+        after_id = max(int(request.args.get('after_id', 0) or 0), 0)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid pagination parameters'}), 400
+    
+    try:
+        db = get_db()
+        
+        def fetch_new():
+            page = db.get_responses_page(session_id, after_id, limit)
+            return page if page['responses'] else None
+        
+        if wait:
+            with get_parking_lot('responses').slot() as parked:
+                # When too many requests are parked, answer immediately instead
+                page = long_poll(db.events, responses_topic(session_id), fetch_new, wait) if parked else fetch_new()
+        else:
+            page = fetch_new()
+        page = page or {'responses': [], 'next_cursor': after_id, 'has_more': False}
+        
+        return jsonify({
+            'success': True,
+            'message': 'Success',
+            'timestamp': datetime.now().isoformat(),
+            'data': {
+                'session_id': session_id,
+                'responses': page['responses'],
+                'pagination': {
+                    'limit': limit,
+                    'after_id': after_id,
+                    'next_cursor': page['next_cursor'],
+                    'has_more': page['has_more']
+                }
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+def handle_responses_stream():
+    """Handle GET /api/v1/?action=responses_stream - Server-Sent Events for a session"""
+    if request.method != 'GET':
+        return jsonify({'success': False, 'error': 'Method not allowed'}), 405
+    
+    # One rate-limit charge per stream rather than per poll
+    rate_limiter = get_rate_limiter()
+    if not rate_limiter.check_rate_limit(request.remote_addr, '/api/responses', 200):
+        return jsonify({'success': False, 'error': 'Rate limit exceeded'}), 429
+    
+    session_id = request.args.get('session_id', '').strip()
+    if not session_id:
+        return jsonify({'success': False, 'error': 'Missing session_id'}), 400
+    if not validate_session_id(session_id):
+        return jsonify({'success': False, 'error': 'Invalid session ID'}), 400
+    
+    # EventSource sends Last-Event-ID when it reconnects
+    try:
+        after_id = int(request.headers.get('Last-Event-ID') or request.args.get('after_id', 0) or 0)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid after_id'}), 400
+    
+    response = session_response_stream(get_db(), session_id, after_id)
+    if response is None:
+        return jsonify({'success': False, 'error': 'Too many open streams'}), 503
+    return response
+
 def handle_sessions():
     """Handle GET /api/v1/?action=sessions - IDENTICAL to PHP"""
     if request.method != 'GET':
@@ -360,10 +740,23 @@ def handle_sessions():
     offset = int(request.args.get('offset', 0))
     active = request.args.get('active', 'true')
     
+    # Keyset paging: cursor is the previous page's next_cursor ("<last_activity>|<id>")
+    before = None
+    cursor = request.args.get('cursor', '')
+    if cursor:
+        last_activity, _, session_row_id = cursor.rpartition('|')
+        if not last_activity or not session_row_id.isdigit():
+            return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+        before = (last_activity, int(session_row_id))
+    
     try:
         db = get_db()
-        sessions = db.get_active_sessions(limit, offset, active == 'true')
+        # Fetch one extra row to learn whether another page follows
+        sessions = db.get_active_sessions(limit + 1, offset, active == 'true', before)
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
         total = db.get_session_count(active == 'true')
+        last = sessions[-1] if sessions else None
         
         # Response format - IDENTICAL to PHP
         return jsonify({
@@ -376,7 +769,8 @@ def handle_sessions():
                     'total': total,
                     'limit': limit,
                     'offset': offset,
-                    'has_more': (offset + limit) < total
+                    'has_more': has_more,
+                    'next_cursor': f"{last['last_activity']}|{last['id']}" if last and has_more else None
                 }
             }
         })
@@ -476,16 +870,12 @@ def handle_clear_data():
         messages_count = cursor.fetchone()[0]
         cursor.execute("SELECT COUNT(*) FROM web_chat_sessions")
         sessions_count = cursor.fetchone()[0]
-        
-        # Clear all data - IDENTICAL to PHP
-        cursor.execute("DELETE FROM web_chat_responses")
-        cursor.execute("DELETE FROM web_chat_messages")
-        cursor.execute("DELETE FROM web_chat_sessions")
-        cursor.execute("DELETE FROM rate_limits")
-        
-        conn.commit()
         conn.close()
         
+        # Clear all data - IDENTICAL to PHP, in short batches so writers are not locked out
+        for table in ('web_chat_responses', 'web_chat_messages', 'web_chat_sessions', 'rate_limits'):
+            batched_delete(db, table, '1 = 1', time_budget=float('inf'))
+        
         # Log the action (we'll implement logging later)
         # log_message('WARNING', 'All data cleared by admin', {'admin_ip': request.remote_addr})
         
@@ -552,37 +942,99 @@ def handle_cleanup_logs():
     except Exception as e:
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
 
+def handle_metrics():
+    """Handle GET /api/v1/?action=metrics - worker pool, queue and maintenance counters"""
+    if request.method != 'GET':
+        return jsonify({'success': False, 'error': 'Method not allowed'}), 405
+    
+    auth_result = require_admin_auth_internal()
+    if auth_result:
+        return auth_result
+    
+    return jsonify({
+        'success': True,
+        'message': 'Success',
+        'timestamp': datetime.now().isoformat(),
+        'data': {
+            'password_hashing': get_password_hasher().stats(),
+            'database_pool': get_db().pool.stats(),
+            'maintenance': get_maintenance_scheduler().stats()
+        }
+    })
+
+def handle_retention():
+    """Handle GET/POST /api/v1/?action=retention - archive and purge old chat history"""
+    auth_result = require_admin_auth_internal()
+    if auth_result:
+        return auth_result
+    
+    db = get_db()
+    if request.method == 'GET':
+        # Current policy and what a run would purge now
+        try:
+            policy = load_policy(db)
+        except RetentionError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        data = {'policy': policy._asdict(), 'last_run': retention_status()}
+        if policy.days:
+            data['expired'] = count_expired(db, policy)
+        return jsonify({
+            'success': True,
+            'message': 'Success',
+            'timestamp': datetime.now().isoformat(),
+            'data': data
+        })
+    
+    if request.method != 'POST':
+        return jsonify({'success': False, 'error': 'Method not allowed'}), 405
+    
+    # Optional one-off overrides of the system_config policy
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'success': False, 'error': 'Invalid JSON'}), 400
+    overrides = {key: data.get(key) for key in ('days', 'archive', 'vacuum', 'batch_size')}
+    
+    try:
+        policy = load_policy(db, overrides)
+        if data.get('dry_run'):
+            result = {'policy': policy._asdict(), 'expired': count_expired(db, policy)}
+        else:
+            # Purge and vacuum can take minutes; poll GET for last_run
+            result = start_retention(db, policy)
+    except RetentionError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except RetentionBusy as e:
+        return jsonify({'success': False, 'error': str(e), 'data': retention_status()}), 409
+    except Exception as e:
+        return jsonify({'success': False, 'error': 'Internal server error'}), 500
+    
+    return jsonify({
+        'success': True,
+        'message': 'Dry run' if data.get('dry_run') else 'Retention started',
+        'timestamp': datetime.now().isoformat(),
+        'data': result
+    }), 200 if data.get('dry_run') else 202
+
 # Internal authentication functions
 def require_auth_internal():
     """Internal authentication check - IDENTICAL to PHP"""
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
+    key = get_bearer_key()
+    if key is None:
         return jsonify({'success': False, 'error': 'Authentication required'}), 401
     
-    key = auth_header[7:]
-    db_manager = get_db()
-    config = db_manager.get_all_config()
-    stored_api_key = config.get('api_key', current_app.config['DEFAULT_API_KEY'])
-    stored_admin_key = config.get('admin_key', current_app.config['DEFAULT_ADMIN_KEY'])
-    
     # Accept either API key or admin key for inbox access
-    if key != stored_api_key and key != stored_admin_key:
+    if api_key_role(key) is None:
         return jsonify({'success': False, 'error': 'Invalid API key'}), 401
     
     return None
 
 def require_admin_auth_internal():
     """Internal admin authentication check - IDENTICAL to PHP"""
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
+    admin_key = get_bearer_key()
+    if admin_key is None:
         return jsonify({'success': False, 'error': 'Authentication required'}), 401
     
-    admin_key = auth_header[7:]
-    db_manager = get_db()
-    config = db_manager.get_all_config()
-    stored_admin_key = config.get('admin_key', current_app.config['DEFAULT_ADMIN_KEY'])
-    
-    if admin_key != stored_admin_key:
+    if api_key_role(admin_key) != 'admin':
         return jsonify({'success': False, 'error': 'Invalid admin key'}), 401
     
     return None
@@ -18,31 +18,66 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 from flask import Flask, render_template, request, jsonify, send_from_directory, session, redirect, url_for, flash
+import csv
 import os
 import json
-import bcrypt
+import threading
 from datetime import datetime
-from models import User, UserSession, Agent, SystemConfig, get_db, get_agents_visible_to_user
+from models import User, UserSession, Agent, SystemConfig, get_db, get_agents_visible_to_user, search_users
 from sqlalchemy import or_
 from auth import authenticate_user, create_user_session, get_user_by_session_token, require_auth, require_role, cleanup_expired_sessions
+from auth import hash_password
+from utils.password_hashing import HasherBusy, get_password_hasher
+from utils.user_import import ImportFormatError, import_users, parse_csv, parse_json
+from utils.agent_cache import get_agent_catalog_cache
+from utils.cache_versions import AGENTS_VERSION, mark_changed
+from utils.backup import BackupBusy, BackupError, get_backup_manager
+from auth import clear_session_cache, end_user_session, invalidate_user_sessions
 
 app = Flask(__name__)
 
 # Configuration
 app.config['SECRET_KEY'] = 'your-secret-key-here'  # Change in production
 app.config['STATIC_FOLDER'] = 'static'
-app.config['DATABASE_PATH'] = 'db/sanctum_ui.db'  # Path to integrated database
+app.config['DATABASE_PATH'] = os.path.join(app.root_path, 'db', 'sanctum_ui.db')  # Path to integrated database
+app.config['DATABASE_POOL_SIZE'] = 8  # Max pooled SQLite connections for the bridge API
+app.config['DATABASE_POOL_TIMEOUT'] = 30.0  # Seconds to wait for a free pooled connection
+app.config['DATABASE_PRAGMAS'] = {}  # Overrides for utils.sqlite_config.DEFAULT_PRAGMAS (None drops one)
+app.config['RATE_LIMIT_BACKEND'] = 'memory'  # 'memory' (per process), 'shared' (mmap, all workers) or 'sqlite'
+app.config['RATE_LIMIT_WINDOW'] = 3600  # Rate limit window in seconds
+app.config['RATE_LIMIT_MAX_KEYS'] = 10000  # Max tracked (ip, endpoint) keys for the memory/shared backends
+app.config['RATE_LIMIT_SHARED_PATH'] = None  # Counter file for the shared backend (default: /dev/shm per database)
+app.config['CONFIG_CACHE_MAX_STALENESS'] = 2.0  # Seconds before a worker re-checks the system_config version
+app.config['AGENT_CACHE_MAX_STALENESS'] = 2.0  # Seconds before a worker re-checks the agents version
+app.config['SESSION_CACHE_TTL'] = 60  # Seconds a resolved login session is cached (capped at expires_at)
+app.config['RESPONSES_MAX_PARKED'] = 64  # Concurrent response streams / long-polls holding a worker thread
+app.config['INBOX_MAX_PARKED'] = 16  # Concurrent ?action=inbox&wait= requests holding a worker thread
+app.config['LONG_POLL_MAX_WAIT'] = 30  # Longest ?wait= a long-poll may request, in seconds
+app.config['STREAM_MAX_DURATION'] = 300  # SSE streams close after this; EventSource reconnects
+app.config['LONG_POLL_RECHECK'] = 10.0  # Seconds between DB re-reads while parked (catches other workers' writes)
+app.config['USERS_PAGE_SIZE'] = 100  # Default ?limit= for GET /api/users
+app.config['USERS_PAGE_MAX'] = 500  # Largest ?limit= GET /api/users accepts
+app.config['USER_IMPORT_MAX_ROWS'] = 100  # Rows per POST /api/users/bulk; import_users.py handles larger files
+app.config['BCRYPT_ROUNDS'] = 12  # bcrypt cost for new hashes; older hashes are upgraded at login
+app.config['PASSWORD_HASH_WORKERS'] = max(1, (os.cpu_count() or 2) // 2)  # Threads hashing passwords (bcrypt releases the GIL)
+app.config['PASSWORD_HASH_MAX_QUEUE'] = 32  # Hashes waiting for a worker before logins get 503
+app.config['PASSWORD_HASH_TIMEOUT'] = 10.0  # Seconds a request waits for its hash
+app.config['MAINTENANCE_ENABLED'] = True  # Background sweeps of expired/idle rows (utils.maintenance)
+app.config['MAINTENANCE_INTERVAL'] = 300  # Seconds between sweeps (jittered +/-20%)
+app.config['MAINTENANCE_BATCH_SIZE'] = 500  # Rows per DELETE batch
+app.config['MAINTENANCE_TIME_BUDGET'] = 0.5  # Seconds per table per sweep; leftovers wait for the next sweep
+app.config['CHAT_SESSION_IDLE_TIMEOUT'] = 1800  # Seconds before an idle web_chat_session is swept
+app.config['BACKUP_DIR'] = os.path.join(app.root_path, 'db', 'backups')  # Database snapshots (utils.backup)
+app.config['BACKUP_KEEP'] = 7  # Newest snapshots kept; older ones are rotated out
+app.config['BACKUP_COMPRESSION'] = 'gzip'  # 'gzip', 'zstd' (needs zstandard) or 'none'
+app.config['BACKUP_PAGES_PER_STEP'] = 1024  # Pages copied per online backup step; writers get the lock between steps
 
 # Default API keys for working Flask system
 app.config['DEFAULT_API_KEY'] = 'ObeyG1ant'
 app.config['DEFAULT_ADMIN_KEY'] = 'FreeUkra1ne'
 
 # Ensure static folder exists
-os.makedirs('static', exist_ok=True)
-
-# Initialize database
-from models import init_db
-init_db()
+os.makedirs(app.static_folder, exist_ok=True)
 
 # Register working Flask system blueprints
 from api import bp as api_bp
@@ -51,6 +86,54 @@ from chat import bp as chat_bp
 app.register_blueprint(api_bp, url_prefix='/api/v1')
 app.register_blueprint(chat_bp, url_prefix='/chat')
 
+_startup_lock = threading.Lock()
+
+def create_app(config=None):
+    """
+    Apply config overrides and run the database startup steps once; returns the app.
+
+    Importing this module opens no database: `python app.py`, wsgi.py and the
+    first request call this. Tests and scripts pass their own DATABASE_PATH.
+    """
+    if config:
+        app.config.update(config)
+    if app.extensions.get('sanctum_started'):
+        return app
+    
+    from models import configure_engine, init_db
+    from utils.database import init_database_manager
+    
+    with _startup_lock:
+        if app.extensions.get('sanctum_started'):
+            return app
+        # Engine is created lazily from configuration; create_all is skipped when
+        # the schema version is already current
+        configure_engine(app.config['DATABASE_PATH'], app.config['DATABASE_PRAGMAS'])
+        init_db()
+        # Build the shared bridge database manager once (schema migrations + connection pool)
+        init_database_manager(app)
+        if app.config['MAINTENANCE_ENABLED']:
+            from utils.maintenance import get_maintenance_scheduler
+            get_maintenance_scheduler(app).start()
+        app.extensions['sanctum_started'] = True
+    return app
+
+@app.before_request
+def ensure_started():
+    # Covers servers that import `app` directly (flask run, app:app)
+    create_app()
+
+@app.errorhandler(HasherBusy)
+def password_hashing_busy(e):
+    """Shed load when the password hashing pool is full instead of queueing requests"""
+    response = jsonify({'error': 'Server busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@app.errorhandler(BackupBusy)
+def backup_busy(e):
+    return jsonify({'error': str(e)}), 409
+
 @app.route('/')
 def index():
     """Main chat interface"""
@@ -65,7 +148,11 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         
-        success, user_dict, error = authenticate_user(username, password)
+        try:
+            success, user_dict, error = authenticate_user(username, password)
+        except HasherBusy:
+            flash('The server is busy, please try again in a moment', 'error')
+            return render_template('login.html'), 503
         
         if success:
             # Get user data from dictionary
@@ -100,7 +187,8 @@ def login():
 @app.route('/logout')
 def logout():
     """User logout"""
-    # Clear Flask session
+    # Remove the server-side session (and its cache entry), then clear Flask session
+    end_user_session(session.get('session_token'))
     session.clear()
     return redirect(url_for('login'))
 
@@ -159,27 +247,20 @@ def user_management():
 @require_auth
 @require_role('admin')
 def get_users():
-    """Get all users with optional filtering"""
+    """Get active users with optional search, role filter and keyset pagination"""
+    search_term = request.args.get('search', '').strip()
+    role_filter = request.args.get('role', '')
+    try:
+        after_id = int(request.args.get('after_id', 0))
+        limit = int(request.args.get('limit', app.config['USERS_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'error': 'after_id and limit must be integers'}), 400
+    if after_id < 0 or not 1 <= limit <= app.config['USERS_PAGE_MAX']:
+        return jsonify({'error': f"limit must be between 1 and {app.config['USERS_PAGE_MAX']}"}), 400
+    
     db = next(get_db())
     try:
-        search_term = request.args.get('search', '').lower()
-        role_filter = request.args.get('role', '')
-        
-        # Build query
-        query = db.query(User).filter(User.is_active == True)
-        
-        if search_term:
-            query = query.filter(
-                or_(
-                    User.username.ilike(f'%{search_term}%'),
-                    User.email.ilike(f'%{search_term}%')
-                )
-            )
-        
-        if role_filter:
-            query = query.filter(User.role == role_filter)
-        
-        users = query.all()
+        users, next_cursor = search_users(db, search_term, role_filter, after_id, limit)
         
         # Convert to JSON-serializable format
         user_list = []
@@ -194,7 +275,11 @@ def get_users():
                 'created_at': user.created_at.isoformat() if user.created_at else None
             })
         
-        return jsonify(user_list)
+        # The body stays a plain list; the next page is requested with ?after_id=<X-Next-Cursor>
+        response = jsonify(user_list)
+        if next_cursor is not None:
+            response.headers['X-Next-Cursor'] = str(next_cursor)
+        return response
     finally:
         db.close()
 
@@ -223,7 +308,7 @@ def create_user():
         new_user = User(
             username=data['username'],
             email=data['email'],
-            password_hash=bcrypt.hashpw('changeme123'.encode('utf-8'), bcrypt.gensalt()).decode('utf-8'),
+            password_hash=hash_password('changeme123'),
             role=data['role'],
             permissions=data.get('permissions', '[]'),
             is_active=True
@@ -239,12 +324,51 @@ def create_user():
             'role': new_user.role,
             'message': 'User created successfully'
         }), 201
+    except HasherBusy:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         return jsonify({'error': str(e)}), 500
     finally:
         db.close()
 
+@app.route('/api/users/bulk', methods=['POST'])
+@require_auth
+@require_role('admin')
+def bulk_create_users():
+    """Create many users from a JSON array or CSV body in one transaction"""
+    try:
+        if request.mimetype == 'text/csv':
+            rows = parse_csv(request.get_data(as_text=True))
+        else:
+            rows = parse_json(request.get_json(silent=True))
+    except (ImportFormatError, csv.Error) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not rows:
+        return jsonify({'error': 'No users to import'}), 400
+    max_rows = app.config['USER_IMPORT_MAX_ROWS']
+    if len(rows) > max_rows:
+        # Every row is a bcrypt hash inside this request; bigger files go through import_users.py
+        return jsonify({'error': f'At most {max_rows} users per import (use import_users.py for more)'}), 413
+    
+    db = next(get_db())
+    try:
+        result = import_users(db, rows, get_password_hasher().hash_many)
+        
+        return jsonify({
+            'created': result['created'],
+            'errors': result['errors'],
+            'message': f"Created {len(result['created'])} of {len(rows)} users"
+        }), 201 if result['created'] else 400
+    except HasherBusy:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
 @app.route('/api/users/<int:user_id>', methods=['PUT'])
 @require_auth
 @require_role('admin')
@@ -272,11 +396,14 @@ def update_user(user_id):
         
         # Update password if provided
         if 'password' in data and data['password']:
-            user.password_hash = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+            user.password_hash = hash_password(data['password'])
         
         user.updated_at = datetime.now()
         db.commit()
         
+        # Role or active flag may have changed; cached sessions must re-resolve
+        invalidate_user_sessions(user_id)
+        
         return jsonify({
             'id': user.id,
             'username': user.username,
@@ -285,6 +412,9 @@ def update_user(user_id):
             'is_active': user.is_active,
             'message': 'User updated successfully'
         })
+    except HasherBusy:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         return jsonify({'error': str(e)}), 500
@@ -306,6 +436,7 @@ def delete_user(user_id):
         user.is_active = False
         user.updated_at = datetime.now()
         db.commit()
+        invalidate_user_sessions(user_id)
         
         return jsonify({'message': 'User deactivated successfully'})
     except Exception as e:
@@ -426,9 +557,8 @@ def system_config():
             # Update configuration
             data = request.get_json()
             
-            # Update each configuration key
-            for key, value in data.items():
-                SystemConfig.set_config_value(db, key, str(value))
+            # Update all configuration keys in one transaction
+            SystemConfig.set_many(db, {key: str(value) for key, value in data.items()})
             
             return jsonify({'message': 'System configuration updated successfully'})
             
@@ -543,28 +673,41 @@ def test_letta_connection():
 @require_auth
 def get_agents():
     """Get available agents for the current user"""
-    db = next(get_db())
-    try:
-        user_id = session.get('user_id')
-        user_role = session.get('role')
-        
-        # Get agents visible to the current user
-        agents = get_agents_visible_to_user(user_id, user_role, db)
-        
-        # Convert to JSON-serializable format
-        agent_list = []
-        for agent in agents:
-            agent_list.append({
-                'id': agent.id,
-                'name': agent.name,
-                'description': agent.description,
-                'status': agent.status,
-                'letta_uid': agent.letta_uid
-            })
-        
-        return jsonify(agent_list)
-    finally:
-        db.close()
+    user_id = session.get('user_id')
+    user_role = session.get('role')
+    
+    def load_agent_list():
+        db = next(get_db())
+        try:
+            # Get agents visible to the current user
+            agents = get_agents_visible_to_user(user_id, user_role, db)
+            
+            # Convert to JSON-serializable format
+            agent_list = []
+            for agent in agents:
+                agent_list.append({
+                    'id': agent.id,
+                    'name': agent.name,
+                    'description': agent.description,
+                    'status': agent.status,
+                    'letta_uid': agent.letta_uid
+                })
+            return json.dumps(agent_list)
+        finally:
+            db.close()
+    
+    # Admins all see the same list; everyone else's depends on id and role
+    key = ('admin',) if user_role == 'admin' else (user_id, user_role)
+    etag, body = get_agent_catalog_cache().get(key, load_agent_list)
+    
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Browsers may keep the list but must revalidate it on every load
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @app.route('/api/tools')
 @require_auth
@@ -640,12 +783,17 @@ def update_agent(agent_id):
             agent.status = data['status']
         if 'is_active' in data:
             agent.is_active = data['is_active']
+        # Stored as JSON text; triggers rebuild the agent_visibility rows from it
         if 'visible_to_users' in data:
-            agent.visible_to_users = data['visible_to_users']
+            value = data['visible_to_users']
+            agent.visible_to_users = json.dumps(value) if isinstance(value, list) else value
         if 'visible_to_roles' in data:
-            agent.visible_to_roles = data['visible_to_roles']
+            value = data['visible_to_roles']
+            agent.visible_to_roles = json.dumps(value) if isinstance(value, list) else value
         
         db.commit()
+        # Triggers bumped the shared agents version; drop this process's cached lists now
+        mark_changed(AGENTS_VERSION)
         return jsonify({'message': 'Agent updated successfully'})
     except Exception as e:
         db.rollback()
@@ -664,5 +812,97 @@ def cleanup_sessions():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/backup-restore')
+@require_auth
+@require_role('admin')
+def backup_restore():
+    """Backup & Restore interface"""
+    return render_template('backup_restore.html')
+
+@app.route('/api/backups', methods=['GET'])
+@require_auth
+@require_role('admin')
+def list_backups():
+    """List database snapshots, newest first (admin only)"""
+    manager = get_backup_manager()
+    return jsonify({
+        'backups': manager.list_backups(),
+        'keep': manager.keep,
+        'compression': manager.compression
+    })
+
+@app.route('/api/backups', methods=['POST'])
+@require_auth
+@require_role('admin')
+def create_backup():
+    """Take an online snapshot of the database (admin only)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        manifest = get_backup_manager().create_backup(data.get('label') or None, data.get('compression'))
+    except BackupError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(manifest), 201
+
+@app.route('/api/backups/<name>/verify', methods=['POST'])
+@require_auth
+@require_role('admin')
+def verify_backup(name):
+    """Re-check a snapshot's checksum and integrity (admin only)"""
+    try:
+        manifest = get_backup_manager().verify_backup(name)
+    except BackupError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify(manifest), 200 if manifest['integrity'] == 'ok' else 422
+
+@app.route('/api/backups/<name>/restore', methods=['POST'])
+@require_auth
+@require_role('admin')
+def restore_backup(name):
+    """Replace the live database contents with a snapshot (admin only)"""
+    from utils.database import get_database_manager
+    data = request.get_json(silent=True) or {}
+    try:
+        result = get_backup_manager().restore_backup(
+            name, get_database_manager(), safety_backup=data.get('safety_backup', True) is not False)
+    except BackupError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    # Cached logins may belong to users the snapshot does not have; other
+    # workers drop theirs within SESSION_CACHE_TTL
+    clear_session_cache()
+    return jsonify(result)
+
+@app.route('/api/backups/<name>/download')
+@require_auth
+@require_role('admin')
+def download_backup(name):
+    """Download a snapshot file (admin only)"""
+    try:
+        path = get_backup_manager().snapshot_path(name)
+    except BackupError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    return send_from_directory(os.path.dirname(path), os.path.basename(path), as_attachment=True)
+
+@app.route('/api/backups/<name>', methods=['DELETE'])
+@require_auth
+@require_role('admin')
+def delete_backup(name):
+    """Delete a snapshot (admin only)"""
+    try:
+        get_backup_manager().delete_backup(name)
+    except BackupError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify({'message': f'Backup {name} deleted'})
+
 if __name__ == '__main__':
+    # With debug=True the reloader's parent only watches files; start up in the serving child
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        create_app()
     app.run(host='127.0.0.1', port=5000, debug=True)
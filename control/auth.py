@@ -21,23 +21,39 @@ Authentication module for Sanctum UI
 Handles user login, session management, and password hashing
 """
 
-import bcrypt
 import secrets
 import string
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
-from flask import request, session
+from flask import request, session, g, current_app, has_app_context
 from functools import wraps
 from models import User, UserSession, get_db
+from utils.password_hashing import HasherBusy, bcrypt_check, bcrypt_hash, get_password_hasher
+
+# Defaults for the resolved-session cache (overridable via app config)
+SESSION_CACHE_TTL = 60  # seconds; also bounds how long other workers see stale roles
+SESSION_CACHE_MAX_ENTRIES = 10000
+
+# Plain snapshot of the session's user, safe to use after the DB session closes
+SessionUser = namedtuple('SessionUser', ['id', 'username', 'email', 'role', 'is_active', 'session_expires_at'])
+
+_session_cache = OrderedDict()  # token -> (SessionUser, cache deadline on the monotonic clock)
+_session_cache_lock = threading.Lock()
 
 def hash_password(password: str) -> str:
-    """Hash a password using bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    """Hash a password using bcrypt (on the app's hashing pool when inside the app)"""
+    if has_app_context():
+        return get_password_hasher().hash(password)
+    return bcrypt_hash(password)
 
 def verify_password(password: str, hashed: str) -> bool:
     """Verify a password against its hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    if has_app_context():
+        return get_password_hasher().verify(password, hashed)
+    return bcrypt_check(password, hashed)
 
 def generate_session_token() -> str:
     """Generate a secure random session token"""
@@ -71,6 +87,8 @@ def authenticate_user(username: str, password: str) -> Tuple[bool, Optional[dict
     
     Returns:
         Tuple of (success, user_dict, error_message)
+    
+    Raises HasherBusy when the password hashing pool is saturated.
     """
     db = next(get_db())
     
@@ -98,6 +116,13 @@ def authenticate_user(username: str, password: str) -> Tuple[bool, Optional[dict
         # Reset failed login attempts on successful login
         user.failed_login_attempts = 0
         user.last_login = datetime.utcnow()
+        
+        # Upgrade hashes made with an older cost factor while we have the password
+        if has_app_context() and get_password_hasher().needs_rehash(user.password_hash):
+            try:
+                user.password_hash = hash_password(password)
+            except HasherBusy:
+                pass  # keep the old hash; the next login retries
         db.commit()
         
         # Return user data as dictionary to avoid detached instance issues
@@ -114,6 +139,9 @@ def authenticate_user(username: str, password: str) -> Tuple[bool, Optional[dict
         
         return True, user_dict, ""
         
+    except HasherBusy:
+        db.rollback()
+        raise
     except Exception as e:
         db.rollback()
         return False, None, f"Authentication error: {str(e)}"
@@ -125,32 +153,124 @@ def get_user_by_session_token(token: str) -> Optional[User]:
     db = next(get_db())
     
     try:
-        session_obj = db.query(UserSession).filter(
+        # Join instead of lazy-loading session_obj.user, which fails once db is closed
+        return db.query(User).join(UserSession, UserSession.user_id == User.id).filter(
             UserSession.session_token == token,
             UserSession.expires_at > datetime.utcnow()
         ).first()
         
-        if session_obj:
-            return session_obj.user
-        return None
+    finally:
+        db.close()
+
+def _load_session_user(token: str) -> Optional[SessionUser]:
+    """Fetch an unexpired session and its active user in one joined query"""
+    db = next(get_db())
+    
+    try:
+        row = db.query(
+            User.id, User.username, User.email, User.role, User.is_active, UserSession.expires_at
+        ).join(UserSession, UserSession.user_id == User.id).filter(
+            UserSession.session_token == token,
+            UserSession.expires_at > datetime.utcnow(),
+            User.is_active == True
+        ).first()
         
+        return SessionUser(*row) if row else None
+        
+    finally:
+        db.close()
+
+def resolve_session(token: str) -> Optional[SessionUser]:
+    """
+    Resolve a web session token to its user.
+    
+    Memoized per request in flask.g and cached per token for SESSION_CACHE_TTL
+    seconds, never past the session's expires_at.
+    """
+    if not token:
+        return None
+    
+    memo = g.get('session_user')
+    if memo is not None and memo[0] == token:
+        return memo[1]
+    
+    now = time.monotonic()
+    with _session_cache_lock:
+        cached = _session_cache.get(token)
+        if cached is not None and cached[1] > now:
+            _session_cache.move_to_end(token)
+            user = cached[0]
+        else:
+            _session_cache.pop(token, None)
+            user = None
+    
+    if user is None:
+        user = _load_session_user(token)
+        if user is not None:
+            ttl = current_app.config.get('SESSION_CACHE_TTL', SESSION_CACHE_TTL)
+            remaining = (user.session_expires_at - datetime.utcnow()).total_seconds()
+            max_entries = current_app.config.get('SESSION_CACHE_MAX_ENTRIES', SESSION_CACHE_MAX_ENTRIES)
+            with _session_cache_lock:
+                _session_cache[token] = (user, now + min(ttl, remaining))
+                while len(_session_cache) > max_entries:
+                    _session_cache.popitem(last=False)
+    
+    g.session_user = (token, user)
+    return user
+
+def invalidate_session(token: str):
+    """Drop a token from the session cache"""
+    with _session_cache_lock:
+        _session_cache.pop(token, None)
+    memo = g.get('session_user')
+    if memo is not None and memo[0] == token:
+        g.pop('session_user')
+
+def invalidate_user_sessions(user_id: int):
+    """Drop every cached session of a user (role change, deactivation)"""
+    with _session_cache_lock:
+        tokens = [token for token, (user, _) in _session_cache.items() if user.id == user_id]
+        for token in tokens:
+            del _session_cache[token]
+    memo = g.get('session_user')
+    if memo is not None and memo[1] is not None and memo[1].id == user_id:
+        g.pop('session_user')
+
+def clear_session_cache():
+    """Drop every cached session (the database was replaced)"""
+    with _session_cache_lock:
+        _session_cache.clear()
+    g.pop('session_user', None)
+
+def end_user_session(token: str) -> bool:
+    """Delete a session row on logout and evict it from the cache"""
+    invalidate_session(token)
+    if not token:
+        return False
+    
+    db = next(get_db())
+    
+    try:
+        deleted = db.query(UserSession).filter(UserSession.session_token == token).delete()
+        db.commit()
+        return deleted > 0
+    except Exception:
+        db.rollback()
+        return False
     finally:
         db.close()
 
 def cleanup_expired_sessions():
-    """Remove expired sessions from database"""
+    """Remove expired sessions from database (one set-based DELETE)"""
     db = next(get_db())
     
     try:
-        expired_sessions = db.query(UserSession).filter(
+        deleted = db.query(UserSession).filter(
             UserSession.expires_at <= datetime.utcnow()
-        ).all()
-        
-        for expired_session in expired_sessions:
-            db.delete(expired_session)
+        ).delete(synchronize_session=False)
         
         db.commit()
-        return len(expired_sessions)
+        return deleted
         
     except Exception as e:
         db.rollback()
@@ -167,7 +287,7 @@ def require_auth(f):
             return {'error': 'Authentication required'}, 401
         
         # Verify session is still valid
-        user = get_user_by_session_token(session.get('session_token'))
+        user = resolve_session(session.get('session_token'))
         if not user:
             # Clear invalid session
             session.clear()
@@ -185,8 +305,8 @@ def require_role(required_role: str):
             if 'user_id' not in session:
                 return {'error': 'Authentication required'}, 401
             
-            # Verify session is still valid
-            user = get_user_by_session_token(session.get('session_token'))
+            # Verify session is still valid (memoized if require_auth already ran)
+            user = resolve_session(session.get('session_token'))
             if not user:
                 session.clear()
                 return {'error': 'Session expired'}, 401
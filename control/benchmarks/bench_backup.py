@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Online Backup Benchmark
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Measure request latency on the shared database while a snapshot is taken.
+
+Worker threads replay the bridge's hot path (ingest a message, read the
+session's responses) against a seeded throwaway database. Latency is recorded
+with no backup running, then during backups with each --pages setting (-1 is
+a single-step copy). Run from the control/ directory:
+
+    python benchmarks/bench_backup.py --messages 200000 --pages 256 1024 -1
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from models import Base
+from utils.backup import BackupManager
+from utils.database import DatabaseManager
+
+SESSIONS = 200
+
+def make_database(messages):
+    """Seed a throwaway database with chat history"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench_backup_'), 'bench.db')
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    db = DatabaseManager(db_path)
+    with db.transaction() as conn:
+        conn.executemany("INSERT INTO web_chat_sessions (session_id, uid) VALUES (?, ?)",
+                         [(f'session_{i}', f'uid_{i}') for i in range(SESSIONS)])
+        conn.executemany("INSERT INTO web_chat_messages (session_id, message, processed) VALUES (?, ?, 1)",
+                         [(f'session_{i % SESSIONS}', f'message {i} ' + 'x' * 200) for i in range(messages)])
+        conn.executemany("INSERT INTO web_chat_responses (session_id, response) VALUES (?, ?)",
+                         [(f'session_{i % SESSIONS}', f'response {i} ' + 'y' * 200) for i in range(messages)])
+    return db
+
+def worker(db, worker_id, stop, latencies):
+    i = 0
+    while not stop.is_set():
+        session_id = f'session_{(worker_id * 7919 + i) % SESSIONS}'
+        t0 = time.perf_counter()
+        db.ingest_message(session_id, 'benchmark message')
+        db.get_responses_page(session_id, 0, 20)
+        latencies.append(time.perf_counter() - t0)
+        i += 1
+
+def measure(db, workers, duration, backup=None):
+    """Run the workers for duration seconds (or while backup runs); returns latencies and backup result"""
+    stop = threading.Event()
+    latencies = []
+    threads = [threading.Thread(target=worker, args=(db, n, stop, latencies)) for n in range(workers)]
+    for t in threads:
+        t.start()
+    result = None
+    try:
+        time.sleep(0.2)
+        del latencies[:]
+        if backup is None:
+            time.sleep(duration)
+        else:
+            result = backup()
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    return sorted(latencies), result
+
+def percentile(latencies, pct):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * pct))] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100000, help='seeded messages (and responses)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds of baseline load')
+    parser.add_argument('--pages', type=int, nargs='+', default=[256, 1024, -1],
+                        help='pages per backup step (-1: whole database in one step)')
+    parser.add_argument('--compression', default='none', choices=['none', 'gzip', 'zstd'])
+    args = parser.parse_args()
+
+    db = make_database(args.messages)
+    print(f"database: {os.path.getsize(db.db_path) / 1e6:.1f} MB, {args.workers} workers")
+    print(f"{'scenario':<14} {'requests':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9} "
+          f"{'backup (ms)':>12} {'steps':>6} {'restarts':>9}")
+
+    latencies, _ = measure(db, args.workers, args.duration)
+    print(f"{'no backup':<14} {len(latencies):>9} {percentile(latencies, 0.5):>9.2f} "
+          f"{percentile(latencies, 0.95):>9.2f} {percentile(latencies, 0.99):>9.2f} {latencies[-1] * 1000:>9.2f}")
+
+    backup_dir = os.path.join(os.path.dirname(db.db_path), 'backups')
+    for pages in args.pages:
+        manager = BackupManager(db.db_path, backup_dir, keep=1, compression=args.compression,
+                                pages_per_step=pages)
+        latencies, manifest = measure(db, args.workers, args.duration,
+                                      backup=lambda: manager.create_backup(f'bench-{pages}'.replace('--', '-')))
+        copy = manifest['copy']
+        label = 'single step' if pages == -1 else f'{pages} pages'
+        if copy['single_step'] and pages != -1:
+            label += '*'
+        print(f"{label:<14} {len(latencies):>9} {percentile(latencies, 0.5):>9.2f} "
+              f"{percentile(latencies, 0.95):>9.2f} {percentile(latencies, 0.99):>9.2f} {latencies[-1] * 1000:>9.2f} "
+              f"{manifest['copy_ms']:>12.1f} {copy['steps']:>6} {copy['restarts']:>9}")
+        time.sleep(1)  # snapshot names have one-second resolution
+    print("* restarted by concurrent writes and finished as a single-step copy")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Rate Limiting Benchmark
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Compare the shared-memory rate limit backend with the SQLite rate_limits path
+when several worker processes check limits at once.
+
+Each worker process runs --requests checks spread over --ips client IPs, then
+all workers hammer one key with a fixed limit to confirm the limit is enforced
+globally. Run from the control/ directory:
+
+    python benchmarks/bench_rate_limiting.py --workers 1 4 16
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import DatabaseManager
+from utils.rate_limiting import RateLimitManager, SharedMemoryRateLimitBackend
+
+WINDOW = 3600
+
+def make_manager(kind, workdir):
+    """Build a manager for one backend inside a worker process"""
+    if kind == 'shared':
+        backend = SharedMemoryRateLimitBackend(os.path.join(workdir, 'counters.shm'))
+        return RateLimitManager(backend=backend, window_seconds=WINDOW)
+    db = DatabaseManager(os.path.join(workdir, 'bench.db'), pool_size=1)
+    return RateLimitManager(db, backend='sqlite', window_seconds=WINDOW)
+
+def worker(kind, workdir, worker_id, requests, ips, start_event, results):
+    manager = make_manager(kind, workdir)
+    latencies = []
+    start_event.wait()
+    for i in range(requests):
+        ip = f"10.{worker_id % 256}.{(i % ips) // 256}.{i % 256}"
+        t0 = time.perf_counter()
+        manager.check_rate_limit(ip, '/api/inbox', 1_000_000)
+        latencies.append(time.perf_counter() - t0)
+    # Shared key: the total allowed across all workers must equal the limit
+    allowed = sum(manager.check_rate_limit('192.0.2.1', '/api/outbox', 100) for _ in range(50))
+    results.put((latencies, allowed))
+
+def run(kind, workers, requests, ips):
+    workdir = tempfile.mkdtemp(prefix=f'bench_rl_{kind}_')
+    # Create schema / counter file once before the workers race
+    make_manager(kind, workdir)
+    ctx = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+    start_event = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(kind, workdir, n, requests, ips, start_event, results))
+             for n in range(workers)]
+    for p in procs:
+        p.start()
+    time.sleep(0.2)
+    t0 = time.perf_counter()
+    start_event.set()
+    collected = [results.get() for _ in procs]
+    elapsed = time.perf_counter() - t0
+    for p in procs:
+        p.join()
+
+    latencies = sorted(l for lat, _ in collected for l in lat)
+    allowed = sum(a for _, a in collected)
+    return {
+        'throughput': len(latencies) / elapsed,
+        'p50_us': statistics.median(latencies) * 1e6,
+        'p99_us': latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+        'allowed_on_shared_key': allowed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=2000, help='checks per worker')
+    parser.add_argument('--ips', type=int, default=500, help='distinct client IPs per worker')
+    args = parser.parse_args()
+
+    print(f"{'backend':<8} {'workers':>7} {'checks/s':>12} {'p50 (us)':>10} {'p99 (us)':>10} {'shared key (limit 100)':>24}")
+    for workers in args.workers:
+        for kind in ('sqlite', 'shared'):
+            r = run(kind, workers, args.requests, args.ips)
+            print(f"{kind:<8} {workers:>7} {r['throughput']:>12.0f} {r['p50_us']:>10.1f} {r['p99_us']:>10.1f} "
+                  f"{r['allowed_on_shared_key']:>24}")
+
+if __name__ == "__main__":
+    main()
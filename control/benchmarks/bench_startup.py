@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Startup Time Benchmark
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Measure cold start of the control app: a fresh interpreter importing app.py
+until it is ready to serve, as when the installer restarts it.
+
+Each run starts a new Python process, which reports how long the library
+imports (Flask, SQLAlchemy), the app module and create_app() took. Runs use a
+throwaway copy of db/sanctum_ui.db, never the tracked file; the first run may
+apply pending migrations to the copy, so it is reported separately. Run from
+the control/ directory:
+
+    python benchmarks/bench_startup.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+CONTROL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import flask, sqlalchemy, sqlalchemy.orm
+libraries = time.perf_counter()
+import app
+app.create_app({'DATABASE_PATH': sys.argv[1]})
+ready = time.perf_counter()
+print(json.dumps({'libraries': libraries - start, 'app': ready - libraries}))
+"""
+
+def copy_database():
+    """Consistent copy of the tracked database in a temp directory"""
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_startup_'), 'sanctum_ui.db')
+    src = sqlite3.connect(f"file:{os.path.join(CONTROL_DIR, 'db', 'sanctum_ui.db')}?mode=ro", uri=True)
+    dst = sqlite3.connect(path)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    return path
+
+def run_once(db_path):
+    """Start one interpreter; return (wall seconds, phase timings)"""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD, db_path], cwd=CONTROL_DIR,
+                            capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - started
+    return wall, json.loads(result.stdout.strip().splitlines()[-1])
+
+def ms(seconds):
+    return f"{seconds * 1000:8.1f} ms"
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark control app cold start')
+    parser.add_argument('--runs', type=int, default=10, help='Number of fresh interpreters to start')
+    args = parser.parse_args()
+
+    db_path = copy_database()
+    first_wall, first_phases = run_once(db_path)
+    print(f"First start (may migrate): {ms(first_wall)}  (app module {ms(first_phases['app']).strip()})")
+
+    walls, libraries, apps = [], [], []
+    for _ in range(args.runs):
+        wall, phases = run_once(db_path)
+        walls.append(wall)
+        libraries.append(phases['libraries'])
+        apps.append(phases['app'])
+
+    print(f"\n{'phase':<22}{'median':>11}{'min':>11}{'max':>11}")
+    for label, values in (('process wall time', walls),
+                          ('flask + sqlalchemy', libraries),
+                          ('import app + create_app', apps)):
+        print(f"{label:<22}{ms(statistics.median(values))}{ms(min(values))}{ms(max(values))}")
+
+if __name__ == "__main__":
+    main()
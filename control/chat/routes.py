@@ -1,13 +1,14 @@
 from flask import Blueprint, request, jsonify, render_template, current_app
-from utils.database import DatabaseManager
+from utils.database import get_database_manager
+from utils.streaming import session_response_stream
 from datetime import datetime
 import json
 
 bp = Blueprint('chat', __name__)
 
 def get_db():
-    """Get database manager instance"""
-    return DatabaseManager()
+    """Get the app-scoped database manager instance"""
+    return get_database_manager()
 
 @bp.route('/')
 def chat_interface():
@@ -38,23 +39,17 @@ def send_message():
     try:
         db = get_db()
         
-        # Create/update session if doesn't exist
-        if not db.session_exists(session_id):
-            db.create_session(session_id, request.remote_addr, request.headers.get('User-Agent'))
-        
-        # Store message
-        message_id = db.create_message(session_id, message)
-        
-        # Get or create UID
-        uid_data = db.get_or_create_uid(session_id, request.remote_addr)
+        # Create/update session and store message in one transaction
+        result = db.ingest_message(session_id, message, request.remote_addr,
+                                   request.headers.get('User-Agent'))
         
         return jsonify({
             'success': True,
             'message': 'Success',
             'data': {
-                'message_id': message_id,
+                'message_id': result['message_id'],
                 'session_id': session_id,
-                'uid': uid_data['uid']
+                'uid': result['uid']
             }
         })
         
@@ -73,6 +68,30 @@ def get_responses():
     try:
         db = get_db()
         
+        # Cursor mode: only responses with id > after_id, one bounded page at a time
+        if 'after_id' in request.args:
+            try:
+                after_id = max(int(request.args.get('after_id') or 0), 0)
+                limit = min(max(int(request.args.get('limit', 50)), 1), 100)
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Invalid pagination parameters'}), 400
+            
+            page = db.get_responses_page(session_id, after_id, limit)
+            return jsonify({
+                'success': True,
+                'message': 'Success',
+                'data': {
+                    'session_id': session_id,
+                    'responses': page['responses'],
+                    'pagination': {
+                        'limit': limit,
+                        'after_id': after_id,
+                        'next_cursor': page['next_cursor'],
+                        'has_more': page['has_more']
+                    }
+                }
+            })
+        
         # Create session if doesn't exist
         if not db.session_exists(session_id):
             db.create_session(session_id, request.remote_addr, request.headers.get('User-Agent'))
@@ -90,3 +109,21 @@ def get_responses():
         
     except Exception as e:
         return jsonify({'success': False, 'error': 'Internal server error'}), 500
+
+@bp.route('/api/stream_responses', methods=['GET'])
+def stream_responses():
+    """Stream responses for a session as Server-Sent Events"""
+    session_id = request.args.get('session_id')
+    
+    if not session_id:
+        return jsonify({'success': False, 'error': 'Missing session_id'}), 400
+    
+    try:
+        after_id = int(request.headers.get('Last-Event-ID') or request.args.get('after_id', 0) or 0)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid after_id'}), 400
+    
+    response = session_response_stream(get_db(), session_id, after_id)
+    if response is None:
+        return jsonify({'success': False, 'error': 'Too many open streams'}), 503
+    return response
@@ -74,9 +74,9 @@ CREATE TABLE IF NOT EXISTS rate_limits (
 );
 
 -- Note: Indexes for main application tables are created by SQLAlchemy
--- This file only creates chat-specific tables and their indexes
-
--- Note: system_config indexes are not needed for basic functionality
+-- Indexes for the chat and rate limiting tables (and later columns) are added
+-- by the versioned migrations in utils/migrations.py, applied at startup or
+-- with `python migrate.py`
 
 -- Note: Default data (admin user, system config, schema version) 
 -- is inserted by init_database.py via SQLAlchemy models
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Bulk User Import Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Create users in bulk from a CSV or JSON file (same format as POST /api/users/bulk)
+
+CSV needs a header row: username,email[,role,password,permissions]. JSON is an
+array of objects with the same keys, or {"users": [...]}. Passwords are hashed
+on every core; each chunk of rows is checked and inserted in one transaction.
+
+Usage:
+    python import_users.py team.csv
+    python import_users.py team.json --default-password 'Welcome-2025'
+    python import_users.py team.csv --db other.db --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from models import configure_engine, get_db
+from utils.password_hashing import DEFAULT_ROUNDS, PasswordHasher
+from utils.user_import import DEFAULT_PASSWORD, MAX_IMPORT_ROWS, import_users, parse_csv, parse_json
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db', 'sanctum_ui.db')
+
+def read_rows(path, fmt):
+    """Parse the input file as CSV or JSON (by --format, else by extension)"""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'json')
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            return parse_csv(f.read())
+        return parse_json(json.load(f))
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import Sanctum users')
+    parser.add_argument('file', help='CSV or JSON file of users')
+    parser.add_argument('--format', choices=['csv', 'json'], help='Input format (default: from the file extension)')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Path to the SQLite database')
+    parser.add_argument('--default-password', default=DEFAULT_PASSWORD, help='Password for rows without one')
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS, help='bcrypt cost factor')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Hashing threads')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found at {args.db} (run init_database.py first)")
+        return 1
+
+    try:
+        rows = read_rows(args.file, args.format)
+    except (OSError, ValueError) as e:  # ImportFormatError and JSON errors are ValueErrors
+        print(f"❌ Could not read {args.file}: {e}")
+        return 1
+
+    configure_engine(args.db)
+    hasher = PasswordHasher(workers=args.workers, max_queue=args.workers, rounds=args.rounds, timeout=None)
+    created, errors = 0, []
+    print(f"🚀 Importing {len(rows)} users into {args.db}...")
+    try:
+        for start in range(0, len(rows), MAX_IMPORT_ROWS):
+            db = next(get_db())
+            try:
+                result = import_users(db, rows[start:start + MAX_IMPORT_ROWS], hasher.hash_many,
+                                      args.default_password, first_row=start + 1)
+            finally:
+                db.close()
+            created += len(result['created'])
+            errors.extend(result['errors'])
+    finally:
+        hasher.shutdown()
+
+    for error in errors:
+        print(f"   ⚠️  Row {error['row']}: {error['error']}")
+    print(f"✅ Created {created} of {len(rows)} users")
+    return 0 if not errors else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
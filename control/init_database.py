@@ -23,7 +23,9 @@ Initialize the database with the new system_config table
 
 import os
 import sys
-from models import init_db, get_db, User, SystemConfig, SchemaVersion
+import sqlite3
+from models import init_db, get_db, get_current_schema_version, User, SystemConfig, SchemaVersion
+from utils.migrations import migrate, skipped_migrations, BASELINE_VERSION, LATEST_VERSION
 import bcrypt
 
 def init_database():
@@ -32,19 +34,17 @@ def init_database():
     
     # Create tables
     print("📋 Creating database tables...")
-    init_db()
+    init_db(force=True)
     
     # Execute SQL file to create chat tables and rate limiting tables
     print("📋 Creating chat and rate limiting tables...")
-    import sqlite3
-    import os
     
     # Get the path to the SQL file
     sql_file_path = os.path.join(os.path.dirname(__file__), 'db', 'init_database.sql')
+    db_path = os.path.join(os.path.dirname(__file__), 'db', 'sanctum_ui.db')
     
     if os.path.exists(sql_file_path):
         # Connect to the database
-        db_path = os.path.join(os.path.dirname(__file__), 'db', 'sanctum_ui.db')
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
@@ -121,10 +121,10 @@ def init_database():
             print("ℹ️  System configuration already exists")
         
         # Check if schema version exists
-        schema_version = db.query(SchemaVersion).first()
+        schema_version = db.query(SchemaVersion).filter(SchemaVersion.version == BASELINE_VERSION).first()
         if not schema_version:
             print("📊 Setting schema version...")
-            schema_version = SchemaVersion(version=1, description='Initial MVP schema: users, user_sessions, agents, system_config')
+            schema_version = SchemaVersion(version=BASELINE_VERSION, description='Initial MVP schema: users, user_sessions, agents, system_config')
             db.add(schema_version)
             print("✅ Schema version set")
         else:
@@ -132,13 +132,25 @@ def init_database():
         
         # Commit all changes
         db.commit()
+        
+        # Apply versioned migrations (indexes, columns added after the baseline schema)
+        print("📋 Applying schema migrations...")
+        conn = sqlite3.connect(db_path)
+        try:
+            applied = migrate(conn, log=lambda line: print(f"   {line}"))
+            skipped = skipped_migrations(conn)
+        finally:
+            conn.close()
+        for version, reason in skipped.items():
+            print(f"   ⏭️  Migration {version} skipped: {reason}")
+        print(f"✅ Schema at version {LATEST_VERSION} ({len(applied)} migration(s) applied, {len(skipped)} skipped)")
         print("💾 Database initialization completed successfully!")
         
         # Display summary
         print("\n📋 Database Summary:")
         print(f"   Users: {db.query(User).count()}")
         print(f"   System Config Entries: {db.query(SystemConfig).count()}")
-        print(f"   Schema Version: {db.query(SchemaVersion).count()}")
+        print(f"   Schema Version: {get_current_schema_version()}")
         
         if admin_user:
             print(f"\n🔑 Admin Login:")
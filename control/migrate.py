@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Schema Migration Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Apply pending schema migrations offline (the app also applies them at startup)
+
+Usage:
+    python migrate.py                 # migrate db/sanctum_ui.db to the latest version
+    python migrate.py --status        # show applied and pending migrations
+    python migrate.py --target 3      # migrate up to a specific version
+    python migrate.py --db other.db   # use another database file
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.migrations import MigrationError, LATEST_VERSION, current_version, migrate, pending_migrations, skipped_migrations
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db', 'sanctum_ui.db')
+
+def show_status(conn):
+    """Print the current version and any pending migrations"""
+    print(f"📊 Schema version: {current_version(conn)} (latest: {LATEST_VERSION})")
+    pending = pending_migrations(conn)
+    if not pending:
+        print("✅ No pending migrations")
+    skipped = skipped_migrations(conn)
+    for migration in pending:
+        reason = f" (skipped: {skipped[migration.version]})" if migration.version in skipped else ''
+        print(f"   ⏳ {migration.version}: {migration.description}{reason}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply Sanctum schema migrations')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='Path to the SQLite database')
+    parser.add_argument('--status', action='store_true', help='Show pending migrations without applying them')
+    parser.add_argument('--target', type=int, help='Migrate up to this version (default: latest)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"❌ Database not found at {args.db} (run init_database.py first)")
+        return 1
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if args.status:
+            show_status(conn)
+            return 0
+
+        print(f"🚀 Migrating {args.db}...")
+        applied = migrate(conn, args.target, log=lambda line: print(f"   ✅ {line}"))
+        if not applied:
+            print("ℹ️  Already up to date")
+        for version, reason in skipped_migrations(conn).items():
+            print(f"   ⏭️  {version} skipped: {reason}")
+        print(f"📊 Schema version: {current_version(conn)}")
+        return 0
+    except MigrationError as e:
+        print(f"❌ Migration halted: {e}")
+        return 1
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -20,20 +20,64 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 SQLAlchemy models for Sanctum UI database
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, Text, DateTime, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, Text, DateTime, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.sql import func
+from sqlalchemy import text, bindparam, or_, and_, column
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import OperationalError
 from datetime import datetime
 import json
+import os
+import threading
+from utils.sqlite_config import install_sqlalchemy_pragmas
+from utils import cache_versions, migrations
 
 # Database configuration
-DB_PATH = 'db/sanctum_ui.db'  # Relative to control/ directory
+CONTROL_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(CONTROL_DIR, 'db', 'sanctum_ui.db')  # Independent of the working directory
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-# Create engine and session
-engine = create_engine(DATABASE_URL, echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The engine is created on first use, so importing models opens no database
+_engine = None
+_engine_lock = threading.Lock()
+_engine_options = {'path': DB_PATH, 'pragmas': None}
+ENGINE_PRAGMAS = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def resolve_db_path(path):
+    """Resolve a database path; relative paths are taken from the control/ directory"""
+    return path if os.path.isabs(path) else os.path.join(CONTROL_DIR, path)
+
+def configure_engine(database_path=None, pragmas=None):
+    """Set the database file and PRAGMA overrides; takes effect when the engine is first created"""
+    path = resolve_db_path(database_path) if database_path else _engine_options['path']
+    if _engine is not None:
+        if path != _engine_options['path']:
+            raise RuntimeError("configure_engine() must be called before the engine is first used")
+        return
+    _engine_options['path'] = path
+    _engine_options['pragmas'] = pragmas
+
+def get_engine():
+    """Get the shared engine, creating it on first use"""
+    global _engine, ENGINE_PRAGMAS
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(f"sqlite:///{_engine_options['path']}", echo=False)
+                # WAL, busy_timeout etc. shared with the bridge's raw sqlite3 pool
+                ENGINE_PRAGMAS = install_sqlalchemy_pragmas(engine, _engine_options['pragmas'])
+                SessionLocal.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+def __getattr__(name):
+    # Keeps `from models import engine` working without creating the engine at import time
+    if name == 'engine':
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Base class for models
 Base = declarative_base()
@@ -108,6 +152,20 @@ class Agent(Base):
         except json.JSONDecodeError:
             return {}
 
+class AgentVisibility(Base):
+    """Normalized Agent.visible_to_users / visible_to_roles, kept in step by triggers
+    
+    One row per listed user id ('user') or role ('role'); agents without
+    restrictions get a single ('role', '*') row. See utils/migrations.py.
+    """
+    __tablename__ = "agent_visibility"
+    
+    __table_args__ = (Index('idx_agent_visibility_agent_id', 'agent_id'),)
+    
+    kind = Column(String(10), primary_key=True)
+    principal = Column(Text, primary_key=True)
+    agent_id = Column(Integer, primary_key=True)
+
 class SystemConfig(Base):
     __tablename__ = 'system_config'
     
@@ -151,15 +209,58 @@ class SystemConfig(Base):
         else:
             config = cls(config_key=key, config_value=value, description=description)
             db.add(config)
+        bump_cache_version(db, cache_versions.CONFIG_VERSION)
         db.commit()
+        cache_versions.mark_changed(cache_versions.CONFIG_VERSION)
         return config
     
+    @classmethod
+    def set_many(cls, db, values, descriptions=None):
+        """Upsert many configuration values in one commit with one config version bump"""
+        if not values:
+            return
+        descriptions = descriptions or {}
+        stmt = sqlite_insert(cls).values(
+            config_key=bindparam('key'),
+            config_value=bindparam('value'),
+            description=bindparam('description'),
+            created_at=func.now(),
+            updated_at=func.now()
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.config_key],
+            set_={
+                'config_value': stmt.excluded.config_value,
+                'description': func.coalesce(stmt.excluded.description, cls.description),
+                'updated_at': func.now()
+            }
+        )
+        db.execute(stmt, [
+            {'key': key, 'value': value, 'description': descriptions.get(key)}
+            for key, value in values.items()
+        ])
+        bump_cache_version(db, cache_versions.CONFIG_VERSION)
+        db.commit()
+        cache_versions.mark_changed(cache_versions.CONFIG_VERSION)
+    
     @classmethod
     def get_config_value(cls, db, key, default=None):
         """Get a configuration value"""
         config = db.query(cls).filter(cls.config_key == key).first()
         return config.config_value if config else default
 
+class CacheVersion(Base):
+    """Change counters used to invalidate in-process caches (see utils/cache_versions.py)"""
+    __tablename__ = "cache_versions"
+    
+    name = Column(Text, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=func.now())
+
+def bump_cache_version(db, name):
+    """Bump a shared cache version inside the session's current transaction"""
+    db.execute(text(cache_versions.BUMP_SQL), {'name': name})
+
 class SchemaVersion(Base):
     """Schema version tracking for migrations"""
     __tablename__ = "schema_version"
@@ -171,18 +272,33 @@ class SchemaVersion(Base):
 # Database utility functions
 def get_db():
     """Get database session"""
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
-def init_db():
-    """Initialize database tables"""
-    Base.metadata.create_all(bind=engine)
+def schema_is_current():
+    """True when the baseline schema and every migration are recorded (one query)"""
+    try:
+        with get_engine().connect() as conn:
+            lowest, applied = conn.execute(text(
+                "SELECT MIN(version), SUM(version > :baseline AND version <= :latest) FROM schema_version"
+            ), {'baseline': migrations.BASELINE_VERSION, 'latest': migrations.LATEST_VERSION}).one()
+    except OperationalError:
+        return False
+    return lowest == migrations.BASELINE_VERSION and (applied or 0) >= len(migrations.MIGRATIONS)
+
+def init_db(force=False):
+    """Initialize database tables (skipped when the schema version is already current)"""
+    if not force and schema_is_current():
+        return
+    Base.metadata.create_all(bind=get_engine())
 
 def get_current_schema_version():
     """Get current schema version"""
+    get_engine()
     db = SessionLocal()
     try:
         version = db.query(SchemaVersion).order_by(SchemaVersion.version.desc()).first()
@@ -192,12 +308,59 @@ def get_current_schema_version():
 
 def get_agents_visible_to_user(user_id, user_role, db):
     """
-    Get agents visible to a specific user based on their role and permissions.
-    This is a placeholder implementation - expand based on your visibility logic.
+    Get active agents visible to a user: admins see all agents; others see
+    agents listing their user id or role, plus unrestricted agents.
     """
+    query = db.query(Agent).filter(Agent.is_active == True)
     if user_role == 'admin':
         # Admins see all agents
-        return db.query(Agent).filter(Agent.is_active == True).all()
+        return query.order_by(Agent.id).all()
+    
+    # One indexed lookup on agent_visibility's (kind, principal) key
+    visible = db.query(AgentVisibility.agent_id).filter(or_(
+        and_(AgentVisibility.kind == 'role', AgentVisibility.principal.in_([user_role or '', '*'])),
+        and_(AgentVisibility.kind == 'user', AgentVisibility.principal == str(user_id))
+    ))
+    return query.filter(Agent.id.in_(visible)).order_by(Agent.id).all()
+
+# Trigram index needs 3+ characters; shorter terms use a prefix LIKE instead
+USER_SEARCH_MIN_FTS = 3
+
+def _like_escape(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def search_users(db, search='', role='', after_id=0, limit=100):
+    """
+    Keyset page of active users ordered by id; returns (users, next_cursor).
+
+    Terms of 3+ characters match anywhere in username/email via users_fts;
+    shorter ones match as a prefix. next_cursor is None on the last page.
+    """
+    query = db.query(User).filter(User.is_active == True, User.id > after_id)
+    if role:
+        query = query.filter(User.role == role)
+
+    def page(*criteria):
+        return query.filter(*criteria).order_by(User.id).limit(limit + 1).all()
+
+    def like(pattern):
+        return or_(User.username.like(pattern, escape='\\'), User.email.like(pattern, escape='\\'))
+
+    if len(search) >= USER_SEARCH_MIN_FTS:
+        # Quoted as one FTS string, so operators in the term are matched literally
+        phrase = '"' + search.replace('"', '""') + '"'
+        matches = text("SELECT rowid FROM users_fts WHERE users_fts MATCH :phrase") \
+            .bindparams(phrase=phrase).columns(column('rowid'))
+        try:
+            users = page(User.id.in_(matches))
+        except OperationalError:
+            # No users_fts on this database (SQLite built without FTS5 trigram)
+            db.rollback()
+            users = page(like(f'%{_like_escape(search)}%'))
+    elif search:
+        users = page(like(f'{_like_escape(search)}%'))
     else:
-        # Regular users see active agents (expand this logic as needed)
-        return db.query(Agent).filter(Agent.is_active == True).all()
+        users = page()
+
+    next_cursor = users[limit - 1].id if len(users) > limit else None
+    return users[:limit], next_cursor
@@ -0,0 +1,164 @@
+/**
+ * Sanctum Control Interface - Backup & Restore JavaScript
+ * Copyright (c) 2025 Mark Rizzn Hopkins
+ *
+ * This program is free software: you can redistribute it and/or modify
+ * it under the terms of the GNU Affero General Public License as published by
+ * the Free Software Foundation, either version 3 of the License, or
+ * (at your option) any later version.
+ *
+ * This program is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+ * GNU Affero General Public License for more details.
+ *
+ * You should have received a copy of the GNU Affero General Public License
+ * along with this program.  If not, see <https://www.gnu.org/licenses/>.
+ */
+
+// Backup & Restore JavaScript
+document.addEventListener('DOMContentLoaded', function() {
+    document.getElementById('backupForm').addEventListener('submit', handleCreateBackup);
+    document.getElementById('refreshBackups').addEventListener('click', loadBackups);
+    loadBackups();
+});
+
+async function loadBackups() {
+    const tbody = document.getElementById('backupTableBody');
+    try {
+        const response = await fetch('/api/backups');
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Failed to load backups');
+        }
+        document.getElementById('backupKeep').textContent = data.keep;
+        document.getElementById('backupCompression').value = data.compression;
+        if (data.backups.length === 0) {
+            tbody.innerHTML = '<tr><td colspan="6" class="text-center text-muted">No backups yet</td></tr>';
+            return;
+        }
+        tbody.innerHTML = data.backups.map(backupRowHtml).join('');
+    } catch (error) {
+        tbody.innerHTML = `<tr><td colspan="6" class="text-center text-danger">${error.message}</td></tr>`;
+    }
+}
+
+function backupRowHtml(backup) {
+    const healthy = backup.integrity === 'ok';
+    return `
+        <tr>
+            <td class="text-light"><code>${backup.name}</code></td>
+            <td class="text-light">${new Date(backup.created_at).toLocaleString()}</td>
+            <td class="text-light">${formatBytes(backup.file_bytes)} <small class="text-muted">(${formatBytes(backup.database_bytes)} raw)</small></td>
+            <td><span class="badge ${healthy ? 'bg-success' : 'bg-danger'}" title="${backup.integrity}">${healthy ? 'OK' : 'Failed'}</span></td>
+            <td class="text-light">${backup.copy_ms} ms</td>
+            <td>
+                <a href="/api/backups/${backup.name}/download" class="btn btn-sm btn-outline-info">Download</a>
+                <button class="btn btn-sm btn-outline-secondary" onclick="verifyBackup('${backup.name}')">Verify</button>
+                <button class="btn btn-sm btn-outline-warning" onclick="restoreBackup('${backup.name}')">Restore</button>
+                <button class="btn btn-sm btn-outline-danger" onclick="deleteBackup('${backup.name}')">Delete</button>
+            </td>
+        </tr>
+    `;
+}
+
+async function handleCreateBackup(event) {
+    event.preventDefault();
+    const button = document.getElementById('createBackupBtn');
+    const spinner = button.querySelector('.spinner-border');
+    button.disabled = true;
+    spinner.classList.remove('d-none');
+    try {
+        const response = await fetch('/api/backups', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({
+                label: document.getElementById('backupLabel').value.trim(),
+                compression: document.getElementById('backupCompression').value
+            })
+        });
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || 'Backup failed');
+        }
+        showAlert('success', `Backup ${result.name} created in ${result.duration_ms} ms`);
+        document.getElementById('backupLabel').value = '';
+        loadBackups();
+    } catch (error) {
+        showAlert('danger', error.message);
+    } finally {
+        button.disabled = false;
+        spinner.classList.add('d-none');
+    }
+}
+
+async function verifyBackup(name) {
+    try {
+        const response = await fetch(`/api/backups/${name}/verify`, {method: 'POST'});
+        const result = await response.json();
+        if (response.ok) {
+            showAlert('success', `Backup ${name} verified`);
+        } else {
+            showAlert('danger', result.error || `Backup ${name} failed verification: ${result.integrity}`);
+        }
+        loadBackups();
+    } catch (error) {
+        showAlert('danger', error.message);
+    }
+}
+
+async function restoreBackup(name) {
+    if (!confirm(`Replace the current database with ${name}? A pre-restore snapshot is taken first.`)) {
+        return;
+    }
+    try {
+        const response = await fetch(`/api/backups/${name}/restore`, {method: 'POST'});
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || 'Restore failed');
+        }
+        showAlert('success', `Restored ${name} in ${result.duration_ms} ms`);
+        loadBackups();
+    } catch (error) {
+        showAlert('danger', error.message);
+    }
+}
+
+async function deleteBackup(name) {
+    if (!confirm(`Delete backup ${name}?`)) {
+        return;
+    }
+    try {
+        const response = await fetch(`/api/backups/${name}`, {method: 'DELETE'});
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.error || 'Delete failed');
+        }
+        loadBackups();
+    } catch (error) {
+        showAlert('danger', error.message);
+    }
+}
+
+function formatBytes(bytes) {
+    if (bytes < 1024) return `${bytes} B`;
+    if (bytes < 1024 * 1024) return `${(bytes / 1024).toFixed(1)} KB`;
+    return `${(bytes / (1024 * 1024)).toFixed(1)} MB`;
+}
+
+// Helper function to show alerts
+function showAlert(type, message) {
+    const alertDiv = document.createElement('div');
+    alertDiv.className = `alert alert-${type} alert-dismissible fade show`;
+    alertDiv.innerHTML = `
+        ${message}
+        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+    `;
+    const main = document.querySelector('main');
+    main.insertBefore(alertDiv, main.firstChild);
+    setTimeout(() => {
+        if (alertDiv.parentNode) {
+            alertDiv.remove();
+        }
+    }, 5000);
+}
@@ -118,9 +118,6 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Load user's agents on page load
     loadUserAgents();
-    
-    // Start polling for new messages from the working Flask system
-    startMessagePolling();
 
     // Auto-expand textarea
     if (textarea) {
@@ -630,22 +627,31 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
-    // Function to poll for responses from the working Flask system
+    // Function to wait for responses from the working Flask system
     function pollForResponses(sessionId) {
+        // Prefer a server-pushed stream; fall back to interval polling without EventSource
+        if (window.EventSource) {
+            streamResponses(sessionId);
+            return;
+        }
         console.log('Polling for responses for session:', sessionId);
         
-        // Poll every 2 seconds for up to 30 seconds
+        // Poll every 2 seconds for up to 30 seconds, fetching only responses after the cursor
         let pollCount = 0;
         const maxPolls = 15;
+        let afterId = 0;
         
         const pollInterval = setInterval(() => {
             pollCount++;
             
-            fetch(`/api/v1/?action=responses&session_id=${sessionId}`)
+            fetch(`/api/v1/?action=responses&session_id=${encodeURIComponent(sessionId)}&after_id=${afterId}`)
                 .then(response => response.json())
                 .then(data => {
                     if (data && data.success && data.data && data.data.responses) {
                         const responses = data.data.responses;
+                        if (data.data.pagination) {
+                            afterId = data.data.pagination.next_cursor;
+                        }
                         if (responses.length > 0) {
                             // Clear the polling interval since we got responses
                             clearInterval(pollInterval);
@@ -674,35 +680,38 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 2000);
     }
     
-    // Function to start continuous polling for new messages from the working Flask system
-    function startMessagePolling() {
-        console.log('Starting message polling from working Flask system...');
+    // Function to receive responses over Server-Sent Events (pushed as soon as they are stored)
+    function streamResponses(sessionId) {
+        console.log('Streaming responses for session:', sessionId);
         
-        // Poll every 5 seconds for new messages
-        setInterval(() => {
-            fetch('/api/v1/?action=inbox&limit=10&offset=0')
-                .then(response => response.json())
-                .then(data => {
-                    if (data && data.success && data.data && data.data.messages) {
-                        const messages = data.data.messages;
-                        if (messages.length > 0) {
-                            console.log('Received new messages from working Flask system:', messages.length);
-                                           
-                            // Display new messages
-                            messages.forEach(msg => {
-                                if (msg.message && !msg.processed) {
-                                    addAssistantMessage(msg.message);
-                                }
-                            });
-                        }
-                    }
-                })
-                .catch(error => {
-                    console.error('Error polling inbox:', error);
-                });
-        }, 5000);
+        const source = new EventSource(`/api/v1/responses/stream?session_id=${encodeURIComponent(sessionId)}`);
+        
+        // Give up after 30 seconds, like the polling fallback
+        const timeout = setTimeout(() => {
+            source.close();
+            console.log('Stopped waiting for responses');
+            hideTypingIndicator();
+        }, 30000);
+        
+        source.addEventListener('response', event => {
+            const response = JSON.parse(event.data);
+            clearTimeout(timeout);
+            source.close();
+            
+            // Hide typing indicator since we got a response
+            hideTypingIndicator();
+            addAssistantMessage(response.response || 'Response received');
+        });
+        
+        source.onerror = () => {
+            // EventSource reconnects by itself (resuming via Last-Event-ID); stop if the server refused us
+            if (source.readyState === EventSource.CLOSED) {
+                clearTimeout(timeout);
+                hideTypingIndicator();
+            }
+        };
     }
-
+    
     // Function to show typing indicator
     function showTypingIndicator(agentName) {
         const typingIndicator = document.getElementById('typingIndicator');
@@ -45,6 +45,7 @@ async function loadExistingUsers() {
     `;
     
     try {
+        const params = new URLSearchParams();
         const response = await fetch('/api/users');
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
@@ -63,7 +64,32 @@ async function loadExistingUsers() {
             return;
         }
         
-        tbody.innerHTML = users.map(user => `
+        tbody.innerHTML = users.map(userRowHtml).join('');
+        appendLoadMoreRow(tbody, params, response.headers.get('X-Next-Cursor'));
+        
+    } catch (error) {
+        console.error('Error loading users:', error);
+        tbody.innerHTML = `
+            <tr>
+                <td colspan="6" class="text-center text-danger">
+                    Error loading users: ${error.message}
+                </td>
+            </tr>
+        `;
+    }
+}
+
+function getRoleBadgeColor(role) {
+    switch (role) {
+        case 'admin': return 'danger';
+        case 'user': return 'primary';
+        case 'viewer': return 'secondary';
+        default: return 'secondary';
+    }
+}
+
+function userRowHtml(user) {
+    return `
             <tr>
                 <td class="text-light">${user.username}</td>
                 <td class="text-light">${user.email}</td>
@@ -83,28 +109,42 @@ async function loadExistingUsers() {
                         </button>
                     </div>
                 </td>
-            </tr>
-        `).join('');
-        
-    } catch (error) {
-        console.error('Error loading users:', error);
-        tbody.innerHTML = `
-            <tr>
-                <td colspan="6" class="text-center text-danger">
-                    Error loading users: ${error.message}
-                </td>
-            </tr>
-        `;
-    }
+            </tr>`;
 }
 
-function getRoleBadgeColor(role) {
-    switch (role) {
-        case 'admin': return 'danger';
-        case 'user': return 'primary';
-        case 'viewer': return 'secondary';
-        default: return 'secondary';
+// Pages are keyed by the last user id; X-Next-Cursor is absent on the last page
+function appendLoadMoreRow(tbody, params, nextCursor) {
+    if (!nextCursor) {
+        return;
     }
+    
+    const row = document.createElement('tr');
+    row.innerHTML = `
+        <td colspan="6" class="text-center">
+            <button class="btn btn-outline-secondary btn-sm">Load more</button>
+        </td>
+    `;
+    row.querySelector('button').addEventListener('click', async function() {
+        this.disabled = true;
+        try {
+            const pageParams = new URLSearchParams(params);
+            pageParams.set('after_id', nextCursor);
+            const response = await fetch(`/api/users?${pageParams.toString()}`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            const users = await response.json();
+            row.remove();
+            tbody.insertAdjacentHTML('beforeend', users.map(userRowHtml).join(''));
+            appendLoadMoreRow(tbody, params, response.headers.get('X-Next-Cursor'));
+        } catch (error) {
+            console.error('Error loading more users:', error);
+            showAlert('danger', `Failed to load more users: ${error.message}`);
+            this.disabled = false;
+        }
+    });
+    tbody.appendChild(row);
 }
 
 async function discoverUsers() {
@@ -221,28 +261,8 @@ async function filterUsers() {
         }
         
         // Re-render the table with filtered results
-        tbody.innerHTML = users.map(user => `
-            <tr>
-                <td class="text-light">${user.username}</td>
-                <td class="text-light">${user.email}</td>
-                <td><span class="badge bg-${getRoleBadgeColor(user.role)}">${user.role}</span></td>
-                <td><span class="badge bg-${user.is_active ? 'success' : 'danger'}">${user.is_active ? 'Active' : 'Inactive'}</span></td>
-                <td class="text-muted">${user.last_login ? new Date(user.last_login).toLocaleDateString() : 'Never'}</td>
-                <td>
-                    <div class="btn-group btn-group-sm" role="group">
-                        <button class="btn btn-outline-primary btn-sm" onclick="editUser(${user.id})" title="Edit User">
-                            ✏️
-                        </button>
-                        <button class="btn btn-outline-${user.is_active ? 'warning' : 'success'} btn-sm" onclick="toggleUserStatus(${user.id}, ${user.is_active})" title="${user.is_active ? 'Deactivate' : 'Activate'}">
-                            ${user.is_active ? '⏸️' : '▶️'}
-                        </button>
-                        <button class="btn btn-outline-danger btn-sm" onclick="deleteUser(${user.id})" title="Delete User">
-                            🗑️
-                        </button>
-                    </div>
-                </td>
-            </tr>
-        `).join('');
+        tbody.innerHTML = users.map(userRowHtml).join('');
+        appendLoadMoreRow(tbody, params, response.headers.get('X-Next-Cursor'));
         
     } catch (error) {
         console.error('Error filtering users:', error);
@@ -526,8 +546,8 @@ async function handleUserEdit(event) {
 async function editUser(userId) {
     console.log('editUser called with userId:', userId);
     try {
-        // Get current users to find the one we're editing
-        const response = await fetch('/api/users');
+        // Fetch just the user we're editing (first active user with id >= userId)
+        const response = await fetch(`/api/users?after_id=${userId - 1}&limit=1`);
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
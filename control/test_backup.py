@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Database Backup Test Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Test script for online snapshots, rotation and restore (uses a throwaway database)
+"""
+
+import os
+import sqlite3
+import sys
+import subprocess
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_helpers import count_rows, make_app_database
+from utils.backup import BackupError, BackupManager, online_copy
+
+def make_database():
+    """Temporary database with some chat history"""
+    db = make_app_database('backup_test.db')
+    conn = db.get_connection()
+    try:
+        conn.execute("INSERT INTO web_chat_sessions (session_id, uid) VALUES ('session_0', 'uid')")
+        conn.executemany("INSERT INTO web_chat_messages (session_id, message) VALUES ('session_0', ?)",
+                         [(f'message {i} ' + 'x' * 200,) for i in range(2000)])
+        conn.commit()
+    finally:
+        conn.close()
+    return db
+
+def test_snapshot_and_rotation():
+    """Snapshots are compressed, verified, listed newest first and rotated"""
+    print("Testing snapshots...")
+    db = make_database()
+    try:
+        manager = BackupManager(db.db_path, os.path.join(os.path.dirname(db.db_path), 'backups'),
+                                keep=2, pages_per_step=16)
+        first = manager.create_backup('first')
+        assert first['integrity'] == 'ok' and first['file'].endswith('.db.gz')
+        assert first['file_bytes'] < first['database_bytes'] and first['copy']['steps'] > 1
+        print(f"✅ Snapshot {first['name']}: {first['database_bytes']} -> {first['file_bytes']} bytes "
+              f"in {first['copy']['steps']} steps")
+
+        manager.create_backup('second', compression='none')
+        third = manager.create_backup('third')
+        assert third['rotated'] == [first['name']]
+        assert [m['label'] for m in manager.list_backups()] == ['third', 'second']
+        print("✅ Rotation keeps the newest snapshots")
+
+        try:
+            manager.create_backup('Bad Label')
+            assert False, "labels are validated"
+        except BackupError:
+            pass
+        try:
+            manager.get_manifest('../../etc/passwd')
+            assert False, "names are validated"
+        except BackupError:
+            pass
+
+        with open(manager.snapshot_path(third['name']), 'r+b') as f:
+            f.seek(100)
+            f.write(b'corrupt')
+        assert manager.verify_backup(third['name'])['integrity'].endswith('checksum mismatch')
+        print("✅ Verification detects a damaged snapshot")
+    finally:
+        db.close()
+
+def test_copy_under_concurrent_writes():
+    """A copy restarted by another process's writes falls back to one step and still completes"""
+    print("Testing copy under writes...")
+    db = make_database()
+    writer = subprocess.Popen([sys.executable, '-c', (
+        "import sqlite3, sys\n"
+        "conn = sqlite3.connect(sys.argv[1], timeout=30)\n"
+        "while True:\n"
+        "    conn.execute(\"INSERT INTO web_chat_messages (session_id, message) VALUES ('session_0', 'late')\")\n"
+        "    conn.commit()\n"
+    ), db.db_path])
+    try:
+        time.sleep(0.5)
+        dst = os.path.join(os.path.dirname(db.db_path), 'copy.db')
+        stats = online_copy(db.db_path, dst, pages=4, step_sleep=0.005, max_restarts=2)
+        conn = sqlite3.connect(dst)
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+        assert conn.execute("SELECT COUNT(*) FROM web_chat_messages").fetchone()[0] > 2000
+        conn.close()
+        assert stats['restarts'] <= 3 and (stats['single_step'] or stats['restarts'] <= 2)
+        print(f"✅ Copy under writes: {stats}")
+    finally:
+        writer.kill()
+        writer.wait()
+        db.close()
+
+def test_restore():
+    """Restore rewrites the live file; connections opened before it see the snapshot"""
+    print("Testing restore...")
+    db = make_database()
+    try:
+        manager = BackupManager(db.db_path, os.path.join(os.path.dirname(db.db_path), 'backups'))
+        snapshot = manager.create_backup('baseline')
+        conn = db.get_connection()
+        try:
+            conn.execute("DELETE FROM web_chat_messages")
+            conn.commit()
+        finally:
+            conn.close()
+        assert count_rows(db, 'web_chat_messages') == 0
+
+        # Stands in for another worker process that keeps its connection open
+        other_worker = sqlite3.connect(db.db_path)
+        held = db.get_connection()
+        try:
+            result = manager.restore_backup(snapshot['name'], db)
+            assert count_rows(db, 'web_chat_messages') == 2000
+            assert held.execute("SELECT COUNT(*) FROM web_chat_messages").fetchone()[0] == 2000
+            assert other_worker.execute("SELECT COUNT(*) FROM web_chat_messages").fetchone()[0] == 2000
+            assert other_worker.execute(
+                "SELECT version FROM cache_versions WHERE name = 'system_config'").fetchone()[0] >= 1
+        finally:
+            held.close()
+            other_worker.close()
+        assert manager.get_manifest(result['safety_backup'])['label'] == 'pre-restore'
+        print(f"✅ Restored {result['restored']} in {result['duration_ms']} ms")
+    finally:
+        db.close()
+
+def test_restore_oldest_with_full_store():
+    """The pre-restore snapshot never rotates out the snapshot being restored"""
+    print("Testing restore of the oldest snapshot...")
+    db = make_database()
+    try:
+        manager = BackupManager(db.db_path, os.path.join(os.path.dirname(db.db_path), 'backups'), keep=2)
+        one = manager.create_backup('one')
+        conn = db.get_connection()
+        try:
+            conn.execute("DELETE FROM web_chat_messages")
+            conn.commit()
+        finally:
+            conn.close()
+        manager.create_backup('two')
+
+        result = manager.restore_backup(one['name'], db)
+        assert count_rows(db, 'web_chat_messages') == 2000
+        names = [m['name'] for m in manager.list_backups()]
+        assert one['name'] in names and result['safety_backup'] in names and len(names) == 2
+        print(f"✅ Oldest snapshot restored; rotated {result['rotated']}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    test_snapshot_and_rotation()
+    test_copy_under_concurrent_writes()
+    test_restore()
+    test_restore_oldest_with_full_store()
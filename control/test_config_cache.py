@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Config Cache Test Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Test script for the system_config snapshot cache and API key resolution (uses a throwaway database)
+"""
+
+import os
+import sqlite3
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, g
+from api.auth import api_key_role, require_auth
+from test_helpers import make_app_database
+from utils import cache_versions
+from utils.config_cache import ConfigSnapshotCache
+
+def write_from_other_process(db_path, key, value):
+    """Update system_config the way another worker would: shared version bumped, local generation not"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("INSERT OR REPLACE INTO system_config (config_key, config_value) VALUES (?, ?)", (key, value))
+        cache_versions.bump_version(conn, cache_versions.CONFIG_VERSION)
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_snapshot_invalidation():
+    """Local writes show at once; other processes' writes within max_staleness"""
+    print("Testing config snapshot cache...")
+    db = make_app_database('config_cache_test.db')
+    try:
+        cache = ConfigSnapshotCache(db, max_staleness=0.2)
+        db.set_config_many({'site_name': 'first'})
+        assert cache.get('site_name') == 'first'
+        snapshot = cache.get_all()
+        assert cache.get_all() is snapshot, "fresh reads are served from the snapshot"
+
+        db.set_config_many({'site_name': 'second'})
+        assert cache.get('site_name') == 'second'
+        print("✅ This process's writes are visible on the next read")
+
+        write_from_other_process(db.db_path, 'site_name', 'third')
+        assert cache.get('site_name') == 'second', "trusted until max_staleness"
+        time.sleep(0.25)
+        assert cache.get('site_name') == 'third'
+        print("✅ Another process's write is picked up after max_staleness")
+
+        snapshot = cache.get_all()
+        time.sleep(0.25)
+        assert cache.get_all() is snapshot, "an unchanged version keeps the snapshot"
+        print("✅ Unchanged version keeps the snapshot")
+    finally:
+        db.close()
+
+def test_api_key_role_memo():
+    """require_auth memoizes the real role, so a shared API/admin key still resolves to admin"""
+    print("Testing API key role memo...")
+    db = make_app_database('auth_test.db')
+    try:
+        app = Flask(__name__)
+        app.config.update(DEFAULT_API_KEY='api-key', DEFAULT_ADMIN_KEY='admin-key')
+        app.extensions['config_cache'] = ConfigSnapshotCache(db)
+
+        @require_auth
+        def handler():
+            return api_key_role('same-key')
+
+        db.set_config_many({'api_key': 'same-key', 'admin_key': 'same-key'})
+        with app.test_request_context(headers={'Authorization': 'Bearer same-key'}):
+            assert handler() == 'admin'
+            assert g.api_key_auth == ('same-key', True, True)
+        with app.test_request_context(headers={'Authorization': 'Bearer other'}):
+            response, status = handler()
+            assert status == 401
+        print("✅ Memoized role matches the key's real role")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    test_snapshot_invalidation()
+    test_api_key_role_memo()
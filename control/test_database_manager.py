@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Bridge Database Manager Test Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Test script for the pooled bridge DatabaseManager (uses a throwaway database)
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.database import DatabaseManager, PoolTimeoutError
+from utils import cache_versions
+from utils.notifications import responses_topic
+from utils.streaming import long_poll
+
+def make_manager(**kwargs):
+    """Create a manager backed by a temporary database file"""
+    tmp_dir = tempfile.mkdtemp()
+    return DatabaseManager(os.path.join(tmp_dir, 'bridge_test.db'), **kwargs)
+
+def test_connection_pool():
+    """Connections are reused and the pool is bounded"""
+    print("Testing connection pool...")
+    db = make_manager(pool_size=2, pool_timeout=0.1)
+    try:
+        first = db.get_connection()
+        raw = first._conn
+        first.close()
+        second = db.get_connection()
+        assert second._conn is raw, "idle connection should be reused"
+        third = db.get_connection()
+        try:
+            db.get_connection()
+            assert False, "pool should be exhausted"
+        except PoolTimeoutError:
+            print("✅ Pool checkout times out when exhausted")
+        second.close()
+        third.close()
+        assert db.pool.stats()['in_use'] == 0
+        print("✅ Connections returned to pool")
+    finally:
+        db.close()
+
+def test_concurrent_writers():
+    """Several threads can write through the shared manager"""
+    print("Testing concurrent writers...")
+    db = make_manager(pool_size=4)
+    try:
+        def worker(n):
+            for i in range(10):
+                db.create_message(f'session_t{n}', f'message {i}')
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        conn = db.get_connection()
+        try:
+            total = conn.execute("SELECT COUNT(*) FROM web_chat_messages").fetchone()[0]
+        finally:
+            conn.close()
+        assert total == 40, total
+        print("✅ 40 messages written from 4 threads")
+    finally:
+        db.close()
+
+def test_ingest_message():
+    """First messages racing on one session share a single session row"""
+    print("Testing single-transaction message ingest...")
+    db = make_manager(pool_size=4)
+    try:
+        results = []
+        def worker():
+            results.append(db.ingest_message('session_race', 'hello', '127.0.0.1', 'test-agent'))
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(results) == 8
+        assert len({r['uid'] for r in results}) == 1, "all messages must resolve to one UID"
+        assert sum(r['is_new'] for r in results) == 1, "exactly one request creates the session"
+        assert len({r['message_id'] for r in results}) == 8
+        print("✅ Concurrent first messages created one session")
+    finally:
+        db.close()
+
+def test_inbox_claim():
+    """Concurrent pollers never receive the same message; leases expire"""
+    print("Testing atomic inbox claims...")
+    db = make_manager(pool_size=4)
+    try:
+        for i in range(50):
+            db.ingest_message('session_inbox', f'message {i}')
+        claimed = []
+        def poller():
+            while True:
+                batch = db.claim_messages(7)['messages']
+                if not batch:
+                    return
+                claimed.extend(m['id'] for m in batch)
+        threads = [threading.Thread(target=poller) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(claimed) == 50 and len(set(claimed)) == 50, "each message claimed exactly once"
+        print("✅ 50 messages claimed once across 4 pollers")
+        
+        first_id = db.ingest_message('session_inbox', 'leased')['message_id']
+        claim = db.claim_messages(10, lease_seconds=60)
+        assert [m['id'] for m in claim['messages']] == [first_id]
+        assert db.claim_messages(10, lease_seconds=60)['messages'] == [], "leased message is hidden"
+        assert db.ack_messages([first_id], 'wrong-token') == 0
+        unclaimed_id = db.ingest_message('session_inbox', 'not delivered yet')['message_id']
+        assert db.ack_messages([unclaimed_id], claim['claim_token']) == 0, "never-claimed messages cannot be acked"
+        assert db.ack_messages([first_id], claim['claim_token']) == 1
+        db.claim_messages(10, after_id=first_id)  # no lease: delivered and processed at once
+        print("✅ Leased messages hidden until acked")
+        
+        stranded_id = db.ingest_message('session_inbox', 'never acked')['message_id']
+        lost = db.claim_messages(10, after_id=first_id, lease_seconds=60)
+        cursor = lost['messages'][-1]['id']
+        assert cursor == stranded_id
+        conn = db.get_connection()
+        try:
+            conn.execute("UPDATE web_chat_messages SET lease_expires = 0 WHERE id = ?", (stranded_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        retry = db.claim_messages(10, after_id=cursor, lease_seconds=60)
+        assert [m['id'] for m in retry['messages']] == [stranded_id], "expired lease redelivered past the cursor"
+        assert db.ack_messages([stranded_id], lost['claim_token']) == 0, "the expired claim's token is stale"
+        assert db.ack_messages([stranded_id], retry['claim_token']) == 1
+        print("✅ Expired leases redelivered to a consumer that advanced its cursor")
+    finally:
+        db.close()
+
+def test_ingest_messages():
+    """Bulk ingestion upserts sessions once and returns ids/UIDs in input order"""
+    print("Testing bulk message ingestion...")
+    db = make_manager()
+    try:
+        existing = db.ingest_message('session_bulk_a', 'first')
+        results = db.ingest_messages([
+            ('session_bulk_a', 'one'),
+            ('session_bulk_b', 'two'),
+            ('session_bulk_a', 'three'),
+        ])
+        assert [r['message_id'] for r in results] == [existing['message_id'] + i for i in (1, 2, 3)]
+        assert results[0]['uid'] == results[2]['uid'] == existing['uid'] and not results[0]['is_new']
+        assert results[1]['is_new']
+        stored = db.claim_messages(10)['messages']
+        assert [(m['id'], m['message']) for m in stored][1:] == [(r['message_id'], text) for r, text in
+                                                                 zip(results, ('one', 'two', 'three'))]
+        print("✅ Bulk messages stored with ids and UIDs in order")
+    finally:
+        db.close()
+
+def test_create_responses():
+    """Batched responses get ids in order; unknown sessions are skipped"""
+    print("Testing batched responses...")
+    db = make_manager()
+    try:
+        db.ingest_message('session_batch_a', 'hello')
+        ids = db.create_responses([
+            ('session_batch_a', 'one', None),
+            ('session_batch_missing', 'lost', None),
+            ('session_batch_a', 'two', 7),
+        ])
+        assert ids[1] is None and ids[2] == ids[0] + 1
+        stored = db.get_responses_after('session_batch_a')
+        assert [(r['id'], r['response']) for r in stored] == [(ids[0], 'one'), (ids[2], 'two')]
+        print("✅ Batch stored in one transaction with per-item ids")
+    finally:
+        db.close()
+
+def test_set_config_many():
+    """Bulk config writes upsert every key and bump the config version once"""
+    print("Testing bulk config writes...")
+    db = make_manager()
+    try:
+        conn = db.get_connection()
+        try:
+            before = cache_versions.read_version(conn, cache_versions.CONFIG_VERSION)
+        finally:
+            conn.close()
+        db.set_config_many({'api_key': 'rotated', 'bulk_key_a': '1', 'bulk_key_b': '2'})
+        config = db.get_all_config()
+        assert (config['api_key'], config['bulk_key_a'], config['bulk_key_b']) == ('rotated', '1', '2')
+        conn = db.get_connection()
+        try:
+            assert cache_versions.read_version(conn, cache_versions.CONFIG_VERSION) == before + 1
+        finally:
+            conn.close()
+        print("✅ Three keys written with one version bump")
+    finally:
+        db.close()
+
+def test_session_counters():
+    """Session counters follow inserts and deletes, and sessions page by keyset"""
+    print("Testing session counters...")
+    db = make_manager()
+    try:
+        for i in range(3):
+            db.ingest_message('session_count_a', f'message {i}')
+        db.ingest_message('session_count_b', 'hello')
+        db.create_response('session_count_a', 'reply')
+        conn = db.get_connection()
+        try:
+            conn.execute("DELETE FROM web_chat_messages WHERE id = (SELECT MIN(id) FROM web_chat_messages)")
+            conn.commit()
+        finally:
+            conn.close()
+        sessions = {s['session_id']: s for s in db.get_active_sessions(10)}
+        assert sessions['session_count_a']['message_count'] == 2
+        assert sessions['session_count_a']['response_count'] == 1
+        assert sessions['session_count_b']['message_count'] == 1
+        print("✅ Counters maintained by triggers")
+        
+        first = db.get_active_sessions(1)
+        second = db.get_active_sessions(1, before=(first[0]['last_activity'], first[0]['id']))
+        assert len(second) == 1 and second[0]['id'] != first[0]['id']
+        assert db.get_active_sessions(1, before=(second[0]['last_activity'], second[0]['id'])) == []
+        print("✅ Keyset pagination walks every session once")
+    finally:
+        db.close()
+
+def test_publish_wakes_long_poll():
+    """A stored response wakes a parked long-poll well before its recheck interval"""
+    print("Testing long-poll wake-up...")
+    db = make_manager()
+    try:
+        db.ingest_message('session_wake', 'hello')
+        timer = threading.Timer(0.2, db.create_response, ('session_wake', 'reply'))
+        started = time.monotonic()
+        timer.start()
+        rows = long_poll(db.events, responses_topic('session_wake'),
+                         lambda: db.get_responses_after('session_wake'), timeout=30, recheck=60)
+        elapsed = time.monotonic() - started
+        timer.join()
+        assert [r['response'] for r in rows] == ['reply']
+        assert elapsed < 5, f"woken by the publish, not the recheck ({elapsed:.2f}s)"
+        assert db.events.waiter_count() == 0
+        print(f"✅ Parked request woken after {elapsed:.2f}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    test_connection_pool()
+    test_concurrent_writers()
+    test_ingest_message()
+    test_inbox_claim()
+    test_ingest_messages()
+    test_create_responses()
+    test_set_config_many()
+    test_session_counters()
+    test_publish_wakes_long_poll()
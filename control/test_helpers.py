@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Test Helpers
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Throwaway databases shared by the test scripts
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from models import Base
+from utils.database import DatabaseManager
+
+def make_app_database(name: str) -> DatabaseManager:
+    """Temporary database with both the web UI and bridge tables, fully migrated"""
+    db_path = os.path.join(tempfile.mkdtemp(), name)
+    # Web UI tables first, as app startup does with init_db()
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return DatabaseManager(db_path)
+
+def count_rows(db: DatabaseManager, table: str) -> int:
+    conn = db.get_connection()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Maintenance Sweep Test Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Test script for the background maintenance sweeps (uses a throwaway database)
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_helpers import count_rows, make_app_database
+from utils.maintenance import MaintenanceScheduler
+
+def seed(db, expired, live):
+    """Insert expired and live rows into every swept table"""
+    fmt = '%Y-%m-%d %H:%M:%S.%f'
+    past = (datetime.utcnow() - timedelta(hours=1)).strftime(fmt)
+    future = (datetime.utcnow() + timedelta(hours=1)).strftime(fmt)
+    old_window = (datetime.now() - timedelta(hours=3)).strftime('%Y-%m-%d %H:%M:%S')
+    conn = db.get_connection()
+    try:
+        conn.executemany(
+            "INSERT INTO user_sessions (id, user_id, session_token, expires_at) VALUES (?, 1, ?, ?)",
+            [(f's{i}', f't{i}', past if i < expired else future) for i in range(expired + live)]
+        )
+        conn.executemany(
+            "INSERT INTO web_chat_sessions (session_id, uid, last_activity) VALUES (?, 'uid', ?)",
+            [(f'session_{i}', '2000-01-01 00:00:00' if i < expired else datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'))
+             for i in range(expired + live)]
+        )
+        conn.executemany(
+            "INSERT INTO rate_limits (ip_address, endpoint, window_start) VALUES (?, '/api/messages', ?)",
+            [(f'10.0.0.{i}', old_window if i < expired else datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+             for i in range(expired + live)]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+def test_sweep_in_batches():
+    """A sweep removes only expired rows, in batches, and records metrics"""
+    print("Testing batched sweep...")
+    db = make_app_database('maintenance_test.db')
+    try:
+        seed(db, expired=250, live=5)
+        scheduler = MaintenanceScheduler(db, batch_size=100, time_budget=60)
+        assert scheduler.run_once() == {'user_sessions': 250, 'web_chat_sessions': 250, 'rate_limits': 250}
+        for table in ('user_sessions', 'web_chat_sessions', 'rate_limits'):
+            assert count_rows(db, table) == 5, f"live {table} rows must survive"
+        stats = scheduler.stats()['tables']['user_sessions']
+        assert stats['deleted'] == 250 and not stats['backlog'] and stats['errors'] == 0
+        print(f"✅ Swept expired rows only: {stats}")
+    finally:
+        db.close()
+
+def test_idle_session_with_pending_message_survives():
+    """An idle chat session is kept while its messages are unprocessed or leased"""
+    print("Testing idle sessions with pending messages...")
+    db = make_app_database('maintenance_test.db')
+    try:
+        db.ingest_message('leased_session', 'claimed but not acked')
+        db.claim_messages(limit=1, lease_seconds=3600)
+        pending = db.ingest_message('pending_session', 'still waiting for the bridge')
+        db.ingest_message('done_session', 'already answered')
+        conn = db.get_connection()
+        try:
+            conn.execute("UPDATE web_chat_messages SET processed = 1 WHERE session_id = 'done_session'")
+            conn.execute("UPDATE web_chat_sessions SET last_activity = datetime('now', '-31 minutes')")
+            conn.commit()
+        finally:
+            conn.close()
+
+        scheduler = MaintenanceScheduler(db, session_idle=1800)
+        assert scheduler.run_once()['web_chat_sessions'] == 1
+        claimed = db.claim_messages(limit=10, lease_seconds=60)['messages']
+        assert [m['id'] for m in claimed] == [pending['message_id']]
+        assert claimed[0]['uid'] == pending['uid'], "the pending message keeps its session"
+        conn = db.get_connection()
+        try:
+            remaining = {row[0] for row in conn.execute("SELECT session_id FROM web_chat_sessions")}
+        finally:
+            conn.close()
+        assert remaining == {'pending_session', 'leased_session'}
+        assert db.create_responses([('pending_session', 'reply', pending['message_id'])])[0] is not None
+        print("✅ Sessions with pending or leased messages survive the idle sweep")
+    finally:
+        db.close()
+
+def test_time_budget_leaves_backlog():
+    """An exhausted budget stops after one batch and reports a backlog"""
+    print("Testing time budget...")
+    db = make_app_database('maintenance_test.db')
+    try:
+        seed(db, expired=250, live=0)
+        scheduler = MaintenanceScheduler(db, batch_size=100, time_budget=0)
+        assert scheduler.run_once()['user_sessions'] == 100
+        assert scheduler.stats()['tables']['user_sessions']['backlog']
+        scheduler.run_once()
+        scheduler.run_once()
+        assert count_rows(db, 'user_sessions') == 0
+        assert not scheduler.stats()['tables']['user_sessions']['backlog']
+        print("✅ Backlog carried over to later sweeps")
+    finally:
+        db.close()
+
+def test_jittered_interval():
+    """Waits vary around the interval so workers do not sweep in lockstep"""
+    scheduler = MaintenanceScheduler(None, interval=100, jitter=0.2)
+    delays = {scheduler.next_delay() for _ in range(20)}
+    assert all(80 <= d <= 120 for d in delays) and len(delays) > 1
+    print("✅ Sweep interval is jittered")
+
+if __name__ == "__main__":
+    test_sweep_in_batches()
+    test_idle_session_with_pending_message_survives()
+    test_time_budget_leaves_backlog()
+    test_jittered_interval()
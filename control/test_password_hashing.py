@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Password Hashing Pool Test Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Test script for the bounded bcrypt worker pool (low cost factors keep it fast)
+"""
+
+import os
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.password_hashing import HasherBusy, PasswordHasher, hash_rounds
+
+def test_hash_and_rehash():
+    """Hashes use the configured cost; other costs are flagged for rehash"""
+    print("Testing hash, verify and rehash policy...")
+    hasher = PasswordHasher(workers=2, max_queue=4, rounds=4)
+    try:
+        hashed = hasher.hash('s3cret')
+        assert hash_rounds(hashed) == 4
+        assert hasher.verify('s3cret', hashed)
+        assert not hasher.verify('wrong', hashed)
+        assert not hasher.needs_rehash(hashed)
+        assert hasher.needs_rehash(hasher.hash('s3cret', rounds=5))
+        assert hasher.needs_rehash('not-a-bcrypt-hash')
+        stats = hasher.stats()
+        assert stats['completed'] == 4 and stats['queue_depth'] == 0 and stats['running'] == 0
+        print(f"✅ Hash/verify on the pool: {stats}")
+    finally:
+        hasher.shutdown()
+
+def test_full_pool_rejects():
+    """Work beyond workers + max_queue is refused immediately"""
+    print("Testing saturation...")
+    hasher = PasswordHasher(workers=1, max_queue=1, rounds=4)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+        return True
+
+    try:
+        waiters = [threading.Thread(target=hasher.run, args=(blocker,)) for _ in range(2)]
+        waiters[0].start()
+        started.wait(5)
+        waiters[1].start()
+        while hasher.stats()['queue_depth'] < 1:
+            release.wait(0.01)
+        try:
+            hasher.run(blocker)
+            assert False, "third job should be rejected"
+        except HasherBusy:
+            pass
+        assert hasher.stats()['rejected'] == 1
+        release.set()
+        for waiter in waiters:
+            waiter.join(5)
+        assert hasher.stats()['queue_depth'] == 0
+        print("✅ Full pool raises HasherBusy and drains afterwards")
+    finally:
+        release.set()
+        hasher.shutdown()
+
+if __name__ == "__main__":
+    test_hash_and_rehash()
+    test_full_pool_rejects()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Rate Limiting Test Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Test script for RateLimitManager backends (uses a throwaway database)
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.database import DatabaseManager
+from utils.rate_limiting import RateLimitManager, MemoryRateLimitBackend, SharedMemoryRateLimitBackend
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def check_backend(manager, name):
+    """Shared limit/reset behaviour every backend must provide"""
+    for _ in range(3):
+        assert manager.check_rate_limit('10.0.0.1', '/api/test', 3)
+    assert not manager.check_rate_limit('10.0.0.1', '/api/test', 3), "4th request must be rejected"
+    assert manager.check_rate_limit('10.0.0.2', '/api/test', 3), "other IPs are counted separately"
+    assert manager.get_rate_limit_info('10.0.0.1', '/api/test')['current_count'] == 3
+    manager.reset_rate_limit('10.0.0.1', '/api/test')
+    assert manager.check_rate_limit('10.0.0.1', '/api/test', 3)
+    assert manager.check_rate_limit('10.0.0.3', '/api/batch', 10, cost=8)
+    assert not manager.check_rate_limit('10.0.0.3', '/api/batch', 10, cost=3), "weighted batch must not overshoot"
+    assert manager.check_rate_limit('10.0.0.3', '/api/batch', 10, cost=2)
+    print(f"✅ {name} backend enforces limits")
+
+def test_memory_backend():
+    """Limits, sliding window decay and LRU eviction of the in-process backend"""
+    print("Testing memory rate limit backend...")
+    check_backend(RateLimitManager(backend='memory'), 'memory')
+
+    clock = FakeClock(7200.0)  # start of a window
+    manager = RateLimitManager(backend=MemoryRateLimitBackend(clock=clock), window_seconds=3600)
+    for _ in range(10):
+        assert manager.check_rate_limit('10.0.0.1', '/api/test', 10)
+    assert not manager.check_rate_limit('10.0.0.1', '/api/test', 10)
+    clock.now += 3600 + 1800  # halfway through the next window: ~5 still count
+    allowed = sum(manager.check_rate_limit('10.0.0.1', '/api/test', 10) for _ in range(10))
+    assert allowed == 5, allowed
+    clock.now += 3 * 3600
+    assert manager.cleanup_expired_limits() == 1
+    print("✅ Sliding window decays previous window")
+
+    backend = MemoryRateLimitBackend(max_keys=4, stripes=1)
+    for n in range(10):
+        backend.hit(f'10.0.1.{n}', '/api/test', 5, 3600)
+    assert len(backend.get_all()) == 4
+    print("✅ Idle keys evicted beyond max_keys")
+
+def test_shared_memory_backend():
+    """Two handles on one counter file enforce a single limit"""
+    print("Testing shared memory rate limit backend...")
+    path = os.path.join(tempfile.mkdtemp(), 'counters.shm')
+    first = SharedMemoryRateLimitBackend(path, max_keys=256)
+    second = SharedMemoryRateLimitBackend(path, max_keys=256)
+    try:
+        check_backend(RateLimitManager(backend=first), 'shared')
+        allowed = 0
+        for _ in range(5):
+            allowed += first.hit('10.0.0.9', '/api/outbox', 6, 3600)
+            allowed += second.hit('10.0.0.9', '/api/outbox', 6, 3600)
+        assert allowed == 6, allowed
+        print("✅ Limit shared between handles on the same file")
+    finally:
+        first.close()
+        second.close()
+
+def test_sqlite_backend():
+    """The shared-table backend keeps working for multi-process deployments"""
+    print("Testing sqlite rate limit backend...")
+    db = DatabaseManager(os.path.join(tempfile.mkdtemp(), 'rate_test.db'))
+    try:
+        check_backend(RateLimitManager(db, backend='sqlite'), 'sqlite')
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    test_memory_backend()
+    test_shared_memory_backend()
+    test_sqlite_backend()
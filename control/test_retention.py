@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Chat History Retention Test Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Test script for archive-and-purge retention (uses a throwaway database)
+"""
+
+import gzip
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from test_helpers import count_rows, make_app_database
+from utils import retention
+from utils.retention import (RetentionBusy, RetentionError, count_expired, load_policy, retention_status,
+                             run_retention, start_retention)
+
+OLD = '2000-01-01 00:00:00'
+
+def make_database():
+    """Temporary database with old and recent chat history"""
+    db = make_app_database('retention_test.db')
+    conn = db.get_connection()
+    try:
+        for n, stamp in enumerate([OLD, None]):
+            session_id = f'session_{n}'
+            conn.execute("INSERT INTO web_chat_sessions (session_id, uid) VALUES (?, 'uid')", (session_id,))
+            for i in range(120):
+                conn.execute(
+                    "INSERT INTO web_chat_messages (session_id, message, processed, timestamp) "
+                    "VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+                    (session_id, f'message {i}', 0 if i == 0 else 1, stamp)
+                )
+                conn.execute(
+                    "INSERT INTO web_chat_responses (session_id, response, timestamp) "
+                    "VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+                    (session_id, f'response {i}', stamp)
+                )
+            # Message triggers refresh last_activity; age the old session afterwards
+            if stamp:
+                conn.execute("UPDATE web_chat_sessions SET last_activity = ? WHERE session_id = ?", (stamp, session_id))
+        conn.commit()
+    finally:
+        conn.close()
+    return db
+
+def test_archive_and_purge():
+    """Old rows are archived to gzip JSONL in chunks and deleted; recent and unprocessed rows stay"""
+    print("Testing archive and purge...")
+    db = make_database()
+    try:
+        try:
+            run_retention(db, load_policy(db))
+            assert False, "retention is disabled by default"
+        except RetentionError:
+            pass
+
+        db.set_config_many({'retention_days': '30', 'retention_batch_size': '50'})
+        policy = load_policy(db)
+        # The old session still has an unprocessed message, so it stays
+        assert count_expired(db, policy) == {
+            'web_chat_responses': 120, 'web_chat_messages': 119, 'web_chat_sessions': 0
+        }
+        result = run_retention(db, policy)
+        assert result['purged'] == {'web_chat_responses': 120, 'web_chat_messages': 119, 'web_chat_sessions': 0}
+        assert count_rows(db, 'web_chat_responses') == 120 and count_rows(db, 'web_chat_messages') == 121
+        assert count_rows(db, 'web_chat_sessions') == 2
+        print(f"✅ Purged {result['purged']}")
+
+        with gzip.open(result['archive_file'], 'rt') as f:
+            archived = [json.loads(line) for line in f]
+        assert len(archived) == 239
+        assert {entry['table'] for entry in archived} == {'web_chat_responses', 'web_chat_messages'}
+        assert not os.path.exists(result['archive_file'] + '.part')
+        print(f"✅ Archived {len(archived)} rows to {os.path.basename(result['archive_file'])}")
+
+        conn = db.get_connection()
+        try:
+            conn.execute("UPDATE web_chat_messages SET processed = 1 WHERE session_id = 'session_0'")
+            conn.commit()
+        finally:
+            conn.close()
+        after = run_retention(db, policy)
+        assert after['purged'] == {'web_chat_responses': 0, 'web_chat_messages': 1, 'web_chat_sessions': 1}
+        print("✅ The session goes once its last message is processed")
+
+        again = run_retention(db, policy)
+        assert not any(again['purged'].values()) and again['archive_file'] is None
+        print("✅ A run with nothing to purge leaves no archive file")
+    finally:
+        db.close()
+
+def test_cutoff_uses_index():
+    """The cutoff comparison is a range scan on the timestamp indexes"""
+    print("Testing cutoff query plans...")
+    db = make_database()
+    try:
+        conn = db.get_connection()
+        try:
+            for table, index in (('web_chat_messages', 'idx_web_chat_messages_timestamp'),
+                                 ('web_chat_responses', 'idx_web_chat_responses_timestamp'),
+                                 ('web_chat_sessions', 'idx_web_chat_sessions_last_activity')):
+                column = 'last_activity' if table == 'web_chat_sessions' else 'timestamp'
+                plan = ' '.join(row[3] for row in conn.execute(
+                    f"EXPLAIN QUERY PLAN SELECT COUNT(*) FROM {table} WHERE {column} < ?", (OLD,)))
+                assert index in plan, plan
+        finally:
+            conn.close()
+        print("✅ Cutoff scans use the timestamp indexes")
+    finally:
+        db.close()
+
+def test_background_run():
+    """start_retention returns at once; status reports the result and a second start is refused"""
+    print("Testing background run...")
+    db = make_database()
+    try:
+        policy = load_policy(db, {'days': 30, 'archive': False, 'vacuum': 'none'})
+        # Stands in for a run already in progress
+        with retention._run_lock:
+            try:
+                start_retention(db, policy)
+                assert False, "a second run is refused while one is in progress"
+            except RetentionBusy:
+                pass
+
+        status = start_retention(db, policy)
+        assert status['state'] in ('running', 'finished')
+        deadline = time.time() + 10
+        while retention_status()['state'] == 'running' and time.time() < deadline:
+            time.sleep(0.05)
+        status = retention_status()
+        assert status['state'] == 'finished', status
+        assert status['result']['purged']['web_chat_responses'] == 120 and status['finished_at']
+        print(f"✅ Background run finished: {status['result']['purged']}")
+    finally:
+        db.close()
+
+def test_vacuum_modes():
+    """A full vacuum switches the file to incremental mode for later runs"""
+    print("Testing vacuum...")
+    db = make_database()
+    try:
+        policy = load_policy(db, {'days': 30, 'archive': False, 'vacuum': 'incremental'})
+        assert 'skipped' in run_retention(db, policy)['vacuum']
+        make_old = db.get_connection()
+        try:
+            make_old.execute("UPDATE web_chat_responses SET timestamp = ?", (OLD,))
+            make_old.commit()
+        finally:
+            make_old.close()
+        result = run_retention(db, policy._replace(vacuum='full'))
+        assert result['archive_file'] is None and result['vacuum']['mode'] == 'full'
+        conn = db.get_connection()
+        try:
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        finally:
+            conn.close()
+        print(f"✅ Vacuum results: {result['vacuum']}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    test_archive_and_purge()
+    test_cutoff_uses_index()
+    test_background_run()
+    test_vacuum_modes()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - SQLite Configuration Test Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Test script for shared SQLite PRAGMA resolution (no database needed)
+"""
+
+import os
+import sqlite3
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.sqlite_config import (DEFAULT_PRAGMAS, PRAGMA_ENV_VAR, PragmaConfigError, apply_pragmas,
+                                 resolve_pragmas)
+
+def with_env(value, func):
+    """Call func with SANCTUM_SQLITE_PRAGMAS set to value (None unsets it)"""
+    saved = os.environ.pop(PRAGMA_ENV_VAR, None)
+    try:
+        if value is not None:
+            os.environ[PRAGMA_ENV_VAR] = value
+        return func()
+    finally:
+        os.environ.pop(PRAGMA_ENV_VAR, None)
+        if saved is not None:
+            os.environ[PRAGMA_ENV_VAR] = saved
+
+def test_merge_and_overrides():
+    """Explicit overrides beat the environment, which beats the defaults; None drops a PRAGMA"""
+    print("Testing PRAGMA merging...")
+    assert with_env(None, resolve_pragmas) == DEFAULT_PRAGMAS
+
+    pragmas = with_env('{"cache_size": -32000, "mmap_size": null}',
+                       lambda: resolve_pragmas({'cache_size': -8000, 'synchronous': 'FULL'}))
+    assert pragmas['cache_size'] == -8000 and pragmas['synchronous'] == 'FULL'
+    assert 'mmap_size' not in pragmas and pragmas['journal_mode'] == 'WAL'
+    assert list(pragmas)[0] == 'busy_timeout', "busy_timeout stays first"
+    print(f"✅ Merged PRAGMAs: {pragmas}")
+
+    conn = sqlite3.connect(':memory:')
+    try:
+        apply_pragmas(conn, pragmas)
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -8000
+    finally:
+        conn.close()
+    print("✅ Merged PRAGMAs apply to a connection")
+
+def test_invalid_environment():
+    """Malformed SANCTUM_SQLITE_PRAGMAS fails with a configuration error naming the variable"""
+    print("Testing invalid environment overrides...")
+    for value in ('{cache_size: 1}', '[["cache_size", 1]]', '42'):
+        try:
+            with_env(value, resolve_pragmas)
+            assert False, f"{value!r} is rejected"
+        except PragmaConfigError as e:
+            assert PRAGMA_ENV_VAR in str(e)
+    print("✅ Non-JSON and non-object values are rejected")
+
+if __name__ == "__main__":
+    test_merge_and_overrides()
+    test_invalid_environment()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - Bulk User Import Test Script
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+Test script for bulk user import (uses a throwaway database)
+"""
+
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models import Base, User
+from utils.password_hashing import PasswordHasher, bcrypt_check
+from utils.user_import import import_users, parse_csv
+
+CSV = """username,email,role,password
+alice,alice@example.com,admin,
+bob,bob@example.com,,hunter22
+carol,not-an-email,user,
+alice,alice2@example.com,user,
+dave,dave@example.com,owner,
+taken,erin@example.com,user,
+"""
+
+def test_import_users():
+    """Valid rows land in one transaction; every rejected row is reported"""
+    print("Testing bulk user import...")
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'import_test.db')}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    hasher = PasswordHasher(workers=2, max_queue=2, rounds=4)
+    try:
+        session.add(User(username='taken', email='taken@example.com', password_hash='x'))
+        session.commit()
+
+        rows = parse_csv(CSV)
+        assert 'password' not in rows[0], "blank cells are dropped"
+        result = import_users(session, rows, hasher.hash_many)
+        assert [u['username'] for u in result['created']] == ['alice', 'bob']
+        assert [e['row'] for e in result['errors']] == [3, 4, 5, 6]
+        print(f"✅ Created 2 users, rejected: {result['errors']}")
+
+        alice = session.query(User).filter_by(username='alice').one()
+        bob = session.query(User).filter_by(username='bob').one()
+        assert alice.role == 'admin' and bob.role == 'user'
+        assert bcrypt_check('changeme123', alice.password_hash)
+        assert bcrypt_check('hunter22', bob.password_hash)
+        assert alice.password_hash != hasher.hash('changeme123'), "every hash gets its own salt"
+        print("✅ Passwords hashed with the default or per-row password")
+
+        again = import_users(session, [{'username': 'alice', 'email': 'new@example.com'}], hasher.hash_many)
+        assert again['created'] == [] and again['errors'][0]['error'] == 'Username or email already exists'
+        print("✅ Re-import is rejected by the uniqueness check")
+    finally:
+        hasher.shutdown()
+        session.close()
+        engine.dispose()
+
+def test_concurrent_conflict():
+    """A name taken between the uniqueness check and the insert is reported per row"""
+    print("Testing import racing another writer...")
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'import_race.db')}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    hasher = PasswordHasher(workers=2, max_queue=2, rounds=4)
+
+    def hash_while_racing(passwords):
+        # Another import commits 'frank' while this one is hashing
+        other = Session()
+        try:
+            other.add(User(username='frank', email='frank@example.com', password_hash='x'))
+            other.commit()
+        finally:
+            other.close()
+        return hasher.hash_many(passwords)
+
+    try:
+        rows = [{'username': 'frank', 'email': 'frank@example.com'},
+                {'username': 'grace', 'email': 'grace@example.com'}]
+        result = import_users(session, rows, hash_while_racing)
+        assert [u['username'] for u in result['created']] == ['grace']
+        assert result['errors'] == [{'row': 1, 'error': 'Username or email already exists'}]
+        assert session.query(User).count() == 2
+        print(f"✅ Conflicting row reported: {result['errors']}")
+    finally:
+        hasher.shutdown()
+        session.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    test_import_users()
+    test_concurrent_conflict()
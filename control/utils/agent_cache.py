@@ -0,0 +1,88 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from utils.cache_versions import AGENTS_VERSION, local_generation, read_version
+
+# Defaults for how long the agents version is trusted, and how many user lists are kept
+DEFAULT_MAX_STALENESS = 2.0
+DEFAULT_MAX_ENTRIES = 1024
+
+class AgentCatalogCache:
+    """Serialized per-user agent lists with strong ETags, invalidated by the agents version
+
+    Triggers on the agents table bump the shared version on every write, and
+    update_agent also bumps the local generation. Within max_staleness seconds
+    of the last version check, a hit costs no database access at all.
+    """
+
+    def __init__(self, db_manager, max_staleness: float = DEFAULT_MAX_STALENESS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_manager = db_manager
+        self.max_staleness = max_staleness
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (version token, etag, body)
+        self._token: Optional[tuple] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current_token(self) -> tuple:
+        """(shared version, local generation), re-reading the version when stale"""
+        generation = local_generation(AGENTS_VERSION)
+        token = self._token
+        if (token is not None and token[1] == generation
+                and time.monotonic() - self._checked_at < self.max_staleness):
+            return token
+        conn = self.db_manager.get_connection()
+        try:
+            version = read_version(conn, AGENTS_VERSION)
+        finally:
+            conn.close()
+        token = (version, generation)
+        self._token = token
+        self._checked_at = time.monotonic()
+        return token
+
+    def get(self, key, load: Callable[[], str]) -> Tuple[str, str]:
+        """Get (etag, JSON body) for a cache key, calling load() to rebuild it"""
+        token = self._current_token()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(key)
+                return entry[1], entry[2]
+
+        body = load()
+        etag = hashlib.sha256(body.encode('utf-8')).hexdigest()[:32]
+        with self._lock:
+            self._entries[key] = (token, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag, body
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_cache_lock = threading.Lock()
+
+def get_agent_catalog_cache(app=None) -> AgentCatalogCache:
+    """Get the app-scoped agent list cache"""
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    cache = app.extensions.get('agent_catalog_cache')
+    if cache is None:
+        from utils.database import get_database_manager
+        with _cache_lock:
+            cache = app.extensions.get('agent_catalog_cache')
+            if cache is None:
+                cache = AgentCatalogCache(
+                    get_database_manager(app),
+                    app.config.get('AGENT_CACHE_MAX_STALENESS', DEFAULT_MAX_STALENESS)
+                )
+                app.extensions['agent_catalog_cache'] = cache
+    return cache
@@ -0,0 +1,366 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from utils import cache_versions
+
+# Defaults (overridable via app config)
+DEFAULT_KEEP = 7                 # newest snapshots kept by rotation
+DEFAULT_COMPRESSION = 'gzip'     # gzip | zstd (needs the zstandard package) | none
+DEFAULT_PAGES_PER_STEP = 1024    # pages copied per backup step; locks are released between steps
+DEFAULT_STEP_SLEEP = 0.005       # seconds between steps, letting writers in
+DEFAULT_MAX_RESTARTS = 3         # paged passes restarted by concurrent writes before a one-step copy
+COPY_CHUNK_BYTES = 1024 * 1024
+
+# Caches invalidated by a restore
+CACHED_VERSIONS = (cache_versions.CONFIG_VERSION, cache_versions.AGENTS_VERSION)
+
+COMPRESSIONS = {'gzip': '.db.gz', 'zstd': '.db.zst', 'none': '.db'}
+NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+-\d{8}T\d{6}Z(-[a-z0-9-]+)?$')
+
+class BackupError(Exception):
+    """Raised for unusable backup requests or failed verification"""
+    pass
+
+class BackupBusy(Exception):
+    """Raised when another backup or restore is already running"""
+    pass
+
+class _TooManyRestarts(Exception):
+    pass
+
+def _open_compressed(path: str, mode: str, compression: str):
+    """Binary file object for a snapshot, compressed or not"""
+    if compression == 'gzip':
+        return gzip.open(path, mode, compresslevel=6)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise BackupError("zstd compression needs the 'zstandard' package")
+        raw = open(path, mode)
+        if 'w' in mode:
+            return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    return open(path, mode)
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def integrity_check(path: str) -> str:
+    """PRAGMA integrity_check of a database file; 'ok' when healthy"""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+        return '; '.join(row[0] for row in rows[:10])
+    finally:
+        conn.close()
+
+def online_copy(src_path: str, dst_path: str, pages: int = DEFAULT_PAGES_PER_STEP,
+                step_sleep: float = DEFAULT_STEP_SLEEP, max_restarts: int = DEFAULT_MAX_RESTARTS) -> Dict:
+    """
+    Copy a live database with the SQLite online backup API; returns step counters.
+
+    Locks are only held during each step of `pages` pages. A write from another
+    connection restarts the copy, so under steady writes the paged pass is
+    abandoned after max_restarts and the copy is redone in a single step: one
+    read snapshot, which in WAL mode does not block writers either.
+    """
+    src = sqlite3.connect(src_path, timeout=30)
+    dst = sqlite3.connect(dst_path)
+    state = {'steps': 0, 'restarts': 0, 'remaining': None, 'pages': 0, 'single_step': False}
+
+    def on_progress(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > max_restarts:
+                raise _TooManyRestarts()
+        state['remaining'] = remaining
+        state['pages'] = total
+        state['steps'] += 1
+
+    try:
+        try:
+            src.backup(dst, pages=pages, progress=on_progress, sleep=step_sleep)
+        except _TooManyRestarts:
+            src.backup(dst, pages=-1)
+            state['single_step'] = True
+        state['pages'] = dst.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+    del state['remaining']
+    return state
+
+def _read_versions(conn) -> Dict[str, int]:
+    try:
+        return {name: cache_versions.read_version(conn, name) for name in CACHED_VERSIONS}
+    except sqlite3.OperationalError:
+        # Database without a cache_versions table
+        return {name: 0 for name in CACHED_VERSIONS}
+
+class BackupManager:
+    """Compressed, verified snapshots of the shared database, with rotation and restore
+
+    Each snapshot is a compressed database file plus a JSON manifest with its
+    checksum and integrity result. One backup or restore runs at a time per
+    process; a second one raises BackupBusy.
+    """
+
+    def __init__(self, db_path: str, backup_dir: str, keep: int = DEFAULT_KEEP,
+                 compression: str = DEFAULT_COMPRESSION, pages_per_step: int = DEFAULT_PAGES_PER_STEP,
+                 step_sleep: float = DEFAULT_STEP_SLEEP, max_restarts: int = DEFAULT_MAX_RESTARTS):
+        if compression not in COMPRESSIONS:
+            raise BackupError(f"compression must be one of: {', '.join(COMPRESSIONS)}")
+        self.db_path = os.path.abspath(db_path)
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.compression = compression
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+        self._lock = threading.Lock()
+
+    def _exclusive(self):
+        if not self._lock.acquire(blocking=False):
+            raise BackupBusy('A backup or restore is already running')
+
+    def _manifest_path(self, name: str) -> str:
+        if not NAME_PATTERN.match(name or ''):
+            raise BackupError(f'Invalid backup name: {name!r}')
+        return os.path.join(self.backup_dir, name + '.json')
+
+    def get_manifest(self, name: str) -> Dict:
+        path = self._manifest_path(name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f'No backup named {name}')
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_manifest(self, manifest: Dict):
+        path = self._manifest_path(manifest['name'])
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def snapshot_path(self, name: str) -> str:
+        """Path of a snapshot file (for downloads)"""
+        return os.path.join(self.backup_dir, self.get_manifest(name)['file'])
+
+    def list_backups(self) -> List[Dict]:
+        """Manifests of every snapshot, newest first"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        manifests = []
+        for entry in os.listdir(self.backup_dir):
+            if entry.endswith('.json'):
+                try:
+                    manifests.append(self.get_manifest(entry[:-len('.json')]))
+                except (BackupError, ValueError, OSError):
+                    continue
+        return sorted(manifests, key=lambda m: m['created_at'], reverse=True)
+
+    def create_backup(self, label: str = None, compression: str = None) -> Dict:
+        """Take an online snapshot, verify it, compress it and rotate old ones"""
+        compression = compression or self.compression
+        if compression not in COMPRESSIONS:
+            raise BackupError(f"compression must be one of: {', '.join(COMPRESSIONS)}")
+        if label and not re.match(r'^[a-z0-9-]{1,32}$', label):
+            raise BackupError('label may only contain a-z, 0-9 and -')
+        self._exclusive()
+        try:
+            manifest = self._create(label, compression)
+            manifest['rotated'] = self.rotate()
+            return manifest
+        finally:
+            self._lock.release()
+
+    def _create(self, label: Optional[str], compression: str) -> Dict:
+        os.makedirs(self.backup_dir, exist_ok=True)
+        created = datetime.utcnow()
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        name = f"{stem}-{created.strftime('%Y%m%dT%H%M%SZ')}" + (f'-{label}' if label else '')
+        if os.path.exists(self._manifest_path(name)):
+            raise BackupBusy('A backup was already taken this second')
+        filename = name + COMPRESSIONS[compression]
+        started = time.perf_counter()
+
+        fd, copy_path = tempfile.mkstemp(suffix='.db', dir=self.backup_dir)
+        os.close(fd)
+        try:
+            copy = online_copy(self.db_path, copy_path, self.pages_per_step, self.step_sleep, self.max_restarts)
+            copied_at = time.perf_counter()
+            integrity = integrity_check(copy_path)
+            if integrity != 'ok':
+                raise BackupError(f'Snapshot failed integrity_check: {integrity}')
+            size = os.path.getsize(copy_path)
+
+            part_path = os.path.join(self.backup_dir, filename + '.part')
+            with open(copy_path, 'rb') as src, _open_compressed(part_path, 'wb', compression) as dst:
+                shutil.copyfileobj(src, dst, COPY_CHUNK_BYTES)
+            os.replace(part_path, os.path.join(self.backup_dir, filename))
+        finally:
+            for leftover in (copy_path, copy_path + '-journal'):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+        manifest = {
+            'name': name,
+            'file': filename,
+            'created_at': created.isoformat() + 'Z',
+            'label': label,
+            'compression': compression,
+            'database_bytes': size,
+            'file_bytes': os.path.getsize(os.path.join(self.backup_dir, filename)),
+            'sha256': _sha256(os.path.join(self.backup_dir, filename)),
+            'integrity': integrity,
+            'verified_at': created.isoformat() + 'Z',
+            'copy': copy,
+            'copy_ms': round((copied_at - started) * 1000, 1),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+        self._save_manifest(manifest)
+        return manifest
+
+    def rotate(self, exclude: tuple = ()) -> List[str]:
+        """Delete all but the newest `keep` snapshots (never those in exclude); returns deleted names"""
+        removed = []
+        kept = [m for m in self.list_backups() if m['name'] not in exclude]
+        for manifest in kept[max(self.keep - len(exclude), 0):]:
+            self._delete(manifest)
+            removed.append(manifest['name'])
+        return removed
+
+    def _delete(self, manifest: Dict):
+        for path in (os.path.join(self.backup_dir, manifest['file']), self._manifest_path(manifest['name'])):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def delete_backup(self, name: str):
+        self._delete(self.get_manifest(name))
+
+    def _extract(self, manifest: Dict, dst_dir: str) -> str:
+        """Check the checksum and decompress a snapshot into dst_dir; returns the file path"""
+        path = os.path.join(self.backup_dir, manifest['file'])
+        if _sha256(path) != manifest['sha256']:
+            raise BackupError(f"{manifest['name']}: checksum mismatch")
+        fd, out_path = tempfile.mkstemp(suffix='.db', dir=dst_dir)
+        os.close(fd)
+        try:
+            with _open_compressed(path, 'rb', manifest['compression']) as src, open(out_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, COPY_CHUNK_BYTES)
+            integrity = integrity_check(out_path)
+            if integrity != 'ok':
+                raise BackupError(f"{manifest['name']}: integrity_check failed: {integrity}")
+        except Exception:
+            os.remove(out_path)
+            raise
+        return out_path
+
+    def verify_backup(self, name: str) -> Dict:
+        """Re-check a snapshot's checksum and integrity; records the result in its manifest"""
+        manifest = self.get_manifest(name)
+        try:
+            os.remove(self._extract(manifest, self.backup_dir))
+            manifest['integrity'] = 'ok'
+        except BackupError as e:
+            manifest['integrity'] = str(e)
+        manifest['verified_at'] = datetime.utcnow().isoformat() + 'Z'
+        self._save_manifest(manifest)
+        return manifest
+
+    def restore_backup(self, name: str, db_manager=None, safety_backup: bool = True) -> Dict:
+        """
+        Replace the contents of the live database with a snapshot.
+
+        The snapshot is verified and unpacked next to the database, the current
+        contents are optionally snapshotted first, then the unpacked copy is
+        written over the live database with the online backup API. That is an
+        ordinary write transaction: it waits for in-flight writers, and every
+        open connection, in this process or another, reads the restored data
+        afterwards. Rotation runs last and never removes the restored snapshot.
+        """
+        manifest = self.get_manifest(name)
+        self._exclusive()
+        try:
+            started = time.perf_counter()
+            restored_path = self._extract(manifest, os.path.dirname(self.db_path))
+            try:
+                safety = self._create('pre-restore', self.compression) if safety_backup else None
+                self._restore_into_live(restored_path)
+            finally:
+                os.remove(restored_path)
+            if db_manager is not None:
+                db_manager.forget_schema()
+                # The snapshot may predate later migrations
+                db_manager.migrate_schema()
+            for version_name in CACHED_VERSIONS:
+                cache_versions.mark_changed(version_name)
+            return {
+                'restored': name,
+                'safety_backup': safety['name'] if safety else None,
+                'rotated': self.rotate(exclude=(name,)),
+                'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+            }
+        finally:
+            self._lock.release()
+
+    def _restore_into_live(self, restored_path: str):
+        """Copy an unpacked snapshot over the live database in one write transaction"""
+        src = sqlite3.connect(restored_path)
+        # Writers hold the lock only briefly; wait for them rather than failing
+        dst = sqlite3.connect(self.db_path, timeout=60)
+        try:
+            versions = _read_versions(dst)
+            src.backup(dst)
+            # Other workers compare cache versions for equality; move past both
+            # the live and the restored counters so every worker reloads
+            restored = _read_versions(dst)
+            dst.execute(cache_versions.CREATE_TABLE_SQL)
+            for version_name in CACHED_VERSIONS:
+                dst.execute(
+                    "INSERT OR REPLACE INTO cache_versions (name, version, updated_at) VALUES (?, ?, datetime('now'))",
+                    (version_name, max(versions[version_name], restored[version_name]) + 1)
+                )
+            dst.commit()
+        except sqlite3.Error as e:
+            raise BackupError(f'Restore failed: {e}')
+        finally:
+            dst.close()
+            src.close()
+
+_manager_lock = threading.Lock()
+
+def get_backup_manager(app=None) -> BackupManager:
+    """Get the app-scoped backup manager"""
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    manager = app.extensions.get('backup_manager')
+    if manager is None:
+        with _manager_lock:
+            manager = app.extensions.get('backup_manager')
+            if manager is None:
+                db_path = app.config['DATABASE_PATH']
+                manager = BackupManager(
+                    db_path,
+                    app.config.get('BACKUP_DIR') or os.path.join(os.path.dirname(db_path), 'backups'),
+                    keep=app.config.get('BACKUP_KEEP', DEFAULT_KEEP),
+                    compression=app.config.get('BACKUP_COMPRESSION', DEFAULT_COMPRESSION),
+                    pages_per_step=app.config.get('BACKUP_PAGES_PER_STEP', DEFAULT_PAGES_PER_STEP),
+                    step_sleep=app.config.get('BACKUP_STEP_SLEEP', DEFAULT_STEP_SLEEP)
+                )
+                app.extensions['backup_manager'] = manager
+    return manager
@@ -0,0 +1,48 @@
+"""
+Monotonic change counters used to invalidate in-process caches.
+
+Writers bump a named version inside their own transaction, so every worker
+process can detect the change with a one-row read. The same writer also bumps
+a local generation, which lets caches in the writing process reload at once
+without reading the database.
+"""
+
+import threading
+from typing import Dict
+
+CONFIG_VERSION = 'system_config'
+AGENTS_VERSION = 'agents'
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+BUMP_SQL = """
+    INSERT INTO cache_versions (name, version, updated_at) VALUES (:name, 1, datetime('now'))
+    ON CONFLICT(name) DO UPDATE SET version = version + 1, updated_at = datetime('now')
+"""
+
+_local_lock = threading.Lock()
+_local_generations: Dict[str, int] = {}
+
+def local_generation(name: str) -> int:
+    """Get the in-process generation for a version name"""
+    return _local_generations.get(name, 0)
+
+def mark_changed(name: str):
+    """Invalidate caches for a version name in this process"""
+    with _local_lock:
+        _local_generations[name] = _local_generations.get(name, 0) + 1
+
+def read_version(conn, name: str) -> int:
+    """Read the shared version for a name (0 if it was never bumped)"""
+    row = conn.execute("SELECT version FROM cache_versions WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+def bump_version(conn, name: str):
+    """Bump the shared version for a name; call inside the writer's transaction"""
+    conn.execute(BUMP_SQL, {'name': name})
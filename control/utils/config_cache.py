@@ -0,0 +1,93 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from utils.cache_versions import CONFIG_VERSION, local_generation, read_version
+
+# Default for how long a snapshot is trusted before the shared version is re-read
+DEFAULT_MAX_STALENESS = 2.0
+
+class ConfigSnapshot:
+    __slots__ = ('values', 'version', 'generation', 'checked_at')
+
+    def __init__(self, values: Dict[str, str], version: int, generation: int, checked_at: float):
+        self.values = values
+        self.version = version
+        self.generation = generation
+        self.checked_at = checked_at
+
+class ConfigSnapshotCache:
+    """In-process snapshot of system_config, invalidated by the config version
+
+    Writes made by this process are visible on the next read. Writes made by
+    other worker processes become visible within max_staleness seconds, at
+    the cost of one single-row version read.
+    """
+
+    def __init__(self, db_manager, max_staleness: float = DEFAULT_MAX_STALENESS):
+        self.db_manager = db_manager
+        self.max_staleness = max_staleness
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._lock = threading.Lock()
+
+    def get_all(self) -> Dict[str, str]:
+        """Get all configuration values (treat the returned dict as read-only)"""
+        snapshot = self._snapshot
+        if (snapshot is not None
+                and snapshot.generation == local_generation(CONFIG_VERSION)
+                and time.monotonic() - snapshot.checked_at < self.max_staleness):
+            return snapshot.values
+        return self._refresh().values
+
+    def get(self, config_key: str, default: str = None) -> Optional[str]:
+        """Get a specific configuration value"""
+        return self.get_all().get(config_key, default)
+
+    def invalidate(self):
+        """Force a reload on the next read"""
+        self._snapshot = None
+
+    def _refresh(self) -> ConfigSnapshot:
+        with self._lock:
+            generation = local_generation(CONFIG_VERSION)
+            now = time.monotonic()
+            snapshot = self._snapshot
+            if (snapshot is not None and snapshot.generation == generation
+                    and now - snapshot.checked_at < self.max_staleness):
+                return snapshot  # another thread refreshed while we waited
+
+            conn = self.db_manager.get_connection()
+            try:
+                # Version and values come from one read transaction so they match
+                conn.execute("BEGIN")
+                version = read_version(conn, CONFIG_VERSION)
+                if snapshot is not None and snapshot.generation == generation and snapshot.version == version:
+                    snapshot.checked_at = now
+                    return snapshot
+                rows = conn.execute("SELECT config_key, config_value FROM system_config").fetchall()
+            finally:
+                conn.close()
+
+            snapshot = ConfigSnapshot({row[0]: row[1] for row in rows}, version, generation, now)
+            self._snapshot = snapshot
+            return snapshot
+
+_cache_lock = threading.Lock()
+
+def get_config_cache(app=None) -> ConfigSnapshotCache:
+    """Get the app-scoped system_config snapshot cache"""
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    cache = app.extensions.get('config_cache')
+    if cache is None:
+        from utils.database import get_database_manager
+        with _cache_lock:
+            cache = app.extensions.get('config_cache')
+            if cache is None:
+                cache = ConfigSnapshotCache(
+                    get_database_manager(app),
+                    app.config.get('CONFIG_CACHE_MAX_STALENESS', DEFAULT_MAX_STALENESS)
+                )
+                app.extensions['config_cache'] = cache
+    return cache
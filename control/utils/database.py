@@ -1,18 +1,168 @@
 import sqlite3
 import json
 import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List, Any
+from utils.sqlite_config import resolve_pragmas, apply_pragmas
+from utils import cache_versions, migrations
+from utils.notifications import NotificationHub, INBOX_TOPIC, responses_topic
+
+# Defaults for the app-scoped connection pool (overridable via app config)
+DEFAULT_POOL_SIZE = 8
+DEFAULT_POOL_TIMEOUT = 30.0
+
+# Rows per multi-row INSERT in bulk session upserts (5 parameters each)
+UPSERT_CHUNK_ROWS = 100
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+    pass
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of SQLite connections"""
+    
+    def __init__(self, factory, size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_POOL_TIMEOUT):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.factory = factory
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+    
+    def acquire(self, timeout: float = None) -> sqlite3.Connection:
+        """Check out a connection, creating one if no idle connection exists"""
+        if timeout is None:
+            timeout = self.timeout
+        if self._closed:
+            raise PoolTimeoutError("Connection pool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeoutError(f"No database connection available after {timeout}s (pool size {self.size})")
+        try:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                conn = self.factory()
+                with self._lock:
+                    self._created += 1
+                return conn
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, discarding it if it is unusable"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            if self._closed:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+        except sqlite3.Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+    
+    def _discard(self, conn: sqlite3.Connection):
+        """Close a connection that will not be reused"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+    
+    def close(self):
+        """Close all idle connections; checked-out connections close on release"""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+    
+    def stats(self) -> Dict[str, int]:
+        """Get pool usage counters"""
+        idle = self._idle.qsize()
+        with self._lock:
+            created = self._created
+        return {
+            'size': self.size,
+            'open': created,
+            'idle': idle,
+            'in_use': created - idle
+        }
+
+class PooledConnection:
+    """Proxy for a pooled sqlite3 connection; close() returns it to the pool"""
+    
+    def __init__(self, pool: ConnectionPool, conn: sqlite3.Connection):
+        self._pool = pool
+        self._conn = conn
+    
+    def close(self):
+        """Return the underlying connection to the pool"""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+    
+    def __getattr__(self, name):
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        # Same semantics as sqlite3.Connection: commit or roll back, but do not close
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
 
 class DatabaseManager:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 pool_timeout: float = DEFAULT_POOL_TIMEOUT, pragmas: Dict[str, Any] = None):
         if db_path is None:
             from flask import current_app
             db_path = current_app.config['DATABASE_PATH']
         
         self.db_path = db_path
+        self.pragmas = resolve_pragmas(pragmas)
+        self.pool = ConnectionPool(self._connect, pool_size, pool_timeout)
+        self._config_columns = None
+        # Wakes parked long-poll/stream requests when rows they wait for are written
+        self.events = NotificationHub()
         self.ensure_db_directory()
-        self.init_database()
+        self.migrate_schema()
+    
+    @classmethod
+    def from_app(cls, app) -> 'DatabaseManager':
+        """Build a manager from Flask app configuration"""
+        return cls(
+            app.config.get('DATABASE_PATH', 'web_chat_bridge.db'),
+            pool_size=app.config.get('DATABASE_POOL_SIZE', DEFAULT_POOL_SIZE),
+            pool_timeout=app.config.get('DATABASE_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT),
+            pragmas=app.config.get('DATABASE_PRAGMAS')
+        )
     
     def ensure_db_directory(self):
         """Ensure database directory exists"""
@@ -20,12 +170,42 @@ class DatabaseManager:
         if db_dir:  # Only create directory if there is one
             os.makedirs(db_dir, exist_ok=True)
     
-    def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new raw connection for the pool"""
+        # Connections are handed between threads by the pool, never shared concurrently
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        apply_pragmas(conn, self.pragmas)
         return conn
     
+    def get_connection(self):
+        """Get database connection (call close() to return it to the pool)"""
+        return PooledConnection(self.pool, self.pool.acquire())
+    
+    @contextmanager
+    def transaction(self):
+        """Run statements in one write transaction on one pooled connection"""
+        conn = self.get_connection()
+        try:
+            # Take the write lock up front so concurrent writers queue on busy_timeout
+            # instead of failing when a read transaction tries to upgrade
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close()
+    
+    def forget_schema(self):
+        """Drop cached schema details (the database contents were replaced)"""
+        self._config_columns = None
+    
     def init_database(self):
         """Initialize database with schema"""
         conn = self.get_connection()
@@ -81,6 +261,24 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def migrate_schema(self):
+        """Create the bridge schema if needed and apply pending migrations"""
+        conn = self.get_connection()
+        try:
+            # Already current: startup costs this one query
+            if migrations.is_current(conn):
+                return
+        finally:
+            conn.close()
+        
+        self.init_database()
+        conn = self.get_connection()
+        try:
+            # Steps for the web UI tables are skipped until init_database.py / init_db() creates them
+            migrations.migrate(conn)
+        finally:
+            conn.close()
+    
     def create_basic_schema(self, conn):
         """Create basic database schema if no init script exists"""
         cursor = conn.cursor()
@@ -242,10 +440,88 @@ class DatabaseManager:
                 VALUES (?, ?, datetime('now'))
             """, (session_id, message))
             conn.commit()
+            self.events.publish(INBOX_TOPIC)
             return cursor.lastrowid
         finally:
             conn.close()
     
+    def ingest_message(self, session_id: str, message: str, ip_address: str = None,
+                       user_agent: str = None) -> Dict[str, Any]:
+        """Upsert the session, resolve its UID and store the message in one transaction"""
+        candidate_uid = self.generate_uid()
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO web_chat_sessions (session_id, uid, ip_address, user_agent, metadata)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(session_id) DO UPDATE SET last_activity = datetime('now')
+                RETURNING uid
+            """, (session_id, candidate_uid, ip_address, user_agent, json.dumps({})))
+            uid = cursor.fetchone()['uid']
+            
+            cursor.execute("""
+                INSERT INTO web_chat_messages (session_id, message, timestamp)
+                VALUES (?, ?, datetime('now'))
+                RETURNING id
+            """, (session_id, message))
+            message_id = cursor.fetchone()['id']
+        
+        self.events.publish(INBOX_TOPIC)
+        return {
+            'message_id': message_id,
+            'uid': uid,
+            # The freshly generated UID only comes back if the insert branch ran
+            'is_new': uid == candidate_uid
+        }
+    
+    def ingest_messages(self, items: List[tuple], ip_address: str = None,
+                        user_agent: str = None) -> List[Dict[str, Any]]:
+        """Bulk version of ingest_message for (session_id, message) tuples, in one transaction
+        
+        Returns {'message_id', 'uid', 'is_new'} for each item, in input order.
+        """
+        if not items:
+            return []
+        
+        # One candidate UID per distinct session, in first-seen order
+        candidates = {}
+        for session_id, _ in items:
+            if session_id not in candidates:
+                candidates[session_id] = self.generate_uid()
+        
+        uids = {}
+        metadata = json.dumps({})
+        session_rows = [(sid, uid, ip_address, user_agent, metadata) for sid, uid in candidates.items()]
+        with self.transaction() as conn:
+            # Multi-row upsert, chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(session_rows), UPSERT_CHUNK_ROWS):
+                chunk = session_rows[start:start + UPSERT_CHUNK_ROWS]
+                values = ','.join(['(?, ?, ?, ?, ?)' for _ in chunk])
+                rows = conn.execute(f"""
+                    INSERT INTO web_chat_sessions (session_id, uid, ip_address, user_agent, metadata)
+                    VALUES {values}
+                    ON CONFLICT(session_id) DO UPDATE SET last_activity = datetime('now')
+                    RETURNING session_id, uid
+                """, [value for row in chunk for value in row]).fetchall()
+                uids.update((row['session_id'], row['uid']) for row in rows)
+            
+            conn.executemany("""
+                INSERT INTO web_chat_messages (session_id, message, timestamp)
+                VALUES (?, ?, datetime('now'))
+            """, items)
+            # AUTOINCREMENT ids are consecutive while we hold the write lock
+            first_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0] - len(items) + 1
+        
+        self.events.publish(INBOX_TOPIC)
+        return [
+            {
+                'message_id': first_id + index,
+                'uid': uids[session_id],
+                'is_new': uids[session_id] == candidates[session_id]
+            }
+            for index, (session_id, _) in enumerate(items)
+        ]
+    
     def get_unprocessed_messages(self, limit: int, offset: int, since: str = None) -> List[Dict]:
         """Get unprocessed messages - IDENTICAL to PHP version"""
         conn = self.get_connection()
@@ -313,6 +589,77 @@ class DatabaseManager:
         finally:
             conn.close()
     
+    def claim_messages(self, limit: int, after_id: int = 0, lease_seconds: int = None) -> Dict[str, Any]:
+        """
+        Atomically claim a batch of unprocessed messages with id > after_id.
+        
+        Without a lease, claimed messages are marked processed immediately.
+        With a lease, they stay unprocessed but are hidden from other pollers
+        until the lease expires; ack_messages() then marks them processed.
+        Messages whose lease expired are redelivered whatever after_id is, so
+        a consumer advancing its cursor still gets them back.
+        Concurrent pollers never receive the same message while it is claimed.
+        """
+        now = int(time.time())
+        claim_token = secrets.token_hex(16) if lease_seconds else None
+        lease_expires = now + lease_seconds if lease_seconds else None
+        
+        if lease_seconds:
+            assignment = "lease_expires = :lease_expires, claim_token = :claim_token"
+        else:
+            assignment = "processed = 1, lease_expires = NULL, claim_token = NULL"
+        
+        # The subquery walks idx_web_chat_messages_processed_id in id order
+        sql = f"""
+            UPDATE web_chat_messages SET {assignment}
+            WHERE id IN (
+                SELECT id FROM web_chat_messages
+                WHERE processed = 0
+                  AND ((id > :after_id AND lease_expires IS NULL) OR lease_expires <= :now)
+                ORDER BY id
+                LIMIT :limit
+            )
+            RETURNING id, session_id, message, timestamp,
+                (SELECT s.uid FROM web_chat_sessions s
+                 WHERE s.session_id = web_chat_messages.session_id) AS uid
+        """
+        with self.transaction() as conn:
+            rows = conn.execute(sql, {
+                'lease_expires': lease_expires,
+                'claim_token': claim_token,
+                'after_id': after_id,
+                'now': now,
+                'limit': limit
+            }).fetchall()
+        
+        # RETURNING order is unspecified
+        messages = sorted((dict(row) for row in rows), key=lambda m: m['id'])
+        return {
+            'messages': messages,
+            'claim_token': claim_token,
+            'lease_expires': lease_expires
+        }
+    
+    def ack_messages(self, message_ids: List[int], claim_token: str) -> int:
+        """Mark messages processed; only messages currently leased under claim_token match"""
+        if not message_ids:
+            return 0
+        
+        conn = self.get_connection()
+        try:
+            placeholders = ','.join(['?' for _ in message_ids])
+            sql = f"""
+                UPDATE web_chat_messages
+                SET processed = 1, lease_expires = NULL, claim_token = NULL
+                WHERE id IN ({placeholders}) AND processed = 0 AND claim_token = ?
+            """
+            params = [*message_ids, claim_token]
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+    
     def create_response(self, session_id: str, response: str, message_id: int = None) -> int:
         """Create new response - IDENTICAL to PHP"""
         conn = self.get_connection()
@@ -323,10 +670,47 @@ class DatabaseManager:
                 VALUES (?, ?, ?, datetime('now'))
             """, (session_id, response, message_id))
             conn.commit()
+            self.events.publish(responses_topic(session_id))
             return cursor.lastrowid
         finally:
             conn.close()
     
+    def create_responses(self, items: List[tuple]) -> List[Optional[int]]:
+        """Store (session_id, response, message_id) tuples in one transaction
+        
+        Returns the new response id for each item, in order, or None where the
+        session does not exist.
+        """
+        if not items:
+            return []
+        
+        session_ids = list({item[0] for item in items})
+        with self.transaction() as conn:
+            placeholders = ','.join(['?' for _ in session_ids])
+            known = {row[0] for row in conn.execute(
+                f"SELECT session_id FROM web_chat_sessions WHERE session_id IN ({placeholders})", session_ids
+            )}
+            accepted = [item for item in items if item[0] in known]
+            if accepted:
+                conn.executemany("""
+                    INSERT INTO web_chat_responses (session_id, response, message_id, timestamp)
+                    VALUES (?, ?, ?, datetime('now'))
+                """, accepted)
+                # AUTOINCREMENT ids are consecutive while we hold the write lock
+                next_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0] - len(accepted) + 1
+        
+        response_ids = []
+        for item in items:
+            if item[0] in known:
+                response_ids.append(next_id)
+                next_id += 1
+            else:
+                response_ids.append(None)
+        
+        for session_id in known:
+            self.events.publish(responses_topic(session_id))
+        return response_ids
+    
     def create_response_with_message_id(self, session_id: str, response: str, message_id: int = None) -> int:
         """Create new response with message_id - IDENTICAL to PHP"""
         return self.create_response(session_id, response, message_id)
@@ -368,27 +752,64 @@ class DatabaseManager:
         finally:
             conn.close()
     
-    def get_active_sessions(self, limit: int, offset: int, active: bool = True) -> List[Dict]:
-        """Get active sessions with message/response counts - IDENTICAL to PHP"""
+    def get_responses_after(self, session_id: str, after_id: int = 0, limit: int = 50) -> List[Dict]:
+        """Get up to limit responses for a session with id > after_id, oldest first"""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, response, timestamp, message_id
+                FROM web_chat_responses
+                WHERE session_id = ? AND id > ?
+                ORDER BY id ASC
+                LIMIT ?
+            """, (session_id, after_id, limit))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def get_responses_page(self, session_id: str, after_id: int = 0, limit: int = 50) -> Dict:
+        """Get one page of responses after a cursor, with next_cursor and has_more"""
+        # Fetch one extra row to learn whether another page follows
+        rows = self.get_responses_after(session_id, after_id, limit + 1)
+        responses = rows[:limit]
+        return {
+            'responses': responses,
+            'next_cursor': responses[-1]['id'] if responses else after_id,
+            'has_more': len(rows) > limit
+        }
+    
+    def get_active_sessions(self, limit: int, offset: int = 0, active: bool = True,
+                            before: Optional[tuple] = None) -> List[Dict]:
+        """Get sessions with message/response counts, most recently active first
+        
+        Counts come from the trigger-maintained counters on web_chat_sessions, so
+        this is an ordered scan of the last_activity index. Pass `before` as the
+        (last_activity, id) of the previous page's last row for keyset paging.
+        """
         conn = self.get_connection()
         try:
             cursor = conn.cursor()
             
-            # Query IDENTICAL to PHP version
-            sql = """
-                SELECT s.id, s.uid, s.created_at, s.last_active, s.ip_address, s.metadata,
-                       COUNT(DISTINCT m.id) as message_count,
-                       COUNT(DISTINCT r.id) as response_count
-                FROM web_chat_sessions s
-                LEFT JOIN web_chat_messages m ON s.id = m.session_id
-                LEFT JOIN web_chat_responses r ON s.id = r.session_id
-                WHERE s.last_active > datetime('now', '-1 day')
-                GROUP BY s.id
-                ORDER BY s.last_active DESC
+            where_conditions = []
+            params = []
+            if active:
+                where_conditions.append("last_activity > datetime('now', '-1 day')")
+            if before is not None:
+                where_conditions.append("(last_activity, id) < (?, ?)")
+                params.extend(before)
+            where_clause = f"WHERE {' AND '.join(where_conditions)}" if where_conditions else ""
+            
+            sql = f"""
+                SELECT id, session_id, uid, created_at, last_activity, ip_address, metadata,
+                       message_count, response_count
+                FROM web_chat_sessions
+                {where_clause}
+                ORDER BY last_activity DESC, id DESC
                 LIMIT ? OFFSET ?
             """
             
-            cursor.execute(sql, [limit, offset])
+            cursor.execute(sql, params + [limit, 0 if before is not None else offset])
             return [dict(row) for row in cursor.fetchall()]
         finally:
             conn.close()
@@ -399,7 +820,7 @@ class DatabaseManager:
         try:
             cursor = conn.cursor()
             if active:
-                cursor.execute("SELECT COUNT(*) FROM web_chat_sessions WHERE last_active > datetime('now', '-1 day')")
+                cursor.execute("SELECT COUNT(*) FROM web_chat_sessions WHERE last_activity > datetime('now', '-1 day')")
             else:
                 cursor.execute("SELECT COUNT(*) FROM web_chat_sessions")
             return cursor.fetchone()[0]
@@ -413,7 +834,7 @@ class DatabaseManager:
             cursor = conn.cursor()
             cursor.execute("""
                 DELETE FROM web_chat_sessions 
-                WHERE last_active < datetime('now', '-1800 seconds')
+                WHERE last_activity < datetime('now', '-1800 seconds')
             """)
             conn.commit()
             return cursor.rowcount
@@ -443,38 +864,48 @@ class DatabaseManager:
     
     def update_config(self, config_data: Dict[str, str]):
         """Update configuration values"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            for key, value in config_data.items():
-                # Check if created_at column exists
-                cursor.execute("PRAGMA table_info(system_config)")
-                columns = [row[1] for row in cursor.fetchall()]
-                
-                if 'created_at' in columns:
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO system_config (config_key, config_value, created_at, updated_at)
-                        VALUES (?, ?, COALESCE((SELECT created_at FROM system_config WHERE config_key = ?), datetime('now')), datetime('now'))
-                    """, (key, value, key))
-                else:
-                    # Fallback for older schema without created_at
-                    cursor.execute("""
-                        INSERT OR REPLACE INTO system_config (config_key, config_value, updated_at)
-                        VALUES (?, ?, datetime('now'))
-                    """, (key, value))
-            conn.commit()
-        finally:
-            conn.close()
+        self.set_config_many(config_data)
+    
+    def _system_config_columns(self, conn) -> set:
+        """Columns of system_config, read once per manager"""
+        if self._config_columns is None:
+            self._config_columns = {row[1] for row in conn.execute("PRAGMA table_info(system_config)")}
+        return self._config_columns
+    
+    def set_config_many(self, config_data: Dict[str, str]):
+        """Upsert many configuration values in one transaction with one config version bump"""
+        if not config_data:
+            return
+        
+        with self.transaction() as conn:
+            # Older schemas lack created_at; the upsert keeps it (and description) on update
+            if 'created_at' in self._system_config_columns(conn):
+                sql = """
+                    INSERT INTO system_config (config_key, config_value, created_at, updated_at)
+                    VALUES (?, ?, datetime('now'), datetime('now'))
+                    ON CONFLICT(config_key) DO UPDATE SET
+                        config_value = excluded.config_value, updated_at = excluded.updated_at
+                """
+            else:
+                sql = """
+                    INSERT INTO system_config (config_key, config_value, updated_at)
+                    VALUES (?, ?, datetime('now'))
+                    ON CONFLICT(config_key) DO UPDATE SET
+                        config_value = excluded.config_value, updated_at = excluded.updated_at
+                """
+            conn.executemany(sql, [(key, value) for key, value in config_data.items()])
+            cache_versions.bump_version(conn, cache_versions.CONFIG_VERSION)
+        cache_versions.mark_changed(cache_versions.CONFIG_VERSION)
     
     def update_session_activity(self, session_id: str):
-        """Update the last_active timestamp for a session - IDENTICAL to PHP"""
+        """Update the last_activity timestamp for a session - IDENTICAL to PHP"""
         conn = self.get_connection()
         try:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE web_chat_sessions 
-                SET last_active = datetime('now')
-                WHERE id = ?
+                SET last_activity = datetime('now')
+                WHERE session_id = ?
             """, (session_id,))
             conn.commit()
         finally:
@@ -483,3 +914,25 @@ class DatabaseManager:
     def cleanup_expired_sessions(self) -> int:
         """Clean up expired sessions (alias for cleanup_inactive_sessions)"""
         return self.cleanup_inactive_sessions()
+
+
+_manager_lock = threading.Lock()
+
+def init_database_manager(app) -> DatabaseManager:
+    """Create the app-scoped DatabaseManager; schema bootstrap runs once here"""
+    with _manager_lock:
+        manager = app.extensions.get('database_manager')
+        if manager is None:
+            manager = DatabaseManager.from_app(app)
+            app.extensions['database_manager'] = manager
+        return manager
+
+def get_database_manager(app=None) -> DatabaseManager:
+    """Get the app-scoped DatabaseManager, creating it on first use"""
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    manager = app.extensions.get('database_manager')
+    if manager is None:
+        manager = init_database_manager(app)
+    return manager
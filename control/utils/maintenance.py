@@ -0,0 +1,180 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Tuple
+
+# Defaults (overridable via app config)
+DEFAULT_INTERVAL = 300           # seconds between sweeps, before jitter
+DEFAULT_JITTER = 0.2             # each wait is interval * (1 +/- jitter)
+DEFAULT_BATCH_SIZE = 500         # rows per DELETE; one short write transaction each
+DEFAULT_TIME_BUDGET = 0.5        # seconds one table's sweep may spend before yielding to the next run
+DEFAULT_SESSION_IDLE = 1800      # web_chat_sessions idle this long are removed (as ?action=cleanup)
+DEFAULT_RATE_LIMIT_WINDOW = 3600
+# Pause between batches so request writers can take the lock
+BATCH_PAUSE_SECONDS = 0.01
+
+def batched_delete(db_manager, table: str, where: str, params: Tuple = (),
+                   batch_size: int = DEFAULT_BATCH_SIZE, time_budget: float = DEFAULT_TIME_BUDGET,
+                   clock: Callable[[], float] = time.monotonic) -> Tuple[int, bool]:
+    """
+    DELETE matching rows in batches of batch_size; returns (rows deleted, finished).
+
+    Each batch is its own transaction on a pooled connection that is returned
+    between batches. finished is False when time_budget ran out with rows left.
+    """
+    sql = f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {where} LIMIT ?)"
+    deadline = clock() + time_budget
+    total = 0
+    while True:
+        conn = db_manager.get_connection()
+        try:
+            deleted = conn.execute(sql, (*params, batch_size)).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+        total += deleted
+        if deleted < batch_size:
+            return total, True
+        if clock() >= deadline:
+            return total, False
+        time.sleep(BATCH_PAUSE_SECONDS)
+
+# Keeps a web_chat_sessions row while the bridge still has messages of it to
+# deliver (or leased); without it claims lose their uid and replies are rejected
+KEEP_SESSIONS_WITH_PENDING_MESSAGES = (
+    "NOT EXISTS (SELECT 1 FROM web_chat_messages m "
+    "WHERE m.session_id = web_chat_sessions.session_id AND m.processed = 0)"
+)
+
+class MaintenanceScheduler:
+    """Daemon thread sweeping expired and idle rows out of the shared database
+
+    Sweeps run at jittered intervals so several workers sharing the database
+    do not fire together. Every table gets a bounded number of small DELETE
+    batches per run; whatever is left over is picked up by the next run.
+    """
+
+    def __init__(self, db_manager, interval: float = DEFAULT_INTERVAL, jitter: float = DEFAULT_JITTER,
+                 batch_size: int = DEFAULT_BATCH_SIZE, time_budget: float = DEFAULT_TIME_BUDGET,
+                 session_idle: int = DEFAULT_SESSION_IDLE, rate_limit_window: int = DEFAULT_RATE_LIMIT_WINDOW):
+        self.db_manager = db_manager
+        self.interval = interval
+        self.jitter = jitter
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+        self.session_idle = session_idle
+        self.rate_limit_window = rate_limit_window
+        self.tasks = {
+            'user_sessions': self._expired_user_sessions,
+            'web_chat_sessions': self._idle_chat_sessions,
+            'rate_limits': self._stale_rate_limits,
+        }
+        self._stats = {name: {'runs': 0, 'deleted': 0, 'last_deleted': 0, 'last_duration_ms': 0.0,
+                              'last_run': None, 'backlog': False, 'errors': 0, 'last_error': None}
+                       for name in self.tasks}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Cutoffs use each table's own timestamp format and clock
+    def _expired_user_sessions(self):
+        # SQLAlchemy stores naive UTC datetimes as 'YYYY-MM-DD HH:MM:SS.ffffff'
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+        return batched_delete(self.db_manager, 'user_sessions', 'expires_at <= ?', (now,),
+                              self.batch_size, self.time_budget)
+
+    def _idle_chat_sessions(self):
+        return batched_delete(self.db_manager, 'web_chat_sessions',
+                              f"last_activity < datetime('now', ?) AND {KEEP_SESSIONS_WITH_PENDING_MESSAGES}",
+                              (f'-{int(self.session_idle)} seconds',),
+                              self.batch_size, self.time_budget)
+
+    def _stale_rate_limits(self):
+        # rate_limits windows are written in local time by the sqlite backend
+        cutoff = (datetime.now() - timedelta(seconds=self.rate_limit_window)).strftime('%Y-%m-%d %H:%M:%S')
+        return batched_delete(self.db_manager, 'rate_limits', 'window_start < ?', (cutoff,),
+                              self.batch_size, self.time_budget)
+
+    def run_once(self) -> Dict[str, int]:
+        """Sweep every table once; returns rows deleted per table"""
+        results = {}
+        for name, task in self.tasks.items():
+            started = time.perf_counter()
+            try:
+                deleted, finished = task()
+                error = None
+            except Exception as e:
+                deleted, finished, error = 0, True, str(e)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                stats = self._stats[name]
+                stats['runs'] += 1
+                stats['deleted'] += deleted
+                stats['last_deleted'] = deleted
+                stats['last_duration_ms'] = round(elapsed_ms, 1)
+                stats['last_run'] = datetime.now().isoformat()
+                stats['backlog'] = not finished
+                if error:
+                    stats['errors'] += 1
+                    stats['last_error'] = error
+            results[name] = deleted
+        return results
+
+    def next_delay(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _loop(self):
+        while not self._stop.wait(self.next_delay()):
+            self.run_once()
+
+    def start(self):
+        """Start the sweeper thread (no-op if already running)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='sanctum-maintenance', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> Dict:
+        """Get per-table sweep counters"""
+        with self._lock:
+            return {
+                'running': self.running,
+                'interval': self.interval,
+                'tables': {name: dict(stats) for name, stats in self._stats.items()}
+            }
+
+_scheduler_lock = threading.Lock()
+
+def get_maintenance_scheduler(app=None) -> MaintenanceScheduler:
+    """Get the app-scoped maintenance scheduler (started by create_app when enabled)"""
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    scheduler = app.extensions.get('maintenance_scheduler')
+    if scheduler is None:
+        from utils.database import get_database_manager
+        with _scheduler_lock:
+            scheduler = app.extensions.get('maintenance_scheduler')
+            if scheduler is None:
+                scheduler = MaintenanceScheduler(
+                    get_database_manager(app),
+                    interval=app.config.get('MAINTENANCE_INTERVAL', DEFAULT_INTERVAL),
+                    batch_size=app.config.get('MAINTENANCE_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+                    time_budget=app.config.get('MAINTENANCE_TIME_BUDGET', DEFAULT_TIME_BUDGET),
+                    session_idle=app.config.get('CHAT_SESSION_IDLE_TIMEOUT', DEFAULT_SESSION_IDLE),
+                    rate_limit_window=app.config.get('RATE_LIMIT_WINDOW', DEFAULT_RATE_LIMIT_WINDOW)
+                )
+                app.extensions['maintenance_scheduler'] = scheduler
+    return scheduler
@@ -0,0 +1,364 @@
+"""
+Versioned schema migrations for the shared SQLite database.
+
+Each step has a version number above the baseline schema (version 1, written
+by init_database.py) and is recorded in the schema_version table once applied.
+Steps are idempotent, so a database that already has some of their objects
+can still be migrated. A step whose tables do not exist yet (a bridge-only
+database has no web UI tables) is skipped, noted in schema_skipped and
+retried on later runs; the steps after it still apply. Once a database is
+current, checking it costs a single query.
+"""
+
+import logging
+import sqlite3
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils import cache_versions
+
+# Version written by init_database.py for the original MVP schema
+BASELINE_VERSION = 1
+
+CREATE_SCHEMA_VERSION_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        description TEXT
+    )
+"""
+
+CREATE_SCHEMA_SKIPPED_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_skipped (
+        version INTEGER PRIMARY KEY,
+        checked_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        reason TEXT
+    )
+"""
+
+logger = logging.getLogger(__name__)
+# (version, reason) pairs already logged by this process
+_reported_skips = set()
+
+class MigrationError(Exception):
+    """Raised when a migration cannot be applied to this database"""
+    pass
+
+class MigrationSkipped(MigrationError):
+    """Raised by a step that cannot apply to this database yet; it is retried on later runs"""
+    pass
+
+Migration = namedtuple('Migration', 'version description requires apply')
+
+def table_exists(conn, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+def column_names(conn, table: str) -> set:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def add_column(conn, table: str, column: str, definition: str):
+    """ALTER TABLE ... ADD COLUMN unless the column is already there"""
+    if column not in column_names(conn, table):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def create_index(conn, name: str, table: str, columns: Tuple[str, ...]):
+    """Create an index unless one with the same leading columns already exists"""
+    for index in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        indexed = tuple(row[2] for row in conn.execute(f"PRAGMA index_info({index[1]})"))
+        if indexed[:len(columns)] == tuple(columns):
+            return
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+def _add_cache_versions(conn):
+    conn.execute(cache_versions.CREATE_TABLE_SQL)
+
+def _add_inbox_claims(conn):
+    add_column(conn, 'web_chat_messages', 'lease_expires', 'INTEGER')
+    add_column(conn, 'web_chat_messages', 'claim_token', 'TEXT')
+
+def _add_bridge_indexes(conn):
+    # Inbox scans and claims: WHERE processed = 0 AND id > ? ORDER BY id
+    create_index(conn, 'idx_web_chat_messages_processed_id', 'web_chat_messages', ('processed', 'id'))
+    create_index(conn, 'idx_web_chat_messages_session_id', 'web_chat_messages', ('session_id',))
+    # Response polling: WHERE session_id = ? AND id > ? ORDER BY id
+    create_index(conn, 'idx_web_chat_responses_session_id', 'web_chat_responses', ('session_id', 'id'))
+    create_index(conn, 'idx_web_chat_sessions_last_activity', 'web_chat_sessions', ('last_activity',))
+    # Usually already covered by the table's UNIQUE(ip_address, endpoint, window_start)
+    create_index(conn, 'idx_rate_limits_lookup', 'rate_limits', ('ip_address', 'endpoint', 'window_start'))
+
+def _add_session_counters(conn):
+    add_column(conn, 'web_chat_sessions', 'message_count', 'INTEGER NOT NULL DEFAULT 0')
+    add_column(conn, 'web_chat_sessions', 'response_count', 'INTEGER NOT NULL DEFAULT 0')
+    # Keep the counters (and last_activity) current on every write path
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_web_chat_messages_insert_count
+        AFTER INSERT ON web_chat_messages
+        BEGIN
+            UPDATE web_chat_sessions
+            SET message_count = message_count + 1, last_activity = datetime('now')
+            WHERE session_id = NEW.session_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_web_chat_messages_delete_count
+        AFTER DELETE ON web_chat_messages
+        BEGIN
+            UPDATE web_chat_sessions SET message_count = MAX(message_count - 1, 0)
+            WHERE session_id = OLD.session_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_web_chat_responses_insert_count
+        AFTER INSERT ON web_chat_responses
+        BEGIN
+            UPDATE web_chat_sessions SET response_count = response_count + 1
+            WHERE session_id = NEW.session_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_web_chat_responses_delete_count
+        AFTER DELETE ON web_chat_responses
+        BEGIN
+            UPDATE web_chat_sessions SET response_count = MAX(response_count - 1, 0)
+            WHERE session_id = OLD.session_id;
+        END
+    """)
+    # One-off backfill; both subqueries are index lookups on session_id
+    conn.execute("""
+        UPDATE web_chat_sessions SET
+            message_count = (SELECT COUNT(*) FROM web_chat_messages m
+                             WHERE m.session_id = web_chat_sessions.session_id),
+            response_count = (SELECT COUNT(*) FROM web_chat_responses r
+                              WHERE r.session_id = web_chat_sessions.session_id)
+    """)
+
+# Rows of agent_visibility for the agents matching {where}: one per listed user
+# id and role, or a single ('role', '*') row when neither list restricts the
+# agent. Malformed or empty JSON counts as "no restriction".
+AGENT_VISIBILITY_ROWS_SQL = """
+    INSERT OR IGNORE INTO agent_visibility (agent_id, kind, principal)
+    SELECT a.id, 'user', CAST(u.value AS TEXT)
+    FROM agents a, json_each(CASE WHEN json_valid(a.visible_to_users) THEN a.visible_to_users ELSE '[]' END) u
+    WHERE {where} AND json_type(CASE WHEN json_valid(a.visible_to_users) THEN a.visible_to_users ELSE '[]' END) = 'array'
+    UNION ALL
+    SELECT a.id, 'role', CAST(r.value AS TEXT)
+    FROM agents a, json_each(CASE WHEN json_valid(a.visible_to_roles) THEN a.visible_to_roles ELSE '[]' END) r
+    WHERE {where} AND json_type(CASE WHEN json_valid(a.visible_to_roles) THEN a.visible_to_roles ELSE '[]' END) = 'array'
+    UNION ALL
+    SELECT a.id, 'role', '*'
+    FROM agents a
+    WHERE {where}
+      AND COALESCE(json_array_length(CASE WHEN json_valid(a.visible_to_users) THEN a.visible_to_users END), 0) = 0
+      AND COALESCE(json_array_length(CASE WHEN json_valid(a.visible_to_roles) THEN a.visible_to_roles END), 0) = 0
+"""
+
+def _add_agent_visibility(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS agent_visibility (
+            agent_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            principal TEXT NOT NULL,
+            PRIMARY KEY (kind, principal, agent_id)
+        )
+    """)
+    create_index(conn, 'idx_agent_visibility_agent_id', 'agent_visibility', ('agent_id',))
+    # Triggers keep the index in step with every write path, ORM or raw SQL
+    rows_for_new = AGENT_VISIBILITY_ROWS_SQL.format(where='a.id = NEW.id')
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_agents_visibility_insert
+        AFTER INSERT ON agents
+        BEGIN
+            {rows_for_new};
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_agents_visibility_update
+        AFTER UPDATE OF visible_to_users, visible_to_roles ON agents
+        BEGIN
+            DELETE FROM agent_visibility WHERE agent_id = NEW.id;
+            {rows_for_new};
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_agents_visibility_delete
+        AFTER DELETE ON agents
+        BEGIN
+            DELETE FROM agent_visibility WHERE agent_id = OLD.id;
+        END
+    """)
+    conn.execute("DELETE FROM agent_visibility")
+    conn.execute(AGENT_VISIBILITY_ROWS_SQL.format(where='1 = 1'))
+
+def _add_agent_version_triggers(conn):
+    # Any agents write (ORM, raw SQL, another process) invalidates agent list caches
+    bump = cache_versions.BUMP_SQL.replace(':name', f"'{cache_versions.AGENTS_VERSION}'")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_agents_cache_version_{event.lower()}
+            AFTER {event} ON agents
+            BEGIN
+                {bump};
+            END
+        """)
+
+def _add_user_search(conn):
+    # Trigram FTS over username/email: substring MATCH for terms of 3+ characters.
+    # Builds without FTS5 or the trigram tokenizer skip it; search falls back to LIKE.
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+                username, email, content='users', content_rowid='id', tokenize='trigram'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        raise MigrationSkipped(f'FTS5 trigram tokenizer unavailable ({e})')
+    # External-content table: triggers mirror every users write into the index
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_fts_insert
+        AFTER INSERT ON users
+        BEGIN
+            INSERT INTO users_fts (rowid, username, email) VALUES (NEW.id, NEW.username, NEW.email);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_fts_update
+        AFTER UPDATE OF username, email ON users
+        BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username, email) VALUES ('delete', OLD.id, OLD.username, OLD.email);
+            INSERT INTO users_fts (rowid, username, email) VALUES (NEW.id, NEW.username, NEW.email);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_fts_delete
+        AFTER DELETE ON users
+        BEGIN
+            INSERT INTO users_fts (users_fts, rowid, username, email) VALUES ('delete', OLD.id, OLD.username, OLD.email);
+        END
+    """)
+    conn.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+
+# Range scans for the background sweeps in utils/maintenance.py; one step per
+# table so a bridge-only database still gets the rate_limits index
+def _add_rate_limit_sweep_index(conn):
+    create_index(conn, 'idx_rate_limits_window_start', 'rate_limits', ('window_start',))
+
+def _add_session_expiry_index(conn):
+    create_index(conn, 'idx_user_sessions_expires_at', 'user_sessions', ('expires_at',))
+
+# Cutoff range scans for utils/retention.py (sessions use the step 4 index)
+def _add_retention_indexes(conn):
+    create_index(conn, 'idx_web_chat_messages_timestamp', 'web_chat_messages', ('timestamp',))
+    create_index(conn, 'idx_web_chat_responses_timestamp', 'web_chat_responses', ('timestamp',))
+
+MIGRATIONS: List[Migration] = [
+    Migration(2, 'Cache version counters', (), _add_cache_versions),
+    Migration(3, 'Inbox claim leases on web_chat_messages', ('web_chat_messages',), _add_inbox_claims),
+    Migration(4, 'Bridge hot-path indexes',
+              ('web_chat_messages', 'web_chat_responses', 'web_chat_sessions', 'rate_limits'),
+              _add_bridge_indexes),
+    Migration(5, 'Per-session message/response counters',
+              ('web_chat_sessions', 'web_chat_messages', 'web_chat_responses'),
+              _add_session_counters),
+    Migration(6, 'Agent visibility index', ('agents',), _add_agent_visibility),
+    Migration(7, 'Agent cache version triggers', ('agents', 'cache_versions'), _add_agent_version_triggers),
+    Migration(8, 'User search index', ('users',), _add_user_search),
+    Migration(9, 'Rate limit sweep index', ('rate_limits',), _add_rate_limit_sweep_index),
+    # Databases that applied the combined version of step 9 already have this index
+    Migration(10, 'Session expiry sweep index', ('user_sessions',), _add_session_expiry_index),
+    Migration(11, 'Retention cutoff indexes', ('web_chat_messages', 'web_chat_responses'), _add_retention_indexes),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+def current_version(conn) -> int:
+    """Highest applied schema version (0 for a database without schema_version)"""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+def is_current(conn) -> bool:
+    """True when every migration is applied (one query)"""
+    try:
+        row = conn.execute(
+            "SELECT COUNT(*) FROM schema_version WHERE version > ? AND version <= ?",
+            (BASELINE_VERSION, LATEST_VERSION)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return False
+    return row[0] >= len(MIGRATIONS)
+
+def applied_versions(conn) -> set:
+    try:
+        return {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+    except sqlite3.OperationalError:
+        return set()
+
+def skipped_migrations(conn) -> Dict[int, str]:
+    """Skipped steps still waiting to apply, with the reason"""
+    try:
+        rows = conn.execute("SELECT version, reason FROM schema_skipped ORDER BY version").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    applied = applied_versions(conn)
+    return {version: reason for version, reason in rows if version not in applied}
+
+def pending_migrations(conn, target: int = None) -> List[Migration]:
+    applied = applied_versions(conn)
+    target = LATEST_VERSION if target is None else target
+    return [m for m in MIGRATIONS if m.version not in applied and m.version <= target]
+
+def _record_skip(conn, migration: Migration, reason: str):
+    conn.execute(
+        "INSERT OR REPLACE INTO schema_skipped (version, checked_at, reason) VALUES (?, datetime('now'), ?)",
+        (migration.version, reason)
+    )
+    conn.commit()
+    if (migration.version, reason) not in _reported_skips:
+        _reported_skips.add((migration.version, reason))
+        logger.info("Skipped migration %s (%s): %s", migration.version, migration.description, reason)
+
+def migrate(conn, target: int = None, log: Optional[Callable[[str], None]] = None) -> List[int]:
+    """Apply pending migrations in order, one transaction each; return applied versions"""
+    conn.execute(CREATE_SCHEMA_VERSION_SQL)
+    conn.execute(CREATE_SCHEMA_SKIPPED_SQL)
+    conn.commit()
+    applied = []
+    for migration in pending_migrations(conn, target):
+        missing = [table for table in migration.requires if not table_exists(conn, table)]
+        if missing:
+            _record_skip(conn, migration, f"needs missing tables: {', '.join(missing)}")
+            continue
+        # Take the write lock first; another process may have applied this step meanwhile
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if migration.version in applied_versions(conn):
+                conn.rollback()
+                continue
+            migration.apply(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, applied_at, description) VALUES (?, datetime('now'), ?)",
+                (migration.version, migration.description)
+            )
+            conn.execute("DELETE FROM schema_skipped WHERE version = ?", (migration.version,))
+            conn.commit()
+        except MigrationSkipped as e:
+            conn.rollback()
+            _record_skip(conn, migration, str(e))
+            continue
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(migration.version)
+        if log:
+            log(f"Applied migration {migration.version}: {migration.description}")
+    return applied
+
+def ensure_migrated(conn, log: Optional[Callable[[str], None]] = None) -> List[int]:
+    """Migrate to the latest version; costs one query when already current"""
+    if is_current(conn):
+        return []
+    return migrate(conn, log=log)
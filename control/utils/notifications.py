@@ -0,0 +1,67 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+INBOX_TOPIC = 'inbox'
+
+def responses_topic(session_id: str) -> str:
+    """Topic signalled when a response is stored for a chat session"""
+    return f'responses:{session_id}'
+
+class Subscription:
+    """A waiter registered on one topic"""
+
+    def __init__(self, topic: str):
+        self.topic = topic
+        self._event = threading.Event()
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the topic is published or the timeout expires; re-arms afterwards"""
+        signalled = self._event.wait(timeout)
+        self._event.clear()
+        return signalled
+
+    def _notify(self):
+        self._event.set()
+
+class NotificationHub:
+    """In-process wake-ups for parked long-poll and streaming requests
+
+    Subscribe *before* checking the database, then wait: a publish that lands
+    between the check and the wait is not lost. Signals do not cross process
+    boundaries, so waiters should still re-check the database periodically
+    when several workers serve the app.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = defaultdict(set)
+
+    @contextmanager
+    def subscribe(self, topic: str):
+        subscription = Subscription(topic)
+        with self._lock:
+            self._waiters[topic].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(topic)
+                if waiters is not None:
+                    waiters.discard(subscription)
+                    if not waiters:
+                        del self._waiters[topic]
+
+    def publish(self, topic: str) -> int:
+        """Wake every waiter on a topic; return how many were woken"""
+        with self._lock:
+            waiters = list(self._waiters.get(topic, ()))
+        for subscription in waiters:
+            subscription._notify()
+        return len(waiters)
+
+    def waiter_count(self, topic: str = None) -> int:
+        with self._lock:
+            if topic is not None:
+                return len(self._waiters.get(topic, ()))
+            return sum(len(waiters) for waiters in self._waiters.values())
@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional
+
+# Defaults (overridable via app config)
+DEFAULT_ROUNDS = 12              # bcrypt cost factor; each +1 doubles the work
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) // 2)  # leave cores for chat and bridge requests
+DEFAULT_MAX_QUEUE = 32           # hashes waiting for a worker before new ones are refused
+DEFAULT_TIMEOUT = 10.0           # longest a request waits for its hash, in seconds
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool is full or a hash took too long"""
+    pass
+
+def bcrypt_hash(password: str, rounds: int = DEFAULT_ROUNDS) -> str:
+    import bcrypt  # deferred: only needed when passwords are hashed or checked
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def bcrypt_check(password: str, hashed: str) -> bool:
+    import bcrypt
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost factor of a $2b$NN$... hash, or None if it is not a bcrypt hash"""
+    parts = hashed.split('$') if hashed else []
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+class PasswordHasher:
+    """Bounded thread pool for bcrypt work
+
+    bcrypt releases the GIL while it hashes, so worker threads run in parallel
+    on separate cores while request threads only wait on their own result. At
+    most workers + max_queue hashes are in flight; beyond that HasherBusy is
+    raised at once instead of letting a login storm pile up behind the pool.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE,
+                 rounds: int = DEFAULT_ROUNDS, timeout: float = DEFAULT_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._busy_seconds = 0.0
+
+    def _timed(self, fn, args):
+        with self._lock:
+            self._running += 1
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._busy_seconds += elapsed
+
+    def _finished(self, future):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _submit(self, fn, args, wait: Optional[float] = None):
+        """Take a pool slot (waiting up to `wait` seconds, or not at all) and submit"""
+        acquired = self._slots.acquire(timeout=wait) if wait else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self._rejected += 1
+            raise HasherBusy("Password hashing queue is full")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(self._timed, fn, args)
+        except Exception:
+            self._finished(None)
+            raise
+        future.add_done_callback(self._finished)
+        return future
+
+    def _result(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            raise HasherBusy("Password hashing timed out")
+
+    def run(self, fn, *args):
+        """Run fn(*args) on the pool and wait for its result"""
+        return self._result(self._submit(fn, args))
+
+    def hash(self, password: str, rounds: int = None) -> str:
+        return self.run(bcrypt_hash, password, rounds or self.rounds)
+
+    def hash_many(self, passwords: List[str], rounds: int = None) -> List[str]:
+        """
+        Hash a batch across all workers, in input order.
+
+        The batch keeps at most `workers` jobs in the pool, waiting for its own
+        earlier jobs rather than filling the queue that logins rely on.
+        """
+        rounds = rounds or self.rounds
+        window = deque()
+        hashes = []
+        for password in passwords:
+            if len(window) >= self.workers:
+                hashes.append(self._result(window.popleft()))
+            window.append(self._submit(bcrypt_hash, (password, rounds), wait=self.timeout))
+        while window:
+            hashes.append(self._result(window.popleft()))
+        return hashes
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self.run(bcrypt_check, password, hashed)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True if the hash was made with a different cost factor than the current one"""
+        return hash_rounds(hashed) != self.rounds
+
+    def stats(self) -> Dict[str, float]:
+        """Get pool counters; queue_depth is hashes waiting for a worker"""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'rounds': self.rounds,
+                'running': self._running,
+                'queue_depth': self._in_flight - self._running,
+                'max_queue': self.max_queue,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'busy_seconds': round(self._busy_seconds, 3)
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_hasher_lock = threading.Lock()
+
+def get_password_hasher(app=None) -> PasswordHasher:
+    """Get the app-scoped password hashing pool"""
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    hasher = app.extensions.get('password_hasher')
+    if hasher is None:
+        with _hasher_lock:
+            hasher = app.extensions.get('password_hasher')
+            if hasher is None:
+                hasher = PasswordHasher(
+                    app.config.get('PASSWORD_HASH_WORKERS', DEFAULT_WORKERS),
+                    app.config.get('PASSWORD_HASH_MAX_QUEUE', DEFAULT_MAX_QUEUE),
+                    app.config.get('BCRYPT_ROUNDS', DEFAULT_ROUNDS),
+                    app.config.get('PASSWORD_HASH_TIMEOUT', DEFAULT_TIMEOUT)
+                )
+                app.extensions['password_hasher'] = hasher
+    return hasher
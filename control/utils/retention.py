@@ -0,0 +1,257 @@
+import gzip
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Dict
+
+from utils.maintenance import BATCH_PAUSE_SECONDS, KEEP_SESSIONS_WITH_PENDING_MESSAGES
+
+# system_config keys and their defaults (values are stored as strings)
+CONFIG_DEFAULTS = {
+    'retention_days': '0',                # chat history older than this is purged; 0 disables
+    'retention_archive': 'true',          # write purged rows to gzip JSONL first
+    'retention_archive_dir': '',          # default: archive/ next to the database
+    'retention_vacuum': 'incremental',    # none | incremental | full
+    'retention_batch_size': '500',        # rows per archive chunk and DELETE transaction
+}
+VACUUM_MODES = ('none', 'incremental', 'full')
+# Pages released per PRAGMA incremental_vacuum step
+VACUUM_STEP_PAGES = 2000
+
+# Children are purged before sessions. Unprocessed messages are kept (the bridge
+# has not picked them up yet), and so is any session that still has one.
+RETENTION_TABLES = (
+    ('web_chat_responses', 'timestamp', ''),
+    ('web_chat_messages', 'timestamp', 'AND processed != 0'),
+    ('web_chat_sessions', 'last_activity', f'AND {KEEP_SESSIONS_WITH_PENDING_MESSAGES}'),
+)
+
+RetentionPolicy = namedtuple('RetentionPolicy', 'days archive archive_dir vacuum batch_size')
+
+class RetentionError(Exception):
+    """Raised for an unusable retention policy"""
+    pass
+
+class RetentionBusy(Exception):
+    """Raised when a retention run is already in progress"""
+    pass
+
+_run_lock = threading.Lock()
+# Last background run started by start_retention
+_status_lock = threading.Lock()
+_status: Dict = {}
+
+def _as_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+def load_policy(db_manager, overrides: Dict = None) -> RetentionPolicy:
+    """Build the policy from system_config, with per-run overrides (days, archive, vacuum, ...)"""
+    config = dict(CONFIG_DEFAULTS)
+    stored = db_manager.get_all_config()
+    config.update({key: stored[key] for key in CONFIG_DEFAULTS if stored.get(key) not in (None, '')})
+    for key, value in (overrides or {}).items():
+        if value is not None:
+            config[f'retention_{key}'] = value
+
+    try:
+        days = int(config['retention_days'])
+        batch_size = int(config['retention_batch_size'])
+    except (TypeError, ValueError):
+        raise RetentionError('retention days and batch size must be integers')
+    if days < 0 or batch_size < 1:
+        raise RetentionError('retention days must be >= 0 and batch size >= 1')
+    vacuum = str(config['retention_vacuum']).lower()
+    if vacuum not in VACUUM_MODES:
+        raise RetentionError(f"vacuum must be one of: {', '.join(VACUUM_MODES)}")
+    archive_dir = config['retention_archive_dir'] or os.path.join(
+        os.path.dirname(os.path.abspath(db_manager.db_path)), 'archive')
+    return RetentionPolicy(days, _as_bool(config['retention_archive']), archive_dir, vacuum, batch_size)
+
+def _cutoff(days: int) -> str:
+    # Both CURRENT_TIMESTAMP and datetime('now') are UTC
+    return (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+
+def _expired_where(column: str, condition: str) -> str:
+    # Compare the raw column so the timestamp index serves the range. Values are
+    # written as 'YYYY-MM-DD HH:MM:SS' like the cutoff; an ISO 'T' stamp sorts
+    # after it, so such a row is at worst kept one day longer, never purged early.
+    return f"{column} < ? {condition}"
+
+def _purge_table(db_manager, table: str, column: str, condition: str, cutoff: str,
+                 batch_size: int, archive) -> int:
+    """Archive and delete old rows of one table in id-ordered chunks; returns rows purged"""
+    where = _expired_where(column, condition)
+    conn = db_manager.get_connection()
+    try:
+        # One pass to bound the id range; the chunks below are then primary-key range scans.
+        # +id stops SQLite walking the table back from the newest row for MAX(id).
+        max_id = conn.execute(f"SELECT MAX(+id) FROM {table} WHERE {where}", (cutoff,)).fetchone()[0]
+    finally:
+        conn.close()
+    if max_id is None:
+        return 0
+
+    purged, last_id = 0, 0
+    while True:
+        conn = db_manager.get_connection()
+        try:
+            rows = conn.execute(
+                f"SELECT * FROM {table} WHERE id > ? AND id <= ? AND {where} ORDER BY id LIMIT ?",
+                (last_id, max_id, cutoff, batch_size)
+            ).fetchall()
+            if not rows:
+                break
+            if archive is not None:
+                for row in rows:
+                    archive.write(json.dumps({'table': table, 'row': dict(row)}) + '\n')
+                archive.flush()
+            ids = [row['id'] for row in rows]
+            conn.execute(f"DELETE FROM {table} WHERE id IN ({','.join('?' * len(ids))})", ids)
+            conn.commit()
+        finally:
+            conn.close()
+        purged += len(rows)
+        last_id = ids[-1]
+        if len(rows) < batch_size:
+            break
+        time.sleep(BATCH_PAUSE_SECONDS)
+    return purged
+
+def _vacuum(db_manager, mode: str) -> Dict:
+    """Return freed space to the OS; incremental needs auto_vacuum=INCREMENTAL (set by a full run)"""
+    conn = db_manager.get_connection()
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        result = {'mode': mode, 'freed_bytes': 0}
+        if mode == 'full':
+            # Blocks writers for the duration; switches the file to incremental mode for later runs
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        elif mode == 'incremental':
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                result['skipped'] = 'auto_vacuum is not INCREMENTAL; run once with vacuum=full'
+                return result
+            while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+                conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+                conn.commit()
+                time.sleep(BATCH_PAUSE_SECONDS)
+        free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        result['freed_bytes'] = max(free_before - free_after, 0) * page_size
+        return result
+    finally:
+        conn.close()
+
+def count_expired(db_manager, policy: RetentionPolicy) -> Dict[str, int]:
+    """Rows each table would lose under the policy (a dry run)"""
+    cutoff = _cutoff(policy.days)
+    conn = db_manager.get_connection()
+    try:
+        return {
+            table: conn.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE {_expired_where(column, condition)}", (cutoff,)
+            ).fetchone()[0]
+            for table, column, condition in RETENTION_TABLES
+        }
+    finally:
+        conn.close()
+
+def _acquire_run(policy: RetentionPolicy):
+    if policy.days < 1:
+        raise RetentionError('retention_days is not set (0 disables retention)')
+    if not _run_lock.acquire(blocking=False):
+        raise RetentionBusy('A retention run is already in progress')
+
+def _run(db_manager, policy: RetentionPolicy) -> Dict:
+    """One archive, purge and vacuum pass; the caller holds _run_lock"""
+    started = time.perf_counter()
+    archive_path = part_path = None
+    archive = None
+    cutoff = _cutoff(policy.days)
+    if policy.archive:
+        os.makedirs(policy.archive_dir, exist_ok=True)
+        archive_path = os.path.join(policy.archive_dir,
+                                    f"chat-archive-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.jsonl.gz")
+        part_path = archive_path + '.part'
+        archive = gzip.open(part_path, 'wt', encoding='utf-8')
+
+    purged = {}
+    try:
+        for table, column, condition in RETENTION_TABLES:
+            purged[table] = _purge_table(db_manager, table, column, condition, cutoff,
+                                         policy.batch_size, archive)
+    except Exception:
+        if archive is not None:
+            # Keep whatever was archived: those chunks may already be deleted
+            archive.close()
+            os.replace(part_path, archive_path)
+        raise
+    if archive is not None:
+        archive.close()
+        if any(purged.values()):
+            os.replace(part_path, archive_path)
+        else:
+            os.remove(part_path)
+            archive_path = None
+
+    vacuum = _vacuum(db_manager, policy.vacuum) if policy.vacuum != 'none' and any(purged.values()) else None
+    return {
+        'cutoff': cutoff,
+        'purged': purged,
+        'archive_file': archive_path,
+        'archive_bytes': os.path.getsize(archive_path) if archive_path else 0,
+        'vacuum': vacuum,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+
+def run_retention(db_manager, policy: RetentionPolicy) -> Dict:
+    """
+    Archive and purge chat history older than policy.days, then vacuum.
+
+    Rows are archived before the DELETE of their chunk commits, so an
+    interrupted run may archive a chunk twice but never loses one. Only one
+    run per process at a time; RetentionBusy otherwise.
+    """
+    _acquire_run(policy)
+    try:
+        return _run(db_manager, policy)
+    finally:
+        _run_lock.release()
+
+def start_retention(db_manager, policy: RetentionPolicy) -> Dict:
+    """Start run_retention on a background thread; returns the initial status (see retention_status)"""
+    _acquire_run(policy)
+    try:
+        with _status_lock:
+            _status.clear()
+            _status.update({'state': 'running', 'policy': policy._asdict(),
+                            'started_at': datetime.now().isoformat(), 'finished_at': None,
+                            'result': None, 'error': None})
+        threading.Thread(target=_run_in_background, args=(db_manager, policy),
+                         name='sanctum-retention', daemon=True).start()
+    except Exception:
+        _run_lock.release()
+        raise
+    return retention_status()
+
+def _run_in_background(db_manager, policy: RetentionPolicy):
+    try:
+        try:
+            update = {'state': 'finished', 'result': _run(db_manager, policy)}
+        except Exception as e:
+            update = {'state': 'failed', 'error': str(e)}
+        with _status_lock:
+            _status.update(update, finished_at=datetime.now().isoformat())
+    finally:
+        # Released after the status update so a new run cannot be overwritten by this one
+        _run_lock.release()
+
+def retention_status() -> Dict:
+    """State of the last background run in this process ('idle' if none)"""
+    with _status_lock:
+        return dict(_status) if _status else {'state': 'idle'}
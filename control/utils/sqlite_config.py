@@ -0,0 +1,78 @@
+"""
+Shared SQLite connection configuration for the raw sqlite3 and SQLAlchemy stacks.
+
+Both stacks open db/sanctum_ui.db, so they must agree on journal mode and
+locking behaviour. Defaults can be overridden per process with the
+SANCTUM_SQLITE_PRAGMAS environment variable (a JSON object) or per call
+with an overrides dict; a value of None drops that PRAGMA entirely.
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, Optional
+
+PRAGMA_ENV_VAR = 'SANCTUM_SQLITE_PRAGMAS'
+
+# busy_timeout is applied first so the journal_mode switch waits for locks
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,       # ms to wait on a locked database before SQLITE_BUSY
+    'journal_mode': 'WAL',      # readers no longer block the writer (and vice versa)
+    'synchronous': 'NORMAL',    # safe with WAL; fsync at checkpoints only
+    'mmap_size': 67108864,      # 64 MiB memory-mapped I/O
+    'cache_size': -16000,       # ~16 MB page cache per connection (negative = KiB)
+    'temp_store': 'MEMORY',
+}
+
+class PragmaConfigError(ValueError):
+    """Raised when SANCTUM_SQLITE_PRAGMAS is not a JSON object"""
+    pass
+
+_NAME_RE = re.compile(r'^[a-z_]+$')
+_VALUE_RE = re.compile(r'^-?[A-Za-z0-9_]+$')
+
+def resolve_pragmas(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge defaults, environment overrides and explicit overrides"""
+    pragmas = dict(DEFAULT_PRAGMAS)
+    env_value = os.environ.get(PRAGMA_ENV_VAR)
+    if env_value:
+        try:
+            env_pragmas = json.loads(env_value)
+        except ValueError as e:
+            raise PragmaConfigError(f"{PRAGMA_ENV_VAR} is not valid JSON: {e}") from None
+        if not isinstance(env_pragmas, dict):
+            raise PragmaConfigError(f'{PRAGMA_ENV_VAR} must be a JSON object, e.g. {{"cache_size": -32000}}')
+        pragmas.update(env_pragmas)
+    if overrides:
+        pragmas.update(overrides)
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+def pragma_statement(name: str, value: Any) -> str:
+    """Build a validated PRAGMA statement (PRAGMAs cannot take bound parameters)"""
+    if not _NAME_RE.match(name):
+        raise ValueError(f"Invalid PRAGMA name: {name!r}")
+    value = str(value)
+    if not _VALUE_RE.match(value):
+        raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+    return f"PRAGMA {name} = {value}"
+
+def apply_pragmas(dbapi_connection, pragmas: Dict[str, Any]):
+    """Apply PRAGMAs to a raw DB-API sqlite3 connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(pragma_statement(name, value))
+    finally:
+        cursor.close()
+
+def install_sqlalchemy_pragmas(engine, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Apply the shared PRAGMAs to every connection a SQLAlchemy engine opens"""
+    from sqlalchemy import event
+
+    pragmas = resolve_pragmas(overrides)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+    return pragmas
@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, current_app
+
+from utils.notifications import responses_topic
+
+# Defaults (overridable via app config)
+DEFAULT_MAX_PARKED = 64          # concurrent parked requests per parking lot
+DEFAULT_MAX_WAIT = 30            # longest long-poll wait in seconds
+DEFAULT_STREAM_DURATION = 300    # SSE streams end after this; EventSource reconnects
+DEFAULT_RECHECK = 10.0           # parked requests re-read the database this often, for other workers' writes
+HEARTBEAT_SECONDS = 15
+
+class ParkingLot:
+    """Caps how many requests may be parked (holding a worker thread) at once"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._slots = threading.BoundedSemaphore(capacity)
+        self._lock = threading.Lock()
+        self.parked = 0
+
+    def try_enter(self) -> bool:
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self.parked += 1
+        return True
+
+    def leave(self):
+        with self._lock:
+            self.parked -= 1
+        self._slots.release()
+
+    @contextmanager
+    def slot(self):
+        """Yield True if a slot was taken (and release it afterwards), else False"""
+        entered = self.try_enter()
+        try:
+            yield entered
+        finally:
+            if entered:
+                self.leave()
+
+_lots_lock = threading.Lock()
+
+def get_parking_lot(name: str, app=None) -> ParkingLot:
+    """Get an app-scoped parking lot; capacity comes from <NAME>_MAX_PARKED"""
+    if app is None:
+        app = current_app._get_current_object()
+    lots = app.extensions.setdefault('parking_lots', {})
+    lot = lots.get(name)
+    if lot is None:
+        with _lots_lock:
+            lot = lots.get(name)
+            if lot is None:
+                lot = ParkingLot(app.config.get(f'{name.upper()}_MAX_PARKED', DEFAULT_MAX_PARKED))
+                lots[name] = lot
+    return lot
+
+def recheck_interval(app=None) -> float:
+    """Seconds between database re-reads while parked (LONG_POLL_RECHECK)
+
+    Same-process writes wake waiters at once through the notification hub;
+    this is only the safety net for writes made by other worker processes.
+    """
+    if app is None:
+        app = current_app
+    return app.config.get('LONG_POLL_RECHECK', DEFAULT_RECHECK)
+
+def long_poll(hub, topic: str, fetch, timeout: float, recheck: float = None):
+    """Call fetch() until it returns something truthy, a publish wakes us, or timeout"""
+    if recheck is None:
+        recheck = recheck_interval()
+    deadline = time.monotonic() + timeout
+    # Subscribe before the first fetch so a publish in between is not missed
+    with hub.subscribe(topic) as subscription:
+        result = fetch()
+        while not result:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            subscription.wait(min(remaining, recheck))
+            result = fetch()
+    return result
+
+def sse_event(data, event: str = None, event_id=None) -> str:
+    """Format one Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+def session_response_stream(db, session_id: str, after_id: int = 0):
+    """
+    SSE response streaming every new chat response for a session.
+
+    Returns None when too many streams are already open. Each event's id is
+    the response id, so a reconnecting EventSource resumes via Last-Event-ID.
+    """
+    lot = get_parking_lot('responses')
+    if not lot.try_enter():
+        return None
+
+    max_duration = current_app.config.get('STREAM_MAX_DURATION', DEFAULT_STREAM_DURATION)
+    recheck = recheck_interval()
+
+    def generate():
+        cursor = after_id
+        deadline = time.monotonic() + max_duration
+        last_sent = time.monotonic()
+        yield 'retry: 2000\n\n'
+        with db.events.subscribe(responses_topic(session_id)) as subscription:
+            while True:
+                rows = db.get_responses_after(session_id, cursor, 50)
+                for row in rows:
+                    cursor = row['id']
+                    yield sse_event(row, 'response', row['id'])
+                now = time.monotonic()
+                if rows:
+                    last_sent = now
+                    continue
+                if now >= deadline:
+                    break
+                if now - last_sent >= HEARTBEAT_SECONDS:
+                    yield ': keepalive\n\n'
+                    last_sent = now
+                subscription.wait(min(recheck, deadline - now, HEARTBEAT_SECONDS - (now - last_sent)))
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx pass events through unbuffered
+    # Released even if the client disconnects before the generator starts
+    response.call_on_close(lot.leave)
+    return response
@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+import re
+from typing import Callable, Dict, List
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from models import User
+
+# Defaults (overridable per import)
+DEFAULT_PASSWORD = 'changeme123'  # same initial password as POST /api/users
+MAX_IMPORT_ROWS = 1000            # rows per transaction (import_users.py batches)
+VALID_ROLES = ('admin', 'user', 'viewer')
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+$')
+
+class ImportFormatError(ValueError):
+    """Raised when an import payload cannot be parsed into rows"""
+    pass
+
+def parse_csv(text: str) -> List[dict]:
+    """Rows from CSV with a header line (username,email,role[,password,permissions])"""
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or not {'username', 'email'} <= {f.strip() for f in reader.fieldnames}:
+        raise ImportFormatError("CSV needs a header row with at least username and email")
+    # Empty cells count as absent, so a blank password or role takes the default
+    return [{(k or '').strip(): v.strip() for k, v in row.items() if isinstance(v, str) and v.strip()}
+            for row in reader]
+
+def parse_json(data) -> List[dict]:
+    """Rows from a JSON array of user objects, or {"users": [...]}"""
+    if isinstance(data, dict):
+        data = data.get('users')
+    if not isinstance(data, list):
+        raise ImportFormatError('Expected a JSON array of users or {"users": [...]}')
+    return data
+
+def validate_row(row) -> str:
+    """Return an error message for a malformed row, or '' if it is usable"""
+    if not isinstance(row, dict):
+        return 'Row must be an object'
+    username = row.get('username')
+    email = row.get('email')
+    if not isinstance(username, str) or not 1 <= len(username) <= 50:
+        return 'username must be 1-50 characters'
+    if not isinstance(email, str) or len(email) > 100 or not EMAIL_PATTERN.match(email):
+        return 'email is not a valid address'
+    if (row.get('role') or 'user') not in VALID_ROLES:
+        return f"role must be one of: {', '.join(VALID_ROLES)}"
+    password = row.get('password')
+    if password is not None and (not isinstance(password, str) or not password):
+        return 'password must be a non-empty string'
+    return ''
+
+def import_users(db, rows: List[dict], hash_many: Callable[[List[str]], List[str]],
+                 default_password: str = DEFAULT_PASSWORD, first_row: int = 1) -> Dict:
+    """
+    Create users from parsed rows in one transaction; bad rows are reported, not fatal.
+
+    Existing usernames/emails are found with a single query; passwords are
+    hashed as one batch by hash_many (e.g. PasswordHasher.hash_many). Names a
+    concurrent writer takes before the commit are reported like existing ones. Returns
+    {'created': [...], 'errors': [{'row': n, 'error': ...}]}; rows count from first_row.
+    """
+    errors = []
+    candidates = []
+    seen_usernames, seen_emails = set(), set()
+    for number, row in enumerate(rows, start=first_row):
+        error = validate_row(row)
+        if not error:
+            username, email = row['username'], row['email']
+            if username in seen_usernames or email in seen_emails:
+                error = 'Duplicate username or email within the import'
+            seen_usernames.add(username)
+            seen_emails.add(email)
+        if error:
+            errors.append({'row': number, 'error': error})
+        else:
+            candidates.append((number, row))
+
+    candidates = _drop_taken(db, candidates, errors)
+    if not candidates:
+        return {'created': [], 'errors': sorted(errors, key=lambda e: e['row'])}
+
+    hashes = hash_many([row.get('password') or default_password for _, row in candidates])
+    pending = list(zip(candidates, hashes))
+    while True:
+        users = [_new_user(row, password_hash) for (_, row), password_hash in pending]
+        try:
+            db.add_all(users)
+            db.flush()
+            # Read ids before commit expires the instances (one refresh query each)
+            created = [{'row': number, 'id': user.id, 'username': user.username}
+                       for ((number, _), _), user in zip(pending, users)]
+            db.commit()
+            break
+        except IntegrityError:
+            db.rollback()
+            # A concurrent import or create took some of these names after the
+            # check above: report those rows and retry the rest
+            remaining = _drop_taken(db, [candidate for candidate, _ in pending], errors)
+            if len(remaining) == len(pending):
+                raise
+            pending = [item for item in pending if item[0] in remaining]
+            if not pending:
+                created = []
+                break
+        except Exception:
+            db.rollback()
+            raise
+
+    return {'created': created, 'errors': sorted(errors, key=lambda e: e['row'])}
+
+def _drop_taken(db, candidates: List[tuple], errors: List[dict]) -> List[tuple]:
+    """Report (number, row) candidates whose username or email exists; return the rest"""
+    if not candidates:
+        return []
+    existing = db.query(User.username, User.email).filter(or_(
+        User.username.in_([row['username'] for _, row in candidates]),
+        User.email.in_([row['email'] for _, row in candidates])
+    )).all()
+    taken_usernames = {username for username, _ in existing}
+    taken_emails = {email for _, email in existing}
+    accepted = []
+    for number, row in candidates:
+        if row['username'] in taken_usernames or row['email'] in taken_emails:
+            errors.append({'row': number, 'error': 'Username or email already exists'})
+        else:
+            accepted.append((number, row))
+    return accepted
+
+def _new_user(row: dict, password_hash: str) -> User:
+    permissions = row.get('permissions') or '[]'
+    return User(
+        username=row['username'],
+        email=row['email'],
+        password_hash=password_hash,
+        role=row.get('role') or 'user',
+        permissions=permissions if isinstance(permissions, str) else json.dumps(permissions),
+        is_active=True
+    )
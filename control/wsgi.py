@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Sanctum Control Interface - WSGI Entry Point
+Copyright (c) 2025 Mark Rizzn Hopkins
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+"""
+WSGI entry point: runs the database startup once per worker process
+
+    gunicorn --chdir control wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()